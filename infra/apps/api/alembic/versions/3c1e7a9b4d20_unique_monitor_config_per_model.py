@@ -0,0 +1,38 @@
+"""unique monitor config per model
+
+Revision ID: 3c1e7a9b4d20
+Revises: 9d8f0e2a7b5c
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c1e7a9b4d20"
+down_revision = "9d8f0e2a7b5c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Racing first events could register a model twice; keep the oldest config.
+    op.execute(
+        """
+        DELETE FROM monitor_configs a
+        USING monitor_configs b
+        WHERE a.org_id = b.org_id
+          AND a.model_id = b.model_id
+          AND (a.created_at, a.monitor_id) > (b.created_at, b.monitor_id)
+        """
+    )
+    op.create_unique_constraint(
+        "uq_monitor_configs_org_model",
+        "monitor_configs",
+        ["org_id", "model_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_monitor_configs_org_model", "monitor_configs", type_="unique")
@@ -0,0 +1,29 @@
+"""add worker checkpoints
+
+Revision ID: 4f6a8c2e1d93
+Revises: b5d9e3f1c2a4
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4f6a8c2e1d93"
+down_revision = "b5d9e3f1c2a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "worker_checkpoints",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("value", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("worker_checkpoints")
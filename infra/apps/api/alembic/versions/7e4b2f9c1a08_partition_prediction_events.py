@@ -0,0 +1,104 @@
+"""partition prediction_events by event_time
+
+Revision ID: 7e4b2f9c1a08
+Revises: 3c1e7a9b4d20
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7e4b2f9c1a08"
+down_revision = "3c1e7a9b4d20"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_prediction_events_org_id", ["org_id"]),
+    ("ix_prediction_events_model_id", ["model_id"]),
+    ("ix_prediction_events_entity_id", ["entity_id"]),
+    ("ix_prediction_events_event_time", ["event_time"]),
+    ("ix_prediction_events_ingested_at", ["ingested_at"]),
+    ("ix_pred_org_model_time", ["org_id", "model_id", "event_time"]),
+]
+
+WEEKS_AHEAD = 4
+
+
+def _week_start(ts: datetime) -> datetime:
+    day = datetime(ts.year, ts.month, ts.day)
+    return day - timedelta(days=day.weekday())
+
+
+def _create_table(name: str, partitioned: bool) -> None:
+    suffix = " PARTITION BY RANGE (event_time)" if partitioned else ""
+    pk = "(event_id, event_time)" if partitioned else "(event_id)"
+    op.execute(
+        f"""
+        CREATE TABLE {name} (
+            event_id UUID NOT NULL,
+            org_id UUID NOT NULL,
+            model_id VARCHAR NOT NULL,
+            entity_id VARCHAR NOT NULL,
+            score FLOAT NOT NULL,
+            prediction VARCHAR,
+            event_time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            ingested_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT {name}_pkey PRIMARY KEY {pk}
+        ){suffix}
+        """
+    )
+
+
+def _swap_in(new_name: str) -> None:
+    """Replace prediction_events with `new_name`, copying all rows."""
+    for ix, _ in INDEXES:
+        op.drop_index(ix, table_name="prediction_events")
+    op.rename_table("prediction_events", "prediction_events_old")
+    op.execute("ALTER TABLE prediction_events_old RENAME CONSTRAINT prediction_events_pkey TO prediction_events_old_pkey")
+    op.execute(f"INSERT INTO {new_name} SELECT event_id, org_id, model_id, entity_id, score, prediction, event_time, ingested_at FROM prediction_events_old")
+    op.drop_table("prediction_events_old")
+    if new_name != "prediction_events":
+        op.rename_table(new_name, "prediction_events")
+        op.execute(f"ALTER TABLE prediction_events RENAME CONSTRAINT {new_name}_pkey TO prediction_events_pkey")
+    for ix, cols in INDEXES:
+        op.create_index(ix, "prediction_events", cols, unique=False)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    _create_table("prediction_events_new", partitioned=True)
+
+    oldest = bind.execute(sa.text("SELECT min(event_time) FROM prediction_events")).scalar()
+    now = datetime.utcnow()
+    start = _week_start(oldest or now)
+    last = _week_start(now) + timedelta(weeks=WEEKS_AHEAD)
+    while start <= last:
+        end = start + timedelta(days=7)
+        # Named after the final table so runtime maintenance recognises them.
+        op.execute(
+            f"CREATE TABLE prediction_events_p{start:%Y%m%d} "
+            f"PARTITION OF prediction_events_new "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        start = end
+    op.execute("CREATE TABLE prediction_events_default PARTITION OF prediction_events_new DEFAULT")
+
+    _swap_in("prediction_events_new")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    _create_table("prediction_events_flat", partitioned=False)
+    _swap_in("prediction_events_flat")
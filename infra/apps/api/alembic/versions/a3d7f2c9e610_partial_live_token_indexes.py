@@ -0,0 +1,54 @@
+"""partial indexes on live session and reset tokens
+
+Replace the full indexes on sessions.user_id, sessions.expires_at and
+password_reset_tokens.expires_at with partial ones covering only live
+(unrevoked / unused) tokens. Revoked and used rows are found through the
+existing revoked_at / used_at indexes and deleted by the token sweeper.
+
+Revision ID: a3d7f2c9e610
+Revises: e1b6d3a9c570
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a3d7f2c9e610"
+down_revision = "e1b6d3a9c570"
+branch_labels = None
+depends_on = None
+
+
+# (partial index, table, column, live condition, full index it replaces)
+INDEXES = [
+    ("ix_sessions_live_user_id", "sessions", "user_id", "revoked_at IS NULL", "ix_sessions_user_id"),
+    ("ix_sessions_live_expires_at", "sessions", "expires_at", "revoked_at IS NULL", "ix_sessions_expires_at"),
+    (
+        "ix_password_reset_tokens_live_expires_at",
+        "password_reset_tokens",
+        "expires_at",
+        "used_at IS NULL",
+        "ix_password_reset_tokens_expires_at",
+    ),
+]
+
+
+def upgrade() -> None:
+    for ix, table, column, where, old_ix in INDEXES:
+        op.create_index(
+            ix,
+            table,
+            [column],
+            unique=False,
+            postgresql_where=sa.text(where),
+            sqlite_where=sa.text(where),
+        )
+        op.drop_index(old_ix, table_name=table)
+
+
+def downgrade() -> None:
+    for ix, table, column, _, old_ix in INDEXES:
+        op.create_index(old_ix, table, [column], unique=False)
+        op.drop_index(ix, table_name=table)
@@ -0,0 +1,39 @@
+"""add prediction rollups and raw retention settings
+
+Revision ID: b5d9e3f1c2a4
+Revises: 7e4b2f9c1a08
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b5d9e3f1c2a4"
+down_revision = "7e4b2f9c1a08"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "prediction_rollups",
+        sa.Column("org_id", sa.Uuid(), nullable=False),
+        sa.Column("model_id", sa.String(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("score_min", sa.Float(), nullable=True),
+        sa.Column("score_max", sa.Float(), nullable=True),
+        sa.Column("score_sum", sa.Float(), nullable=False),
+        sa.Column("sketch", sa.JSON(), nullable=False),
+        sa.PrimaryKeyConstraint("org_id", "model_id", "bucket_start"),
+    )
+    op.add_column("orgs", sa.Column("raw_retention_days", sa.Integer(), nullable=True))
+    op.add_column("models", sa.Column("raw_rolled_up_until", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("models", "raw_rolled_up_until")
+    op.drop_column("orgs", "raw_retention_days")
+    op.drop_table("prediction_rollups")
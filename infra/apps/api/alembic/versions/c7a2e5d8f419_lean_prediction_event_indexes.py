@@ -0,0 +1,56 @@
+"""lean prediction_events indexes
+
+Replace the five single-column indexes and ix_pred_org_model_time with a
+covering (org_id, model_id, event_time) INCLUDE (score) index and a BRIN
+index on ingested_at.
+
+Revision ID: c7a2e5d8f419
+Revises: 4f6a8c2e1d93
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c7a2e5d8f419"
+down_revision = "4f6a8c2e1d93"
+branch_labels = None
+depends_on = None
+
+
+OLD_INDEXES = [
+    ("ix_prediction_events_org_id", ["org_id"]),
+    ("ix_prediction_events_model_id", ["model_id"]),
+    ("ix_prediction_events_entity_id", ["entity_id"]),
+    ("ix_prediction_events_event_time", ["event_time"]),
+    ("ix_prediction_events_ingested_at", ["ingested_at"]),
+    ("ix_pred_org_model_time", ["org_id", "model_id", "event_time"]),
+]
+
+
+def upgrade() -> None:
+    # Build the new indexes first so window scans never lose their index.
+    op.create_index(
+        "ix_pred_org_model_time_score",
+        "prediction_events",
+        ["org_id", "model_id", "event_time"],
+        unique=False,
+        postgresql_include=["score"],
+    )
+    op.create_index(
+        "ix_pred_ingested_at_brin",
+        "prediction_events",
+        ["ingested_at"],
+        unique=False,
+        postgresql_using="brin",
+    )
+    for ix, _ in OLD_INDEXES:
+        op.drop_index(ix, table_name="prediction_events")
+
+
+def downgrade() -> None:
+    for ix, cols in OLD_INDEXES:
+        op.create_index(ix, "prediction_events", cols, unique=False)
+    op.drop_index("ix_pred_ingested_at_brin", table_name="prediction_events")
+    op.drop_index("ix_pred_org_model_time_score", table_name="prediction_events")
@@ -0,0 +1,36 @@
+"""add baseline cache
+
+Revision ID: d4e8b1f7a362
+Revises: a3d7f2c9e610
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d4e8b1f7a362"
+down_revision = "a3d7f2c9e610"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "baseline_cache",
+        sa.Column("org_id", sa.Uuid(), nullable=False),
+        sa.Column("model_id", sa.String(), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("baseline_start", sa.DateTime(), nullable=False),
+        sa.Column("baseline_end", sa.DateTime(), nullable=False),
+        sa.Column("num_bins", sa.Integer(), nullable=False),
+        sa.Column("config_version", sa.DateTime(), nullable=False),
+        sa.Column("bins", sa.JSON(), nullable=False),
+        sa.Column("built_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("org_id", "model_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("baseline_cache")
@@ -0,0 +1,79 @@
+"""store integer model_key in prediction_events
+
+Adds `model_keys`, backfills one key per (org_id, model_id) seen in models or
+prediction_events, and replaces prediction_events.org_id / model_id with
+model_key. The backfill UPDATE rewrites every raw row; run it in a
+maintenance window on large tables.
+
+Revision ID: e1b6d3a9c570
+Revises: c7a2e5d8f419
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e1b6d3a9c570"
+down_revision = "c7a2e5d8f419"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "model_keys",
+        sa.Column("model_key", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("org_id", sa.Uuid(), nullable=False),
+        sa.Column("model_id", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("model_key"),
+        sa.UniqueConstraint("org_id", "model_id", name="uq_model_keys_org_model"),
+    )
+    op.execute(
+        "INSERT INTO model_keys (org_id, model_id) "
+        "SELECT org_id, model_id FROM models "
+        "UNION SELECT DISTINCT org_id, model_id FROM prediction_events"
+    )
+
+    op.add_column("prediction_events", sa.Column("model_key", sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE prediction_events SET model_key = ("
+        "SELECT k.model_key FROM model_keys k "
+        "WHERE k.org_id = prediction_events.org_id AND k.model_id = prediction_events.model_id)"
+    )
+    op.alter_column("prediction_events", "model_key", nullable=False)
+
+    op.create_index(
+        "ix_pred_model_time_score",
+        "prediction_events",
+        ["model_key", "event_time"],
+        unique=False,
+        postgresql_include=["score"],
+    )
+    op.drop_index("ix_pred_org_model_time_score", table_name="prediction_events")
+    op.drop_column("prediction_events", "model_id")
+    op.drop_column("prediction_events", "org_id")
+
+
+def downgrade() -> None:
+    op.add_column("prediction_events", sa.Column("org_id", sa.Uuid(), nullable=True))
+    op.add_column("prediction_events", sa.Column("model_id", sa.String(), nullable=True))
+    op.execute(
+        "UPDATE prediction_events SET "
+        "org_id = (SELECT k.org_id FROM model_keys k WHERE k.model_key = prediction_events.model_key), "
+        "model_id = (SELECT k.model_id FROM model_keys k WHERE k.model_key = prediction_events.model_key)"
+    )
+    op.alter_column("prediction_events", "org_id", nullable=False)
+    op.alter_column("prediction_events", "model_id", nullable=False)
+
+    op.create_index(
+        "ix_pred_org_model_time_score",
+        "prediction_events",
+        ["org_id", "model_id", "event_time"],
+        unique=False,
+        postgresql_include=["score"],
+    )
+    op.drop_index("ix_pred_model_time_score", table_name="prediction_events")
+    op.drop_column("prediction_events", "model_key")
+    op.drop_table("model_keys")
@@ -0,0 +1,36 @@
+"""add drift window states
+
+Revision ID: f5c2a8d9e014
+Revises: d4e8b1f7a362
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f5c2a8d9e014"
+down_revision = "d4e8b1f7a362"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "drift_window_states",
+        sa.Column("org_id", sa.Uuid(), nullable=False),
+        sa.Column("model_id", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("window_start", sa.DateTime(), nullable=False),
+        sa.Column("window_end", sa.DateTime(), nullable=False),
+        sa.Column("synced_until", sa.DateTime(), nullable=False),
+        sa.Column("sketch", sa.JSON(), nullable=False),
+        sa.Column("hour_bounds", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("org_id", "model_id", "name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("drift_window_states")
@@ -0,0 +1,126 @@
+"""
+In-process cache of API key lookups, so get_org_id skips the api_keys query
+for keys it has seen recently.
+
+Entries map the key's HMAC hash to its (org_id, key_id). Unknown or revoked
+keys are cached too, for a shorter time, so a flood of bad keys does not turn
+into a flood of queries. They live in their own, smaller LRU, so such a flood
+cannot evict valid keys.
+
+revoke_api_key invalidates the entry on the replica that served it. Every
+replica also polls api_keys every API_KEY_REVOCATION_POLL_SECONDS for keys
+revoked within the last TTL (invalidate_revoked), so elsewhere a revoked key
+keeps working for at most that long. With polling off (0) it is
+API_KEY_CACHE_TTL_SECONDS.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import ApiKey
+from apps.api.app import metrics
+
+
+API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", "30"))
+API_KEY_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+API_KEY_CACHE_MAX_SIZE = int(os.getenv("API_KEY_CACHE_MAX_SIZE", "10000"))
+API_KEY_CACHE_NEGATIVE_MAX_SIZE = int(os.getenv("API_KEY_CACHE_NEGATIVE_MAX_SIZE", "1000"))
+API_KEY_REVOCATION_POLL_SECONDS = float(os.getenv("API_KEY_REVOCATION_POLL_SECONDS", "2"))
+
+# revoked_at is stamped by whichever replica handled the revoke.
+_REVOCATION_CLOCK_SKEW = timedelta(seconds=60)
+
+# Returned by ApiKeyCache.get when the database has to be asked.
+MISS = object()
+
+
+class CachedApiKey(NamedTuple):
+    org_id: Any
+    key_id: Any
+
+
+class ApiKeyCache:
+    """TTL + LRU maps of key hash -> CachedApiKey, and of key hash -> None for invalid keys."""
+
+    def __init__(
+        self,
+        ttl: float = API_KEY_CACHE_TTL_SECONDS,
+        negative_ttl: float = API_KEY_CACHE_NEGATIVE_TTL_SECONDS,
+        max_size: int = API_KEY_CACHE_MAX_SIZE,
+        negative_max_size: int = API_KEY_CACHE_NEGATIVE_MAX_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.negative_max_size = negative_max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, CachedApiKey]]" = OrderedDict()
+        self._invalid: "OrderedDict[str, Tuple[float, None]]" = OrderedDict()
+
+    def get(self, key_hash: str):
+        """The cached entry (possibly None, i.e. known invalid), or MISS."""
+        with self._lock:
+            now = self._clock()
+            for entries in (self._entries, self._invalid):
+                item = entries.get(key_hash)
+                if item is None:
+                    continue
+                expires_at, entry = item
+                if expires_at > now:
+                    entries.move_to_end(key_hash)
+                    metrics.inc("api_key_cache_hits_total")
+                    return entry
+                del entries[key_hash]
+        metrics.inc("api_key_cache_misses_total")
+        return MISS
+
+    def put(self, key_hash: str, api_key) -> Optional[CachedApiKey]:
+        """Cache the looked-up ApiKey row (None if not found or revoked) and return its entry."""
+        entry = CachedApiKey(api_key.org_id, api_key.key_id) if api_key is not None else None
+        if entry is not None:
+            entries, ttl, max_size = self._entries, self.ttl, self.max_size
+        else:
+            entries, ttl, max_size = self._invalid, self.negative_ttl, self.negative_max_size
+        if ttl <= 0 or max_size <= 0:
+            return entry
+        with self._lock:
+            entries[key_hash] = (self._clock() + ttl, entry)
+            entries.move_to_end(key_hash)
+            while len(entries) > max_size:
+                entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(key_hash, None)
+            self._invalid.pop(key_hash, None)
+
+    def invalidate_revoked(self, session: Session, now: Optional[datetime] = None) -> int:
+        """
+        Drop cached keys revoked on any replica. Only revocations within the
+        last TTL can still be cached. Returns entries dropped.
+        """
+        if not self._entries:
+            return 0
+        since = (now or datetime.utcnow()) - timedelta(seconds=self.ttl) - _REVOCATION_CLOCK_SKEW
+        hashes = session.exec(select(ApiKey.key_hash).where(ApiKey.revoked_at >= since)).all()
+        with self._lock:
+            dropped = sum(self._entries.pop(h, None) is not None for h in hashes)
+        if dropped:
+            metrics.inc("api_key_cache_revoked_total", dropped)
+        return dropped
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalid.clear()
+
+
+api_key_cache = ApiKeyCache()
@@ -0,0 +1,80 @@
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import bindparam, or_, update
+from sqlmodel import Session
+
+from apps.sentryml_core.models import ApiKey
+from apps.api.app import metrics
+
+
+API_KEY_USAGE_FLUSH_SECONDS = float(os.getenv("API_KEY_USAGE_FLUSH_SECONDS", "30"))
+
+_api_keys = ApiKey.__table__
+
+# Never moves last_used_at backwards when replicas flush out of order.
+_touch_stmt = (
+    update(_api_keys)
+    .where(_api_keys.c.key_id == bindparam("b_key_id"))
+    .where(
+        or_(
+            _api_keys.c.last_used_at == None,  # noqa: E711
+            _api_keys.c.last_used_at < bindparam("b_last_used_at"),
+        )
+    )
+    .values(last_used_at=bindparam("b_last_used_at"))
+)
+
+
+class ApiKeyUsageTracker:
+    """
+    Latest use of each API key, kept in process and written to
+    `api_keys.last_used_at` in one executemany UPDATE per flush, so
+    authenticated requests never write the (shared, hot) key row.
+    last_used_at trails real use by at most one flush interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._used: Dict[Any, datetime] = {}
+
+    def touch(self, key_id, used_at: datetime) -> None:
+        with self._lock:
+            last = self._used.get(key_id)
+            if last is None or used_at > last:
+                self._used[key_id] = used_at
+
+    def pending(self) -> int:
+        return len(self._used)
+
+    def flush(self, session: Session) -> int:
+        """Write all pending uses. Returns keys updated."""
+        with self._lock:
+            used, self._used = self._used, {}
+        if not used:
+            return 0
+
+        # Sorted so concurrent replicas take row locks in the same order.
+        params = [
+            {"b_key_id": key_id, "b_last_used_at": used_at}
+            for key_id, used_at in sorted(used.items(), key=lambda kv: str(kv[0]))
+        ]
+        try:
+            session.connection().execute(_touch_stmt, params)
+            session.commit()
+        except Exception:
+            for key_id, used_at in used.items():
+                self.touch(key_id, used_at)
+            metrics.inc("api_key_usage_flush_errors_total")
+            raise
+        metrics.inc("api_key_usage_flushes_total")
+        return len(params)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._used.clear()
+
+
+api_key_usage = ApiKeyUsageTracker()
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Run a sync callable every `interval` seconds in the threadpool for the
+    lifetime of the app. `stop` runs it one last time so pending work is
+    not lost on shutdown, unless `final_run` is off (polls whose result
+    dies with the process).
+    """
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float, final_run: bool = True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.final_run = final_run
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.final_run:
+            await run_in_threadpool(self.fn)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.fn)
+            except Exception:
+                logger.exception("periodic task %s failed", self.name)
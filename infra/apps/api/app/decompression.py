@@ -0,0 +1,163 @@
+"""
+ASGI middleware decompressing `Content-Encoding: gzip` / `zstd` request bodies.
+
+Bodies are decompressed chunk by chunk as the route reads them, so streaming
+ingest stays streaming. The decompressed size of one request is capped at
+`max_size` (413) to stop decompression bombs; corrupt or truncated data is a
+400 and an unsupported encoding a 415. Routes see a plain body without the
+Content-Encoding / Content-Length headers.
+
+zstd needs the optional `zstandard` package.
+"""
+import os
+import zlib
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.api.app import metrics
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+INGEST_MAX_DECOMPRESSED_BYTES = int(
+    os.getenv("INGEST_MAX_DECOMPRESSED_BYTES", str(256 * 1024 * 1024))
+)
+
+# Largest piece of output produced per decompress call.
+_OUTPUT_CHUNK = 64 * 1024
+# zstd's decompressobj has no output limit, so it is fed small pieces instead;
+# one piece expands to at most a few MiB before the cap is checked again.
+_ZSTD_INPUT_CHUNK = 256
+
+
+class _GzipDecoder:
+    def __init__(self):
+        self._d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            out = self._d.decompress(data, _OUTPUT_CHUNK)
+            if self._d.eof:
+                # Anything after the end is the next (concatenated) gzip member.
+                data = self._d.unused_data
+                if data:
+                    self._d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                data = self._d.unconsumed_tail
+            yield out
+
+    def finish(self) -> bytes:
+        if not self._d.eof:
+            raise zlib.error("truncated gzip stream")
+        return self._d.flush()
+
+
+class _ZstdDecoder:
+    def __init__(self):
+        self._d = zstandard.ZstdDecompressor().decompressobj(read_across_frames=True)
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        for i in range(0, len(data), _ZSTD_INPUT_CHUNK):
+            yield self._d.decompress(data[i:i + _ZSTD_INPUT_CHUNK])
+
+    def finish(self) -> bytes:
+        return self._d.flush()
+
+
+def _decoder(encoding: str):
+    if encoding == "gzip":
+        return _GzipDecoder()
+    if encoding == "zstd" and zstandard is not None:
+        return _ZstdDecoder()
+    return None
+
+
+def _decompress(decoder, body: bytes, last: bool) -> Iterator[bytes]:
+    yield from decoder.feed(body)
+    if last:
+        yield decoder.finish()
+
+
+def _decode_errors():
+    errors = (zlib.error,)
+    if zstandard is not None:
+        errors += (zstandard.ZstdError,)
+    return errors
+
+
+class RequestDecompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefix: str = "/v1/events/",
+        max_size: Optional[int] = None,
+    ):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                encoding = value.decode("latin-1").strip().lower()
+                if encoding == "x-gzip":
+                    encoding = "gzip"
+            elif name != b"content-length":
+                headers.append((name, value))
+        if encoding in (None, "", "identity"):
+            await self.app(scope, receive, send)
+            return
+
+        decoder = _decoder(encoding)
+        if decoder is None:
+            metrics.inc("ingest_decompression_rejected_total")
+            response = JSONResponse(
+                {"detail": f"Unsupported Content-Encoding: {encoding}"}, status_code=415
+            )
+            await response(scope, receive, send)
+            return
+
+        metrics.inc(f"ingest_{encoding}_requests_total")
+        decode_errors = _decode_errors()
+        max_size = INGEST_MAX_DECOMPRESSED_BYTES if self.max_size is None else self.max_size
+        total = 0
+
+        async def receive_decompressed() -> Message:
+            nonlocal total
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            metrics.inc("ingest_compressed_bytes_total", len(body))
+            parts = []
+            try:
+                for out in _decompress(decoder, body, last=not more_body):
+                    total += len(out)
+                    if total > max_size:
+                        metrics.inc("ingest_decompression_rejected_total")
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Decompressed body exceeds {max_size} bytes",
+                        )
+                    parts.append(out)
+            except decode_errors:
+                metrics.inc("ingest_decompression_rejected_total")
+                raise HTTPException(status_code=400, detail=f"Invalid {encoding} body")
+            out = b"".join(parts)
+            metrics.inc("ingest_decompressed_bytes_total", len(out))
+            return {"type": "http.request", "body": out, "more_body": more_body}
+
+        await self.app(dict(scope, headers=headers), receive_decompressed, send)
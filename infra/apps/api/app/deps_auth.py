@@ -1,30 +1,62 @@
 from datetime import datetime
+from uuid import UUID
 from fastapi import Cookie, Depends, HTTPException
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from apps.sentryml_core.db import get_session
+from apps.sentryml_core.db import get_async_session, get_session
 from apps.sentryml_core.models import SessionToken, User
+from apps.api.app.session_cache import session_cache
 
 
-def get_current_user(
-    sentryml_session: str | None = Cookie(default=None),
-    session: Session = Depends(get_session),
-) -> User:
-    if not sentryml_session:
+def _session_id(cookie: str | None) -> UUID:
+    if not cookie:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        return UUID(cookie)
+    except ValueError:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    token = session.exec(
-        select(SessionToken).where(SessionToken.session_id == sentryml_session)
-    ).first()
-    if not token:
+
+def _session_query(session_id: UUID):
+    # Session and user in one round trip.
+    return (
+        select(SessionToken, User)
+        .join(User, User.user_id == SessionToken.user_id)
+        .where(SessionToken.session_id == session_id)
+    )
+
+
+def _check_session(session_id: UUID, row) -> User:
+    if not row:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    token, user = row
     if token.revoked_at is not None:
         raise HTTPException(status_code=401, detail="Not authenticated")
     if token.expires_at <= datetime.utcnow():
         raise HTTPException(status_code=401, detail="Session expired")
+    session_cache.put(session_id, user, token.expires_at)
+    return user
 
-    user = session.exec(select(User).where(User.user_id == token.user_id)).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
 
-    return user
+def get_current_user(
+    sentryml_session: str | None = Cookie(default=None),
+    session: Session = Depends(get_session),
+) -> User:
+    session_id = _session_id(sentryml_session)
+    user = session_cache.get(session_id)
+    if user is not None:
+        return user
+    return _check_session(session_id, session.exec(_session_query(session_id)).first())
+
+
+async def get_current_user_async(
+    sentryml_session: str | None = Cookie(default=None),
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    session_id = _session_id(sentryml_session)
+    user = session_cache.get(session_id)
+    if user is not None:
+        return user
+    result = await session.exec(_session_query(session_id))
+    return _check_session(session_id, result.first())
@@ -0,0 +1,219 @@
+"""
+Binary columnar frame for batch ingest (`Content-Type: application/x-sentryml-frame`).
+
+A frame carries a batch as parallel arrays, decoded with `array.frombytes`
+straight into bulk-insert rows without JSON parsing or per-event Pydantic
+models. All integers and floats are little-endian.
+
+    header        "<4sBBHII": magic b"SMLF", version 1, flags, reserved 0,
+                  n_events, n_models
+    models        n_models x ("<H" byte length + UTF-8 model_id)
+    model_index   n_events x uint32, index into models
+    score         n_events x float64
+    event_time    n_events x int64, microseconds since the Unix epoch (UTC)
+    entity_id     (n_events + 1) x uint32 byte offsets, then the UTF-8 blob
+    prediction    only if flags & FLAG_PREDICTION:
+                  n_events x uint8 (1 = null), offsets and blob as entity_id
+
+Per-event problems (bad model index, invalid UTF-8, non-finite score,
+out-of-range time) are
+reported like JSON validation errors; a frame that cannot be parsed at all
+(including string offsets that start past 0 or go backwards) raises
+FrameError.
+"""
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from apps.sentryml_core.ids import uuid7
+from apps.sentryml_core.schemas import IngestItemError
+
+
+FRAME_CONTENT_TYPE = "application/x-sentryml-frame"
+FRAME_MAGIC = b"SMLF"
+FRAME_VERSION = 1
+FLAG_PREDICTION = 0x01
+
+_HEADER = struct.Struct("<4sBBHII")
+_MODEL_LEN = struct.Struct("<H")
+_EPOCH = datetime(1970, 1, 1)
+_SWAP = sys.byteorder != "little"
+
+for _code, _size in (("I", 4), ("d", 8), ("q", 8), ("B", 1)):
+    assert array(_code).itemsize == _size, f"array('{_code}') is not {_size} bytes"
+
+
+class FrameError(ValueError):
+    """The frame is malformed as a whole."""
+
+
+class FrameTooLarge(FrameError):
+    pass
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self._view = memoryview(data)
+        self.pos = 0
+
+    def take(self, size: int) -> memoryview:
+        end = self.pos + size
+        if end > len(self._view):
+            raise FrameError("Frame truncated")
+        chunk = self._view[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def array(self, typecode: str, count: int) -> array:
+        out = array(typecode)
+        out.frombytes(self.take(count * out.itemsize))
+        if _SWAP:
+            out.byteswap()
+        return out
+
+    def strings(self, count: int) -> Tuple[array, bytes]:
+        """Offsets and blob of a string column. The blob is exactly offsets[-1] bytes."""
+        offsets = self.array("I", count + 1)
+        if offsets[0] != 0:
+            raise FrameError("String offsets must start at 0")
+        if any(a > b for a, b in zip(offsets, offsets[1:])):
+            raise FrameError("String offsets must not decrease")
+        return offsets, bytes(self.take(offsets[-1]))
+
+
+def _string(offsets: array, blob: bytes, i: int) -> Optional[str]:
+    try:
+        return blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _error(idx: int, field: str, kind: str, msg: str) -> IngestItemError:
+    return IngestItemError(index=idx, errors=[{"type": kind, "loc": [field], "msg": msg}])
+
+
+def decode_frame(
+    data: bytes,
+    org_id,
+    ingested_at: datetime,
+    max_events: int,
+) -> Tuple[List[Dict[str, Any]], List[IngestItemError]]:
+    """
+    Decode a frame into event rows shaped like ingest.event_row plus per-event
+    errors. Future event times are clamped to now, as in PredictionEventIn.
+    """
+    reader = _Reader(data)
+    magic, version, flags, _, n, n_models = _HEADER.unpack(reader.take(_HEADER.size))
+    if magic != FRAME_MAGIC:
+        raise FrameError("Not a SentryML frame")
+    if version != FRAME_VERSION:
+        raise FrameError(f"Unsupported frame version {version}")
+    if n > max_events:
+        raise FrameTooLarge(f"Batch too large (max {max_events} events)")
+
+    models: List[Optional[str]] = []
+    for _ in range(n_models):
+        (length,) = _MODEL_LEN.unpack(reader.take(_MODEL_LEN.size))
+        try:
+            models.append(bytes(reader.take(length)).decode("utf-8"))
+        except UnicodeDecodeError:
+            models.append(None)
+
+    model_index = reader.array("I", n)
+    scores = reader.array("d", n)
+    times = reader.array("q", n)
+    entity_offsets, entity_blob = reader.strings(n)
+    has_prediction = bool(flags & FLAG_PREDICTION)
+    if has_prediction:
+        prediction_null = reader.array("B", n)
+        prediction_offsets, prediction_blob = reader.strings(n)
+    if reader.pos != len(data):
+        raise FrameError("Trailing bytes after frame")
+
+    now_us = (datetime.now(timezone.utc).replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1)
+    rows: List[Dict[str, Any]] = []
+    errors: List[IngestItemError] = []
+    for i in range(n):
+        m = model_index[i]
+        if m >= n_models or models[m] is None:
+            errors.append(_error(i, "model_id", "model_index", "Model index out of range or not valid UTF-8"))
+            continue
+        if not math.isfinite(scores[i]):
+            errors.append(_error(i, "score", "finite_number", "Input should be a finite number"))
+            continue
+        entity_id = _string(entity_offsets, entity_blob, i)
+        prediction = None
+        if has_prediction and not prediction_null[i]:
+            prediction = _string(prediction_offsets, prediction_blob, i)
+            if prediction is None:
+                errors.append(_error(i, "prediction", "string_unicode", "Invalid UTF-8"))
+                continue
+        if entity_id is None:
+            errors.append(_error(i, "entity_id", "string_unicode", "Invalid UTF-8"))
+            continue
+        try:
+            event_time = _EPOCH + timedelta(microseconds=min(times[i], now_us))
+        except OverflowError:
+            errors.append(_error(i, "event_time", "datetime_range", "Event time out of range"))
+            continue
+        rows.append({
+            "event_id": uuid7(),
+            "org_id": org_id,
+            "model_id": models[m],
+            "entity_id": entity_id,
+            "score": scores[i],
+            "prediction": prediction,
+            "event_time": event_time,
+            "ingested_at": ingested_at,
+        })
+    return rows, errors
+
+
+def _encode_strings(values: Sequence[str]) -> bytes:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = array("I", [0])
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    if _SWAP:
+        offsets.byteswap()
+    return offsets.tobytes() + b"".join(encoded)
+
+
+def _le(a: array) -> bytes:
+    if _SWAP:
+        a.byteswap()
+    return a.tobytes()
+
+
+def encode_frame(events: Sequence[Dict[str, Any]]) -> bytes:
+    """
+    Encode events (dicts with model_id, entity_id, score, event_time and
+    optional prediction; naive datetimes are taken as UTC). Reference encoder
+    for clients, tests and benchmarks.
+    """
+    model_ids: Dict[str, int] = {}
+    for e in events:
+        model_ids.setdefault(e["model_id"], len(model_ids))
+    predictions = [e.get("prediction") for e in events]
+    flags = FLAG_PREDICTION if any(p is not None for p in predictions) else 0
+
+    def micros(ts: datetime) -> int:
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        return (ts - _EPOCH) // timedelta(microseconds=1)
+
+    parts = [_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, flags, 0, len(events), len(model_ids))]
+    for model_id in model_ids:
+        raw = model_id.encode("utf-8")
+        parts.append(_MODEL_LEN.pack(len(raw)) + raw)
+    parts.append(_le(array("I", [model_ids[e["model_id"]] for e in events])))
+    parts.append(_le(array("d", [float(e["score"]) for e in events])))
+    parts.append(_le(array("q", [micros(e["event_time"]) for e in events])))
+    parts.append(_encode_strings([e["entity_id"] for e in events]))
+    if flags & FLAG_PREDICTION:
+        parts.append(array("B", [p is None for p in predictions]).tobytes())
+        parts.append(_encode_strings([p or "" for p in predictions]))
+    return b"".join(parts)
@@ -0,0 +1,204 @@
+import json
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from apps.sentryml_core.db import db_utcnow, dialect_insert
+from apps.sentryml_core.ids import uuid7
+from apps.sentryml_core.model_keys import assign_model_keys
+from apps.sentryml_core.models import PredictionEvent, ModelRegistry, MonitorConfig
+from apps.sentryml_core.schemas import PredictionEventIn, IngestItemError
+from apps.api.app.model_stats import model_stats, queue_model_stats
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Return naive UTC datetime (matches DB storage)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def validate_events(
+    items: Sequence[Any],
+    indexes: Optional[Sequence[int]] = None,
+) -> Tuple[List[PredictionEventIn], List[IngestItemError]]:
+    """
+    Validate raw items one by one so a bad row only rejects itself.
+    `indexes` overrides the reported position of each item (e.g. NDJSON line numbers).
+    """
+    valid: List[PredictionEventIn] = []
+    errors: List[IngestItemError] = []
+    for i, item in enumerate(items):
+        try:
+            valid.append(PredictionEventIn.model_validate(item))
+        except ValidationError as e:
+            errors.append(
+                IngestItemError(
+                    index=indexes[i] if indexes is not None else i,
+                    errors=e.errors(include_url=False, include_context=False, include_input=False),
+                )
+            )
+    return valid, errors
+
+
+def event_row(org_id, payload: PredictionEventIn, ingested_at: datetime) -> Dict[str, Any]:
+    return {
+        "event_id": uuid7(),
+        "org_id": org_id,
+        "model_id": payload.model_id,
+        "entity_id": payload.entity_id,
+        "score": payload.score,
+        "prediction": payload.prediction,
+        "event_time": naive_utc(payload.event_time),
+        "ingested_at": ingested_at,
+    }
+
+
+def register_models(session: Session, org_id, counts: Dict[str, int], now: datetime) -> None:
+    """
+    Register unseen models (with a default, disabled MonitorConfig) and queue
+    per-model count deltas. Registration is an idempotent INSERT ... ON CONFLICT
+    DO NOTHING, so concurrent first events for a new model cannot collide.
+    Known models cost no query here; their event_count/last_seen_at are folded
+    in later by model_stats.
+    """
+    if not counts:
+        return
+    unknown = [m for m in counts if not model_stats.is_known(org_id, m)]
+    if unknown:
+        insert_stmt = dialect_insert(session)
+        session.execute(
+            insert_stmt(ModelRegistry.__table__).on_conflict_do_nothing(
+                index_elements=["org_id", "model_id"]
+            ),
+            [
+                {
+                    "org_id": org_id,
+                    "model_id": model_id,
+                    "first_seen_at": now,
+                    "last_seen_at": now,
+                    "event_count": 0,
+                    "is_deleted": False,
+                    "deleted_at": None,
+                }
+                for model_id in unknown
+            ],
+        )
+        session.execute(
+            insert_stmt(MonitorConfig.__table__).on_conflict_do_nothing(
+                index_elements=["org_id", "model_id"]
+            ),
+            [
+                MonitorConfig(org_id=org_id, model_id=model_id, created_at=now, updated_at=now).model_dump()
+                for model_id in unknown
+            ],
+        )
+    queue_model_stats(session, org_id, counts, now)
+
+
+def write_rows(session: Session, rows: Sequence[Dict[str, Any]]) -> int:
+    """
+    Bulk-insert prepared event rows (as built by event_row) in a single
+    executemany, storing each (org_id, model_id) as its model_key, and
+    register their models once per distinct model_id. Rows may span several
+    orgs. The caller owns the commit.
+
+    The stored ingested_at is stamped by the database as each row is inserted,
+    not taken from the row (which says when the API accepted the event): rows
+    retried from the ingest buffer must not look older than they are to the
+    rollup aggregator (see sentryml_core.rollups).
+    """
+    if not rows:
+        return 0
+    counts: Dict[Any, Dict[str, int]] = {}
+    for r in rows:
+        per_org = counts.setdefault(r["org_id"], {})
+        per_org[r["model_id"]] = per_org.get(r["model_id"], 0) + 1
+    keys = {
+        org_id: assign_model_keys(session, org_id, per_model)
+        for org_id, per_model in counts.items()
+    }
+
+    session.execute(insert(PredictionEvent).values(ingested_at=db_utcnow()), [
+        {
+            "event_id": r["event_id"],
+            "model_key": keys[r["org_id"]][r["model_id"]],
+            "entity_id": r["entity_id"],
+            "score": r["score"],
+            "prediction": r["prediction"],
+            "event_time": r["event_time"],
+        }
+        for r in rows
+    ])
+
+    now = datetime.utcnow()
+    for org_id, per_model in counts.items():
+        register_models(session, org_id, per_model, now)
+    return len(rows)
+
+
+def write_events(session: Session, org_id, payloads: Sequence[PredictionEventIn]) -> int:
+    now = datetime.utcnow()
+    return write_rows(session, [event_row(org_id, p, now) for p in payloads])
+
+
+def _line_too_long(idx: int, max_line_bytes: int) -> IngestItemError:
+    return IngestItemError(
+        index=idx,
+        errors=[{"type": "line_too_long", "loc": [], "msg": f"Line exceeds {max_line_bytes} bytes"}],
+    )
+
+
+async def iter_ndjson(
+    stream: AsyncIterator[bytes],
+    max_line_bytes: int,
+) -> AsyncIterator[Tuple[int, Any, Optional[IngestItemError]]]:
+    """
+    Incrementally split a byte stream into NDJSON lines and parse them.
+    Yields (line_index, obj, error); only one partial line is ever buffered,
+    and lines longer than `max_line_bytes` are skipped and reported.
+    """
+    buf = bytearray()
+    line_no = 0
+    skipping = False
+
+    def parse(raw: bytes, idx: int):
+        try:
+            return idx, json.loads(raw), None
+        except ValueError as e:
+            return idx, None, IngestItemError(
+                index=idx,
+                errors=[{"type": "json_invalid", "loc": [], "msg": str(e)}],
+            )
+
+    async for chunk in stream:
+        buf.extend(chunk)
+        start = 0
+        while True:
+            nl = buf.find(b"\n", start)
+            if nl < 0:
+                break
+            raw = bytes(buf[start:nl])
+            start = nl + 1
+            idx = line_no
+            line_no += 1
+            if skipping:
+                skipping = False
+                continue
+            if len(raw) > max_line_bytes:
+                yield idx, None, _line_too_long(idx, max_line_bytes)
+            elif raw.strip():
+                yield parse(raw, idx)
+        del buf[:start]
+
+        if not skipping and len(buf) > max_line_bytes:
+            yield line_no, None, _line_too_long(line_no, max_line_bytes)
+            skipping = True
+        if skipping:
+            buf.clear()
+
+    if buf.strip() and not skipping:
+        yield parse(bytes(buf), line_no)
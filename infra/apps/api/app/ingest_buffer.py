@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlmodel import Session
+
+from apps.sentryml_core.db import engine
+from apps.api.app import metrics
+from apps.api.app.ingest import write_rows
+
+
+logger = logging.getLogger(__name__)
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Errors that say nothing about the rows: the database is down, locked or deadlocked."""
+    return isinstance(exc, OperationalError) or (isinstance(exc, DBAPIError) and exc.connection_invalidated)
+
+
+class BufferFull(Exception):
+    pass
+
+
+class IngestBuffer:
+    """
+    Write-behind buffer for prediction events.
+
+    Handlers append prepared rows with `put` and return immediately; a
+    background task flushes them to the database when `flush_rows` rows are
+    pending or every `flush_interval` seconds, whichever comes first.
+    `put` raises BufferFull once `max_rows` rows are pending (backpressure).
+
+    A batch that fails is put back and retried. Transient database errors are
+    retried for as long as they last; any other error is retried `max_retries`
+    times, then the batch is bisected so the rows that still fail on their own
+    are dropped (counted in ingest_buffer_dropped_rows_total and logged)
+    instead of blocking everything behind them.
+    """
+
+    def __init__(
+        self,
+        flush_rows: int = 5000,
+        flush_interval: float = 0.25,
+        max_rows: int = 100_000,
+        max_retries: int = 3,
+        session_factory: Callable[[], Session] = lambda: Session(engine),
+    ):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_retries = max_retries
+        self.session_factory = session_factory
+
+        self._rows: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._failures = 0
+
+    @classmethod
+    def from_env(cls) -> "IngestBuffer":
+        return cls(
+            flush_rows=int(os.getenv("INGEST_BUFFER_FLUSH_ROWS", "5000")),
+            flush_interval=int(os.getenv("INGEST_BUFFER_FLUSH_MS", "250")) / 1000,
+            max_rows=int(os.getenv("INGEST_BUFFER_MAX_ROWS", "100000")),
+            max_retries=int(os.getenv("INGEST_BUFFER_MAX_RETRIES", "3")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def put(self, row: Dict[str, Any]) -> None:
+        """Thread-safe; called from sync handlers running in the threadpool."""
+        with self._lock:
+            if self._stopping or len(self._rows) >= self.max_rows:
+                metrics.inc("ingest_buffer_rejected_total")
+                raise BufferFull()
+            self._rows.append(row)
+            pending = len(self._rows)
+        metrics.inc("ingest_buffer_enqueued_total")
+        metrics.set_gauge("ingest_buffer_pending", pending)
+        if pending >= self.flush_rows and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def flush_once(self) -> int:
+        """Write up to `flush_rows` pending rows in one transaction. Returns rows written."""
+        with self._lock:
+            batch: List[Dict[str, Any]] = [
+                self._rows.popleft() for _ in range(min(self.flush_rows, len(self._rows)))
+            ]
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            self._write(batch)
+            written = len(batch)
+        except Exception as exc:
+            metrics.inc("ingest_buffer_flush_errors_total")
+            if not _is_transient(exc):
+                self._failures += 1
+            if _is_transient(exc) or self._failures < self.max_retries:
+                # Put the rows back in order and retry on the next tick.
+                self._requeue(batch)
+                raise
+            written = self._write_isolating(batch)
+        self._failures = 0
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        metrics.inc("ingest_buffer_flushes_total")
+        metrics.inc("ingest_buffer_flushed_rows_total", written)
+        metrics.set_gauge("ingest_buffer_last_flush_rows", written)
+        metrics.set_gauge("ingest_buffer_last_flush_ms", elapsed_ms)
+        metrics.set_gauge("ingest_buffer_pending", len(self._rows))
+        return written
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        with self.session_factory() as session:
+            write_rows(session, rows)
+            session.commit()
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._rows.extendleft(reversed(rows))
+
+    def _write_isolating(self, batch: List[Dict[str, Any]]) -> int:
+        """Write `batch` in halves, recursively, dropping single rows that still fail. Returns rows written."""
+        written = 0
+        parts = [batch]
+        while parts:
+            rows = parts.pop()
+            try:
+                self._write(rows)
+                written += len(rows)
+            except Exception as exc:
+                if _is_transient(exc):
+                    # Not the rows' fault after all: keep what is left for later.
+                    self._requeue(rows + [r for part in reversed(parts) for r in part])
+                    metrics.inc("ingest_buffer_flushed_rows_total", written)
+                    raise
+                if len(rows) == 1:
+                    metrics.inc("ingest_buffer_dropped_rows_total")
+                    logger.error(
+                        "ingest buffer dropped event %s (model %s): %s",
+                        rows[0].get("event_id"), rows[0].get("model_id"), exc,
+                    )
+                    continue
+                mid = len(rows) // 2
+                parts.extend((rows[mid:], rows[:mid]))
+        return written
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop accepting rows and drain everything still pending."""
+        with self._lock:
+            self._stopping = True
+        if self._task is not None:
+            # Let an in-flight flush finish rather than cancelling it: its
+            # thread would keep running and race the drain below.
+            self._wake.set()
+            await self._task
+            self._task = None
+        while self._rows:
+            await run_in_threadpool(self.flush_once)
+
+    async def _sleep(self) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await self._sleep()
+            try:
+                while not self._stopping and await run_in_threadpool(self.flush_once) >= self.flush_rows:
+                    pass
+            except Exception:
+                logger.exception("ingest buffer flush failed")
+                # Back off; stop() still wakes us immediately.
+                await self._sleep()
@@ -1,16 +1,37 @@
-from fastapi import FastAPI, Depends, HTTPException
+import json
+import logging
+import os
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime
-from typing import List, Dict
+from typing import Any, List, Dict
 
-from apps.sentryml_core.db import engine, get_session
-from apps.sentryml_core.models import (PredictionEvent, ModelRegistry,
+from apps.sentryml_core.db import (engine, get_session, get_async_session,
+                                   dispose_async_engine)
+from apps.sentryml_core.models import (ModelRegistry,
                                   MonitorConfig, DriftResult,
                                   Incident, AlertRoute, User, SessionToken)
-from apps.sentryml_core.schemas import (PredictionEventIn, ModelItem,
-                                   MonitorUpdate, SlackRouteIn)
-from apps.api.app.security import (get_org_id, verify_password)
+from apps.sentryml_core.schemas import (PredictionEventIn, PredictionEventOut, ModelItem,
+                                   MonitorUpdate, SlackRouteIn,
+                                   BatchIngestResult, ChunkIngestResult,
+                                   StreamIngestResult)
+from apps.api.app.security import (get_org_id, get_org_id_async, verify_password,
+                                   require_metrics_token)
+from apps.api.app.ingest import (validate_events, write_events, write_rows,
+                                 iter_ndjson, event_row)
+from apps.api.app.model_stats import model_stats, MODEL_STATS_FLUSH_SECONDS
+from apps.api.app.api_key_usage import api_key_usage, API_KEY_USAGE_FLUSH_SECONDS
+from apps.api.app.api_key_cache import api_key_cache, API_KEY_REVOCATION_POLL_SECONDS
+from apps.api.app.session_cache import session_cache, UI_SESSION_REVOCATION_POLL_SECONDS
+from apps.api.app.background import PeriodicTask
+from apps.api.app.ingest_buffer import IngestBuffer, BufferFull
+from apps.api.app.decompression import RequestDecompressionMiddleware
+from apps.api.app.rate_limit import BodyCostMiddleware
+from apps.api.app.frames import FRAME_CONTENT_TYPE, FrameError, FrameTooLarge, decode_frame
+from apps.api.app import metrics
 from apps.api.app.routers.auth import router as auth_router
 from apps.api.app.routers.api_keys import router as api_keys_router
 from apps.api.app.routers.ui_dashboard import router as ui_dashboard_router
@@ -19,12 +40,91 @@ from apps.api.app.routers.ui_incidents import router as ui_incidents_router
 from apps.api.app.routers.ui_settings import router as ui_settings_router
 
 
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_MAX_EVENTS = int(os.getenv("INGEST_BATCH_MAX_EVENTS", "10000"))
+INGEST_STREAM_CHUNK_SIZE = int(os.getenv("INGEST_STREAM_CHUNK_SIZE", "5000"))
+INGEST_STREAM_MAX_LINE_BYTES = int(os.getenv("INGEST_STREAM_MAX_LINE_BYTES", str(64 * 1024)))
+INGEST_STREAM_MAX_ERRORS_PER_CHUNK = 100
+
+# INGEST_MODE=buffered: single-event ingest is acknowledged with 202 and
+# written behind by a background flusher (see ingest_buffer.IngestBuffer).
+ingest_buffer = (
+    IngestBuffer.from_env() if os.getenv("INGEST_MODE", "sync") == "buffered" else None
+)
+
+
+
+def flush_model_stats() -> None:
+    with Session(engine) as session:
+        model_stats.flush(session)
+
+
+model_stats_task = PeriodicTask("model_stats", flush_model_stats, MODEL_STATS_FLUSH_SECONDS)
+
+
+def flush_api_key_usage() -> None:
+    with Session(engine) as session:
+        api_key_usage.flush(session)
+
+
+api_key_usage_task = PeriodicTask("api_key_usage", flush_api_key_usage, API_KEY_USAGE_FLUSH_SECONDS)
+
+
+def poll_api_key_revocations() -> None:
+    with Session(engine) as session:
+        api_key_cache.invalidate_revoked(session)
+
+
+# Revocations on other replicas; off (TTL expiry only) when the interval is 0.
+api_key_revocation_task = (
+    PeriodicTask("api_key_revocations", poll_api_key_revocations, API_KEY_REVOCATION_POLL_SECONDS,
+                 final_run=False)
+    if API_KEY_REVOCATION_POLL_SECONDS > 0 else None
+)
+
+
+def poll_ui_session_revocations() -> None:
+    with Session(engine) as session:
+        session_cache.invalidate_revoked(session)
+
+
+ui_session_revocation_task = (
+    PeriodicTask("ui_session_revocations", poll_ui_session_revocations, UI_SESSION_REVOCATION_POLL_SECONDS,
+                 final_run=False)
+    if UI_SESSION_REVOCATION_POLL_SECONDS > 0 else None
+)
+
 
 @asynccontextmanager
 async def lifespane(app: FastAPI):
     # start up
     SQLModel.metadata.create_all(engine)
+    if ingest_buffer is not None:
+        await ingest_buffer.start()
+    await model_stats_task.start()
+    await api_key_usage_task.start()
+    if api_key_revocation_task is not None:
+        await api_key_revocation_task.start()
+    if ui_session_revocation_task is not None:
+        await ui_session_revocation_task.start()
     yield
+    # shut down: one failing step must not skip the others
+    steps = [
+        ("ingest_buffer", ingest_buffer),
+        ("model_stats", model_stats_task),
+        ("api_key_usage", api_key_usage_task),
+        ("api_key_revocations", api_key_revocation_task),
+        ("ui_session_revocations", ui_session_revocation_task),
+    ]
+    for name, step in steps:
+        if step is None:
+            continue
+        try:
+            await step.stop()
+        except Exception:
+            logger.exception("failed to stop %s", name)
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -32,6 +132,10 @@ app = FastAPI(
     lifespan=lifespane
 )
 
+# Added first, so it runs inside decompression and counts decompressed bytes.
+app.add_middleware(BodyCostMiddleware)
+app.add_middleware(RequestDecompressionMiddleware)
+
 app.include_router(auth_router)
 app.include_router(api_keys_router)
 app.include_router(ui_dashboard_router)
@@ -40,40 +144,147 @@ app.include_router(ui_incidents_router)
 app.include_router(ui_settings_router)
 
 
-@app.post("/v1/events/prediction", response_model=PredictionEvent)
-def ingest_predication(
+@app.post("/v1/events/prediction", response_model=PredictionEventOut)
+async def ingest_predication(
     payload: PredictionEventIn,
-    org_id = Depends(get_org_id),
-    session: Session = Depends(get_session)
+    response: Response,
+    org_id = Depends(get_org_id_async),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    event = PredictionEvent(
-        org_id=org_id,
-        model_id=payload.model_id,
-        entity_id=payload.entity_id,
-        score=payload.score,
-        prediction=payload.prediction,
-        event_time=payload.event_time
-    )
-    session.add(event)
-    model = session.get(ModelRegistry, (org_id, payload.model_id))
-    if model:
-        model.last_seen_at = datetime.utcnow()
-        model.event_count += 1
-    else:
-        session.add(ModelRegistry(
-            org_id=org_id,
-            model_id=payload.model_id,
-            first_seen_at=datetime.utcnow(),
-            last_seen_at=datetime.utcnow(),
-            event_count=1
-        ))
-        session.add(MonitorConfig(
-            org_id=org_id,
-            model_id=payload.model_id
-        ))
-    session.commit()
-    session.refresh(event)
-    return event
+    row = event_row(org_id, payload, datetime.utcnow())
+    if ingest_buffer is not None:
+        try:
+            ingest_buffer.put(row)
+        except BufferFull:
+            raise HTTPException(
+                status_code=429,
+                detail="Ingest buffer full, retry later",
+                headers={"Retry-After": "1"},
+            )
+        response.status_code = 202
+        return PredictionEventOut(**row)
+
+    await session.run_sync(write_rows, [row])
+    await session.commit()
+    return PredictionEventOut(**row)
+
+
+async def read_batch_body(request: Request):
+    """
+    Raw frame bytes for FRAME_CONTENT_TYPE, otherwise the parsed JSON array.
+    Read here rather than via Body() so a frame never goes through JSON parsing.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == FRAME_CONTENT_TYPE:
+        return body
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body is not valid JSON")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=422, detail="Body must be a JSON array of events")
+    return payload
+
+
+@app.post(
+    "/v1/events/prediction:batch",
+    response_model=BatchIngestResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": PredictionEventIn.model_json_schema()},
+                },
+                FRAME_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
+)
+async def ingest_prediction_batch(
+    org_id = Depends(get_org_id_async),
+    payload = Depends(read_batch_body),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Decoding and validating up to INGEST_BATCH_MAX_EVENTS is CPU work;
+    # it runs in the threadpool so it does not stall the event loop.
+    if isinstance(payload, bytes):
+        try:
+            rows, errors = await run_in_threadpool(
+                decode_frame, payload, org_id, datetime.utcnow(), INGEST_BATCH_MAX_EVENTS
+            )
+        except FrameTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except FrameError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        accepted = await session.run_sync(write_rows, rows)
+        await session.commit()
+        return BatchIngestResult(accepted=accepted, rejected=len(errors), errors=errors)
+
+    if len(payload) > INGEST_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {INGEST_BATCH_MAX_EVENTS} events)",
+        )
+
+    valid, errors = await run_in_threadpool(validate_events, payload)
+    accepted = await session.run_sync(write_events, org_id, valid)
+    await session.commit()
+    return BatchIngestResult(accepted=accepted, rejected=len(errors), errors=errors)
+
+
+@app.post("/v1/events/prediction:stream", response_model=StreamIngestResult)
+async def ingest_prediction_stream(
+    request: Request,
+    org_id = Depends(get_org_id_async),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    NDJSON body, one event per line. Lines are parsed as they arrive and
+    flushed in chunks of INGEST_STREAM_CHUNK_SIZE, so memory stays bounded
+    by one chunk regardless of upload size.
+    """
+    result = StreamIngestResult(accepted=0, rejected=0, chunks=[])
+    items: List[Any] = []
+    indexes: List[int] = []
+    parse_errors = []
+
+    async def flush():
+        valid, errors = await run_in_threadpool(validate_events, items, indexes)
+        accepted = await session.run_sync(write_events, org_id, valid)
+        await session.commit()
+        errors = sorted(parse_errors + errors, key=lambda e: e.index)
+        chunk = ChunkIngestResult(
+            chunk=len(result.chunks),
+            accepted=accepted,
+            rejected=len(errors),
+            errors=errors[:INGEST_STREAM_MAX_ERRORS_PER_CHUNK],
+        )
+        result.chunks.append(chunk)
+        result.accepted += chunk.accepted
+        result.rejected += chunk.rejected
+        items.clear()
+        indexes.clear()
+        parse_errors.clear()
+
+    async for idx, obj, error in iter_ndjson(request.stream(), INGEST_STREAM_MAX_LINE_BYTES):
+        if error is not None:
+            parse_errors.append(error)
+        else:
+            items.append(obj)
+            indexes.append(idx)
+        if len(items) + len(parse_errors) >= INGEST_STREAM_CHUNK_SIZE:
+            await flush()
+
+    if items or parse_errors:
+        await flush()
+    return result
+
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+def get_metrics():
+    return metrics.snapshot()
 
 
 @app.get("/v1/models", response_model=List[ModelItem])
@@ -0,0 +1,134 @@
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Set, Tuple
+
+from sqlalchemy import case, event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session
+
+from apps.sentryml_core.db import dialect_insert
+from apps.sentryml_core.models import ModelRegistry
+from apps.api.app import metrics
+
+
+MODEL_STATS_FLUSH_SECONDS = float(os.getenv("MODEL_STATS_FLUSH_SECONDS", "5"))
+
+ModelKey = Tuple[Any, str]  # (org_id, model_id)
+
+_models = ModelRegistry.__table__
+
+
+def _fold_stmt(session: Session):
+    """
+    INSERT ... ON CONFLICT DO UPDATE adding the delta to event_count and
+    keeping the latest last_seen_at. Inserts the row if registration was lost.
+    """
+    stmt = dialect_insert(session)(_models)
+    return stmt.on_conflict_do_update(
+        index_elements=["org_id", "model_id"],
+        set_={
+            "event_count": _models.c.event_count + stmt.excluded.event_count,
+            "last_seen_at": case(
+                (_models.c.last_seen_at < stmt.excluded.last_seen_at, stmt.excluded.last_seen_at),
+                else_=_models.c.last_seen_at,
+            ),
+        },
+    )
+
+
+class ModelStatsAccumulator:
+    """
+    Per-model event_count / last_seen_at deltas accumulated in process and
+    folded into `models` periodically, so ingest never updates the hot
+    registry row. Folds are additive, so several API replicas can flush
+    independently. Counts in `models` trail ingest by at most one flush
+    interval.
+
+    Also remembers which models are known to be registered so ingest can
+    skip the registration upsert for them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deltas: Dict[ModelKey, list] = {}
+        self._known: Set[ModelKey] = set()
+
+    def is_known(self, org_id, model_id: str) -> bool:
+        return (org_id, model_id) in self._known
+
+    def mark_known(self, org_id, model_id: str) -> None:
+        self._known.add((org_id, model_id))
+
+    def record(self, org_id, model_id: str, count: int, seen_at: datetime) -> None:
+        with self._lock:
+            delta = self._deltas.get((org_id, model_id))
+            if delta is None:
+                self._deltas[(org_id, model_id)] = [count, seen_at]
+            else:
+                delta[0] += count
+                delta[1] = max(delta[1], seen_at)
+
+    def pending(self) -> int:
+        return len(self._deltas)
+
+    def flush(self, session: Session) -> int:
+        """Fold all pending deltas in one executemany upsert. Returns models updated."""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        if not deltas:
+            return 0
+
+        # Sorted so concurrent replicas take row locks in the same order.
+        params = [
+            {
+                "org_id": org_id,
+                "model_id": model_id,
+                "first_seen_at": seen_at,
+                "last_seen_at": seen_at,
+                "event_count": count,
+                "is_deleted": False,
+                "deleted_at": None,
+            }
+            for (org_id, model_id), (count, seen_at) in sorted(
+                deltas.items(), key=lambda kv: (str(kv[0][0]), kv[0][1])
+            )
+        ]
+        try:
+            session.connection().execute(_fold_stmt(session), params)
+            session.commit()
+        except Exception:
+            for (org_id, model_id), (count, seen_at) in deltas.items():
+                self.record(org_id, model_id, count, seen_at)
+            metrics.inc("model_stats_flush_errors_total")
+            raise
+        metrics.inc("model_stats_flushes_total")
+        metrics.inc("model_stats_folded_models_total", len(params))
+        return len(params)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._deltas.clear()
+            self._known.clear()
+
+
+model_stats = ModelStatsAccumulator()
+
+
+def queue_model_stats(session: Session, org_id, counts: Dict[str, int], seen_at: datetime) -> None:
+    """Record per-model deltas once `session` commits; dropped on rollback."""
+    session.info.setdefault("model_stats", []).append((org_id, counts, seen_at))
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_model_stats(session):
+    for org_id, counts, seen_at in session.info.pop("model_stats", []):
+        for model_id, n in counts.items():
+            model_stats.mark_known(org_id, model_id)
+            model_stats.record(org_id, model_id, n, seen_at)
+
+
+@event.listens_for(OrmSession, "after_transaction_end")
+def _discard_model_stats(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("model_stats", None)
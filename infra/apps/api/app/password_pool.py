@@ -0,0 +1,60 @@
+"""
+Dedicated, bounded executor for bcrypt.
+
+bcrypt is deliberately slow (~100-300 ms per call). Run inline in the shared
+Starlette threadpool, a burst of logins or signups would take the threads
+that ingest and dashboard handlers need. Here at most PASSWORD_HASH_WORKERS
+calls run at once (bcrypt releases the GIL, so threads are enough) and at most
+PASSWORD_HASH_MAX_PENDING wait; beyond that callers get PasswordPoolFull
+straight away and the route answers 503.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from apps.api.app import metrics
+
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+
+class PasswordPoolFull(Exception):
+    pass
+
+
+class PasswordPool:
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` on the pool. Raises PasswordPoolFull if the queue is full."""
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_pending:
+                metrics.inc("password_pool_rejected_total")
+                raise PasswordPoolFull()
+            self._in_flight += 1
+            self._report()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._report()
+
+    def _report(self) -> None:
+        metrics.set_gauge("password_pool_in_flight", self._in_flight)
+        metrics.set_gauge("password_pool_queue_depth", max(0, self._in_flight - self.workers))
+
+
+password_pool = PasswordPool()
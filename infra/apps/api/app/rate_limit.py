@@ -0,0 +1,252 @@
+"""
+Token-bucket rate limits per API key and per org, enforced in get_org_id.
+
+Each bucket holds up to `burst` tokens and refills at `rate` tokens/second.
+A request costs one token per RATE_LIMIT_TOKEN_BYTES of body (at least one),
+taken from its key's bucket and its org's together: if either is short,
+neither is charged and the request gets 429 with Retry-After set to when both
+would have enough. Costs are capped at the bucket size, so a large batch is
+slowed down, never refused forever.
+
+The body is measured as the route reads it, after decompression
+(BodyCostMiddleware), so compressing a body or sending it chunked does not
+make it cheaper. get_org_id charges what the Content-Length of a plain body
+says up front, or one token when there is none to go by; whatever the body
+turns out to cost beyond that is charged once the request is done, without
+throttling it, and slows down the next requests instead.
+
+Buckets live in process by default (limits are then per API replica). Set
+RATE_LIMIT_BACKEND=redis and RATE_LIMIT_REDIS_URL to share them across
+replicas; that needs the optional `redis` package. A rate of 0 disables the
+limit.
+"""
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.api.app import metrics
+
+
+RATE_LIMIT_KEY_RATE = float(os.getenv("RATE_LIMIT_KEY_RATE", "0"))
+RATE_LIMIT_KEY_BURST = float(os.getenv("RATE_LIMIT_KEY_BURST", "0"))
+RATE_LIMIT_ORG_RATE = float(os.getenv("RATE_LIMIT_ORG_RATE", "0"))
+RATE_LIMIT_ORG_BURST = float(os.getenv("RATE_LIMIT_ORG_BURST", "0"))
+RATE_LIMIT_TOKEN_BYTES = int(os.getenv("RATE_LIMIT_TOKEN_BYTES", "65536"))
+
+# (bucket, rate, burst, cost)
+BucketTake = Tuple[str, float, float, float]
+
+
+def request_cost(content_length, token_bytes: Optional[int] = None) -> float:
+    """
+    Tokens a body of `content_length` bytes (int, or the header's str) costs.
+    token_bytes defaults to RATE_LIMIT_TOKEN_BYTES; 0 charges per request.
+    """
+    if token_bytes is None:
+        token_bytes = RATE_LIMIT_TOKEN_BYTES
+    try:
+        size = int(content_length) if content_length is not None else 0
+    except ValueError:
+        size = 0
+    if token_bytes <= 0 or size <= 0:
+        return 1.0
+    return float(max(1, math.ceil(size / token_bytes)))
+
+
+class InMemoryBuckets:
+    """Process-local buckets. Also the stand-in for the shared backend in tests and dev."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, takes: Sequence[BucketTake], force: bool = False) -> List[float]:
+        """
+        Take each bucket's cost, all or nothing. Returns per bucket 0 if it had
+        enough, else seconds until it would; nothing is taken unless all are 0.
+        With `force` the cost is taken regardless and may leave a bucket in debt.
+        """
+        with self._lock:
+            now = self._clock()
+            levels, waits = [], []
+            for bucket, rate, burst, cost in takes:
+                tokens, updated = self._buckets.get(bucket, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                waits.append(0.0 if force or tokens >= cost else (cost - tokens) / rate)
+            charge = not any(waits)
+            for (bucket, _, _, cost), tokens in zip(takes, levels):
+                self._buckets[bucket] = (tokens - cost if charge else tokens, now)
+            return waits
+
+
+_REDIS_TAKE = """
+local force = ARGV[1] == '1'
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local levels, waits = {}, {}
+local charge = true
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[3 * i - 1])
+    local burst = tonumber(ARGV[3 * i])
+    local cost = tonumber(ARGV[3 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    waits[i] = 0
+    if tokens < cost and not force then
+        waits[i] = (cost - tokens) / rate
+        charge = false
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[3 * i - 1])
+    local burst = tonumber(ARGV[3 * i])
+    local tokens = levels[i]
+    if charge then
+        tokens = tokens - tonumber(ARGV[3 * i + 1])
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+    waits[i] = tostring(waits[i])
+end
+return waits
+"""
+
+
+class RedisBuckets:
+    """Buckets shared by all replicas, updated atomically by a Lua script on Redis' clock."""
+
+    def __init__(self, url: str, prefix: str = "sentryml:ratelimit:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE)
+        self._prefix = prefix
+
+    def take(self, takes: Sequence[BucketTake], force: bool = False) -> List[float]:
+        keys = [self._prefix + bucket for bucket, _, _, _ in takes]
+        args = [int(force)] + [x for _, rate, burst, cost in takes for x in (rate, burst, cost)]
+        return [float(w) for w in self._script(keys=keys, args=args)]
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        buckets,
+        key_rate: float = 0,
+        key_burst: float = 0,
+        org_rate: float = 0,
+        org_burst: float = 0,
+    ):
+        self.buckets = buckets
+        # Burst defaults to one second's worth of requests.
+        self.limits = {
+            "key": (key_rate, key_burst or max(key_rate, 1)),
+            "org": (org_rate, org_burst or max(org_rate, 1)),
+        }
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        if os.getenv("RATE_LIMIT_BACKEND", "memory") == "redis":
+            buckets = RedisBuckets(os.environ["RATE_LIMIT_REDIS_URL"])
+        else:
+            buckets = InMemoryBuckets()
+        return cls(
+            buckets,
+            key_rate=RATE_LIMIT_KEY_RATE,
+            key_burst=RATE_LIMIT_KEY_BURST,
+            org_rate=RATE_LIMIT_ORG_RATE,
+            org_burst=RATE_LIMIT_ORG_BURST,
+        )
+
+    def _takes(self, key_id, org_id, cost: float) -> Tuple[List[str], List[BucketTake]]:
+        scopes, takes = [], []
+        for scope, ident in (("key", key_id), ("org", org_id)):
+            rate, burst = self.limits[scope]
+            if rate <= 0:
+                continue
+            scopes.append(scope)
+            takes.append((f"{scope}:{ident}", rate, burst, min(cost, burst)))
+        return scopes, takes
+
+    def check(self, key_id, org_id, cost: float = 1.0) -> Optional[int]:
+        """Charge `cost` tokens to the key's and the org's bucket. Returns Retry-After seconds if throttled."""
+        scopes, takes = self._takes(key_id, org_id, cost)
+        if not takes:
+            return None
+        try:
+            waits = self.buckets.take(takes)
+        except Exception:
+            # Fail open: an unreachable shared backend must not take ingest down.
+            metrics.inc("rate_limit_backend_errors_total")
+            return None
+        if not any(waits):
+            return None
+        metrics.inc("rate_limit_throttled_total")
+        for scope, wait in zip(scopes, waits):
+            if wait > 0:
+                metrics.inc(f"rate_limit_throttled_{scope}_total")
+        return max(1, math.ceil(max(waits)))
+
+    def charge(self, key_id, org_id, cost: float) -> None:
+        """Charge `cost` tokens after the fact, even into debt: the request has already been served."""
+        _, takes = self._takes(key_id, org_id, cost)
+        if not takes or cost <= 0:
+            return
+        try:
+            self.buckets.take(takes, force=True)
+        except Exception:
+            metrics.inc("rate_limit_backend_errors_total")
+
+
+rate_limiter = RateLimiter.from_env()
+
+# scope key under which BodyCostMiddleware and get_org_id share a request's cost.
+BODY_COST_SCOPE_KEY = "sentryml.body_cost"
+
+
+class BodyCost:
+    def __init__(self):
+        self.body_bytes = 0
+        self.key_id = None
+        self.org_id = None
+        self.charged = 0.0
+
+
+class BodyCostMiddleware:
+    """
+    Counts the body bytes the app reads (install it inside
+    RequestDecompressionMiddleware so they are decompressed bytes) and, once
+    the request is done, charges what get_org_id could not know up front.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cost = scope[BODY_COST_SCOPE_KEY] = BodyCost()
+
+        async def receive_counted() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                cost.body_bytes += len(message.get("body", b""))
+            return message
+
+        try:
+            await self.app(scope, receive_counted, send)
+        finally:
+            if cost.key_id is not None:
+                owed = request_cost(cost.body_bytes) - cost.charged
+                if owed > 0:
+                    rate_limiter.charge(cost.key_id, cost.org_id, owed)
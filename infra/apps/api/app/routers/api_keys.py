@@ -11,6 +11,7 @@ from sqlmodel import Session, select
 from apps.sentryml_core.db import get_session
 from apps.sentryml_core.models import ApiKey, User
 from apps.api.app.security import hash_api_key  # your HMAC hash
+from apps.api.app.api_key_cache import api_key_cache
 from apps.api.app.deps_auth import get_current_user       # the cookie session dep
 
 router = APIRouter(prefix="/v1/api-keys", tags=["api-keys"])
@@ -99,5 +100,7 @@ def revoke_api_key(
         row.revoked_at = datetime.utcnow()
         session.add(row)
         session.commit()
+    # Other API replicas drop theirs on their next revocation poll.
+    api_key_cache.invalidate(row.key_hash)
 
     return {"ok": True}
@@ -1,20 +1,22 @@
 from datetime import datetime, timedelta
-from uuid import uuid4
+from uuid import UUID, uuid4
 import os
 
-import bcrypt
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Response
 from pydantic import BaseModel, EmailStr
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from apps.sentryml_core.db import get_session
+from apps.sentryml_core.db import get_async_session, get_session
 from apps.sentryml_core.models import (
     Org,
     User,
     SessionToken,
     PasswordResetToken,
 )  # your SQLModel tables
-from apps.api.app.security import hash_password
+from apps.api.app.security import hash_password, verify_password
+from apps.api.app.password_pool import PasswordPoolFull, password_pool
+from apps.api.app.session_cache import session_cache
 
 router = APIRouter(prefix="/v1/auth", tags=["auth"])
 
@@ -37,15 +39,27 @@ class PasswordResetConfirm(BaseModel):
     password: str
 
 
+async def run_bcrypt(fn, *args):
+    """bcrypt on the dedicated password pool; 503 when it is saturated."""
+    try:
+        return await password_pool.run(fn, *args)
+    except PasswordPoolFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many authentication requests, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+
 @router.post("/login")
-def login(payload: LoginRequest, response: Response, session: Session = Depends(get_session)):
+async def login(payload: LoginRequest, response: Response, session: AsyncSession = Depends(get_async_session)):
     # 1) Find user
-    user = session.exec(select(User).where(User.email == payload.email)).first()
+    user = (await session.exec(select(User).where(User.email == payload.email))).first()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # 2) Verify password
-    ok = bcrypt.checkpw(payload.password.encode("utf-8"), user.password_hash.encode("utf-8"))
+    ok = await run_bcrypt(verify_password, payload.password, user.password_hash)
     if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -57,7 +71,7 @@ def login(payload: LoginRequest, response: Response, session: Session = Depends(
         revoked_at=None,
     )
     session.add(token)
-    session.commit()
+    await session.commit()
 
     # 4) Set cookie
     response.set_cookie(
@@ -72,11 +86,33 @@ def login(payload: LoginRequest, response: Response, session: Session = Depends(
     return {"ok": True}
 
 
+@router.post("/logout")
+def logout(
+    response: Response,
+    sentryml_session: str | None = Cookie(default=None),
+    session: Session = Depends(get_session),
+):
+    try:
+        session_id = UUID(sentryml_session or "")
+    except ValueError:
+        session_id = None
+    if session_id is not None:
+        token = session.get(SessionToken, session_id)
+        if token and token.revoked_at is None:
+            token.revoked_at = datetime.utcnow()
+            session.add(token)
+            session.commit()
+        session_cache.invalidate(session_id)
+
+    response.delete_cookie("sentryml_session")
+    return {"ok": True}
+
+
 @router.post("/signup")
-def signup(payload: SignupRequest, response: Response, session: Session = Depends(get_session)):
+async def signup(payload: SignupRequest, response: Response, session: AsyncSession = Depends(get_async_session)):
     if len(payload.password) < 8:
         raise HTTPException(status_code=400, detail="Please use 8 characters password")
-    existing = session.exec(select(User).where(User.email == payload.email)).first()
+    existing = (await session.exec(select(User).where(User.email == payload.email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -88,7 +124,7 @@ def signup(payload: SignupRequest, response: Response, session: Session = Depend
         user_id=uuid4(),
         org_id=org.org_id,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await run_bcrypt(hash_password, payload.password),
         created_at=datetime.utcnow(),
     )
     session.add(org)
@@ -101,7 +137,7 @@ def signup(payload: SignupRequest, response: Response, session: Session = Depend
         revoked_at=None,
     )
     session.add(token)
-    session.commit()
+    await session.commit()
 
     response.set_cookie(
         key="sentryml_session",
@@ -135,33 +171,35 @@ def password_reset_request(payload: PasswordResetRequest, session: Session = Dep
 
 
 @router.post("/password-reset/confirm")
-def password_reset_confirm(payload: PasswordResetConfirm, session: Session = Depends(get_session)):
+async def password_reset_confirm(payload: PasswordResetConfirm, session: AsyncSession = Depends(get_async_session)):
     if len(payload.password) < 8:
         raise HTTPException(status_code=400, detail="Please use 8 characters password")
 
-    reset = session.exec(
+    reset = (await session.exec(
         select(PasswordResetToken).where(PasswordResetToken.token == payload.token)
-    ).first()
+    )).first()
     if not reset or reset.used_at or reset.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
 
-    user = session.get(User, reset.user_id)
+    user = await session.get(User, reset.user_id)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
 
-    user.password_hash = hash_password(payload.password)
+    user.password_hash = await run_bcrypt(hash_password, payload.password)
     reset.used_at = datetime.utcnow()
 
-    sessions = session.exec(
+    sessions = (await session.exec(
         select(SessionToken).where(
             (SessionToken.user_id == user.user_id) & (SessionToken.revoked_at == None)  # noqa: E711
         )
-    ).all()
+    )).all()
     for s in sessions:
         s.revoked_at = datetime.utcnow()
         session.add(s)
 
     session.add(user)
     session.add(reset)
-    session.commit()
+    await session.commit()
+    # Other replicas drop theirs on their next revocation poll.
+    session_cache.invalidate_user(user.user_id)
     return {"ok": True}
@@ -1,18 +1,21 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import func
 
-from apps.sentryml_core.db import get_session
+from apps.sentryml_core.db import get_async_session
 from apps.sentryml_core.models import (
+    ModelKey,
     ModelRegistry,
     DriftResult,
     Incident,
     User,
     MonitorConfig,
     PredictionEvent,
+    PredictionRollup,
 )
-from apps.api.app.deps_auth import get_current_user
+from apps.api.app.deps_auth import get_current_user_async
 
 router = APIRouter(prefix="/v1/ui", tags=["ui"])
 
@@ -34,12 +37,12 @@ def sort_key(r):
     return (-inc_rank, -drift_rank, last_seen_at)
 
 @router.get("/dashboard")
-def ui_dashboard(
-    user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+async def ui_dashboard(
+    user: User = Depends(get_current_user_async),
+    session: AsyncSession = Depends(get_async_session),
     limit: int = 100,
 ):
-    models = session.exec(
+    models = (await session.exec(
         select(ModelRegistry)
         .where(
             (ModelRegistry.org_id == user.org_id)
@@ -47,32 +50,65 @@ def ui_dashboard(
         )
         .order_by(ModelRegistry.last_seen_at.desc())
         .limit(limit)
-    ).all()
+    )).all()
 
-    open_incidents = session.exec(
+    open_incidents = (await session.exec(
         select(Incident)
         .where((Incident.org_id == user.org_id) & (Incident.closed_at == None))
         .order_by(Incident.opened_at.desc())
-    ).all()
+    )).all()
 
-    drift_rows = session.exec(
+    drift_rows = (await session.exec(
         select(DriftResult)
         .where(DriftResult.org_id == user.org_id)
         .order_by(DriftResult.computed_at.desc())
-    ).all()
+    )).all()
 
-    configs = session.exec(
+    configs = (await session.exec(
         select(MonitorConfig).where(MonitorConfig.org_id == user.org_id)
-    ).all()
+    )).all()
     config_by_model = {c.model_id: c for c in configs}
 
-    pred_rows = session.exec(
-        select(PredictionEvent.model_id, func.count())
-        .where(PredictionEvent.org_id == user.org_id)
-        .group_by(PredictionEvent.model_id)
-    ).all()
+    # Raw events from each model's retention horizon on, hourly rollups before it.
+    # Rollups also cover recent hours (they feed sketch-based drift), so they
+    # must not be added on top of the raw rows there.
+    pred_rows = (await session.exec(
+        select(ModelKey.model_id, func.count())
+        .select_from(PredictionEvent)
+        .join(ModelKey, ModelKey.model_key == PredictionEvent.model_key)
+        .join(
+            ModelRegistry,
+            (ModelRegistry.org_id == ModelKey.org_id)
+            & (ModelRegistry.model_id == ModelKey.model_id),
+            isouter=True,
+        )
+        .where(
+            (ModelKey.org_id == user.org_id)
+            & (
+                (ModelRegistry.raw_rolled_up_until == None)  # noqa: E711
+                | (PredictionEvent.event_time >= ModelRegistry.raw_rolled_up_until)
+            )
+        )
+        .group_by(ModelKey.model_id)
+    )).all()
     pred_count_by_model = {m_id: cnt for m_id, cnt in pred_rows}
 
+    rollup_rows = (await session.exec(
+        select(PredictionRollup.model_id, func.sum(PredictionRollup.count))
+        .join(
+            ModelRegistry,
+            (ModelRegistry.org_id == PredictionRollup.org_id)
+            & (ModelRegistry.model_id == PredictionRollup.model_id),
+        )
+        .where(
+            (PredictionRollup.org_id == user.org_id)
+            & (PredictionRollup.bucket_start < ModelRegistry.raw_rolled_up_until)
+        )
+        .group_by(PredictionRollup.model_id)
+    )).all()
+    for m_id, cnt in rollup_rows:
+        pred_count_by_model[m_id] = pred_count_by_model.get(m_id, 0) + int(cnt or 0)
+
     # index: model_id -> open incident (at most one)
     open_by_model = {}
     for inc in open_incidents:
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from datetime import datetime, timedelta
-from sqlalchemy import func
 
 from apps.sentryml_core.db import get_session
 from apps.sentryml_core.models import (
@@ -14,6 +13,8 @@ from apps.sentryml_core.models import (
 )
 from apps.api.app.deps_auth import get_current_user
 from apps.sentryml_core.schemas import MonitorUpdate
+from apps.sentryml_core.rollups import count_events
+from apps.sentryml_core.model_keys import lookup_model_key
 
 router = APIRouter(prefix="/v1/ui", tags=["ui"])
 
@@ -43,36 +44,10 @@ def ui_model_detail(
     baseline_days = cfg.baseline_days or 7
     current_start = datetime.utcnow() - timedelta(days=current_days)
     baseline_start = datetime.utcnow() - timedelta(days=baseline_days)
-    current_total = session.exec(
-        select(func.count()).select_from(PredictionEvent).where(
-            (PredictionEvent.org_id == user.org_id)
-            & (PredictionEvent.model_id == model_id)
-            & (PredictionEvent.event_time >= current_start)
-        )
-    ).one()
-    current_scored = session.exec(
-        select(func.count()).select_from(PredictionEvent).where(
-            (PredictionEvent.org_id == user.org_id)
-            & (PredictionEvent.model_id == model_id)
-            & (PredictionEvent.event_time >= current_start)
-            & (PredictionEvent.score != None)  # noqa: E711
-        )
-    ).one()
-    baseline_total = session.exec(
-        select(func.count()).select_from(PredictionEvent).where(
-            (PredictionEvent.org_id == user.org_id)
-            & (PredictionEvent.model_id == model_id)
-            & (PredictionEvent.event_time >= baseline_start)
-        )
-    ).one()
-    baseline_scored = session.exec(
-        select(func.count()).select_from(PredictionEvent).where(
-            (PredictionEvent.org_id == user.org_id)
-            & (PredictionEvent.model_id == model_id)
-            & (PredictionEvent.event_time >= baseline_start)
-            & (PredictionEvent.score != None)  # noqa: E711
-        )
-    ).one()
+    current_total = count_events(session, user.org_id, model_id, current_start)
+    current_scored = count_events(session, user.org_id, model_id, current_start, scored=True)
+    baseline_total = count_events(session, user.org_id, model_id, baseline_start)
+    baseline_scored = count_events(session, user.org_id, model_id, baseline_start, scored=True)
 
     drift = session.exec(
         select(DriftResult)
@@ -90,17 +65,12 @@ def ui_model_detail(
 
     preds = session.exec(
         select(PredictionEvent)
-        .where((PredictionEvent.org_id == user.org_id) & (PredictionEvent.model_id == model_id))
+        .where(PredictionEvent.model_key == lookup_model_key(session, user.org_id, model_id))
         .order_by(PredictionEvent.event_time.desc())
         .limit(pred_limit)
     ).all()
 
-    pred_count = session.exec(
-        select(func.count()).select_from(PredictionEvent).where(
-            (PredictionEvent.org_id == user.org_id)
-            & (PredictionEvent.model_id == model_id)
-        )
-    ).one()
+    pred_count = count_events(session, user.org_id, model_id)
 
     return {
         "model_id": model_id, 
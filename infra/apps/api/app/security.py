@@ -2,14 +2,22 @@ import hmac
 import bcrypt
 import hashlib
 import os
-from fastapi import Header, HTTPException, Depends
+from fastapi import Header, HTTPException, Depends, Request
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime
+from typing import Optional
 
-from apps.sentryml_core.db import get_session
+from apps.sentryml_core.db import get_async_session, get_session
 from apps.sentryml_core.models import ApiKey
+from apps.api.app.api_key_cache import MISS, CachedApiKey, api_key_cache
+from apps.api.app.api_key_usage import api_key_usage
+from apps.api.app.rate_limit import BODY_COST_SCOPE_KEY, rate_limiter, request_cost
 
 
+# GET /metrics is off unless set; scrapers send `Authorization: Bearer <token>`.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(
@@ -35,18 +43,65 @@ def hash_api_key(raw_key: str) -> str:
     return digest
 
 
-def get_org_id(
-        x_api_key: str = Header(..., alias="X-API-Key"),
-        session: Session = Depends(get_session),
-):
-    key_hash = hash_api_key(x_api_key)
-    api_key = session.exec(
+def _api_key_query(key_hash: str):
+    return (
         select(ApiKey)
         .where(ApiKey.key_hash == key_hash)
         .where(ApiKey.revoked_at == None)  # noqa: E711
         .distinct()
-    ).first()
-    if not api_key:
+    )
+
+
+def _authorize(entry: Optional[CachedApiKey], request: Optional[Request]):
+    if entry is None:
         raise HTTPException(status_code=401, detail="Invalid API Key")
-    api_key.last_used_at = datetime.utcnow()
-    return api_key.org_id
+    # Charged by body size, so one large batch costs more than one event. A
+    # Content-Length is only left on plain bodies; BodyCostMiddleware charges
+    # the rest of a compressed or chunked body once it has been read.
+    cost = request_cost(request.headers.get("content-length") if request is not None else None)
+    retry_after = rate_limiter.check(entry.key_id, entry.org_id, cost)
+    body_cost = request.scope.get(BODY_COST_SCOPE_KEY) if request is not None else None
+    if retry_after is None and body_cost is not None:
+        body_cost.key_id, body_cost.org_id, body_cost.charged = entry.key_id, entry.org_id, cost
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(retry_after)},
+        )
+    # Written to api_keys.last_used_at in batches, not by this request.
+    api_key_usage.touch(entry.key_id, datetime.utcnow())
+    return entry.org_id
+
+
+def get_org_id(
+        x_api_key: str = Header(..., alias="X-API-Key"),
+        session: Session = Depends(get_session),
+        request: Request = None,
+):
+    key_hash = hash_api_key(x_api_key)
+    entry = api_key_cache.get(key_hash)
+    if entry is MISS:
+        entry = api_key_cache.put(key_hash, session.exec(_api_key_query(key_hash)).first())
+    return _authorize(entry, request)
+
+
+async def get_org_id_async(
+        x_api_key: str = Header(..., alias="X-API-Key"),
+        session: AsyncSession = Depends(get_async_session),
+        request: Request = None,
+):
+    key_hash = hash_api_key(x_api_key)
+    entry = api_key_cache.get(key_hash)
+    if entry is MISS:
+        result = await session.exec(_api_key_query(key_hash))
+        entry = api_key_cache.put(key_hash, result.first())
+    return _authorize(entry, request)
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {METRICS_TOKEN}"
+    if authorization is None or not hmac.compare_digest(authorization.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
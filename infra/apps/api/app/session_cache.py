@@ -0,0 +1,100 @@
+"""
+In-process cache of validated UI sessions, so get_current_user skips the
+session/user query for cookies it has seen recently.
+
+Entries live for at most UI_SESSION_CACHE_TTL_SECONDS and never past the
+session's own expires_at. Logout and password resets invalidate entries on
+the replica that served them. Every replica also polls the sessions table
+every UI_SESSION_REVOCATION_POLL_SECONDS for sessions revoked within the last
+TTL (invalidate_revoked), so elsewhere a revoked session keeps working for at
+most that long (the TTL with polling off).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import SessionToken, User
+from apps.api.app import metrics
+
+
+UI_SESSION_CACHE_TTL_SECONDS = float(os.getenv("UI_SESSION_CACHE_TTL_SECONDS", "30"))
+UI_SESSION_CACHE_MAX_SIZE = int(os.getenv("UI_SESSION_CACHE_MAX_SIZE", "10000"))
+UI_SESSION_REVOCATION_POLL_SECONDS = float(os.getenv("UI_SESSION_REVOCATION_POLL_SECONDS", "2"))
+
+# revoked_at is stamped by whichever replica handled the logout or reset.
+_REVOCATION_CLOCK_SKEW = timedelta(seconds=60)
+
+
+class SessionCache:
+    """TTL + LRU map of session_id -> (user fields, session expires_at)."""
+
+    def __init__(
+        self,
+        ttl: float = UI_SESSION_CACHE_TTL_SECONDS,
+        max_size: int = UI_SESSION_CACHE_MAX_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, Tuple[float, datetime, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, session_id) -> Optional[User]:
+        """A fresh, detached User for a cached live session, else None."""
+        with self._lock:
+            item = self._entries.get(session_id)
+            if item is not None:
+                cached_until, expires_at, user = item
+                if cached_until > self._clock() and expires_at > datetime.utcnow():
+                    self._entries.move_to_end(session_id)
+                    metrics.inc("ui_session_cache_hits_total")
+                    return User(**user)
+                del self._entries[session_id]
+        metrics.inc("ui_session_cache_misses_total")
+        return None
+
+    def put(self, session_id, user: User, expires_at: datetime) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = (self._clock() + self.ttl, expires_at, user.model_dump())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def invalidate_user(self, user_id) -> None:
+        with self._lock:
+            for session_id in [s for s, (_, _, u) in self._entries.items() if u["user_id"] == user_id]:
+                del self._entries[session_id]
+
+    def invalidate_revoked(self, session: Session, now: Optional[datetime] = None) -> int:
+        """
+        Drop cached sessions revoked on any replica. Only revocations within
+        the last TTL can still be cached. Returns entries dropped.
+        """
+        if not self._entries:
+            return 0
+        since = (now or datetime.utcnow()) - timedelta(seconds=self.ttl) - _REVOCATION_CLOCK_SKEW
+        revoked = session.exec(select(SessionToken.session_id).where(SessionToken.revoked_at >= since)).all()
+        with self._lock:
+            dropped = sum(self._entries.pop(s, None) is not None for s in revoked)
+        if dropped:
+            metrics.inc("ui_session_cache_revoked_total", dropped)
+        return dropped
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+session_cache = SessionCache()
@@ -0,0 +1,73 @@
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.sentryml_core.db import async_database_url, get_async_session, get_session
+from apps.api.app.main import app
+from apps.api.app.security import get_org_id, get_org_id_async
+from apps.api.app.model_stats import model_stats
+from apps.api.app.api_key_cache import api_key_cache
+from apps.api.app.api_key_usage import api_key_usage
+from apps.api.app.session_cache import session_cache
+from apps.sentryml_core.model_keys import model_keys
+
+
+ORG_ID = uuid4()
+
+
+@pytest.fixture(autouse=True)
+def reset_model_stats():
+    model_stats.reset()
+    model_keys.reset()
+    api_key_cache.reset()
+    api_key_usage.reset()
+    session_cache.reset()
+    yield
+    model_stats.reset()
+    model_keys.reset()
+    api_key_cache.reset()
+    api_key_usage.reset()
+    session_cache.reset()
+
+
+@pytest.fixture()
+def org_id():
+    return ORG_ID
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    # A file, not :memory:, so the sync and async engines see the same data.
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture()
+def async_engine(engine):
+    # TestClient runs each request on a fresh event loop; pooled aiosqlite
+    # connections are bound to the loop that opened them.
+    return create_async_engine(async_database_url(str(engine.url)), poolclass=NullPool)
+
+
+@pytest.fixture()
+def client(engine, async_engine):
+    def _session():
+        with Session(engine) as session:
+            yield session
+
+    async def _async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = _session
+    app.dependency_overrides[get_async_session] = _async_session
+    app.dependency_overrides[get_org_id] = lambda: ORG_ID
+    app.dependency_overrides[get_org_id_async] = lambda: ORG_ID
+    yield TestClient(app)
+    app.dependency_overrides.clear()
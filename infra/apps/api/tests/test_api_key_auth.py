@@ -1,13 +1,21 @@
+import asyncio
 import os
 from datetime import datetime
 from uuid import uuid4
 
 import pytest
-from fastapi import HTTPException
-from sqlmodel import SQLModel, Session, create_engine
+from fastapi import HTTPException, Request
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from apps.sentryml_core.models import ApiKey
-from apps.api.app.security import get_org_id, hash_api_key
+from apps.sentryml_core.models import ApiKey, User
+from apps.api.app import metrics
+from apps.api.app.api_key_cache import MISS, ApiKeyCache
+from apps.api.app.api_key_usage import ApiKeyUsageTracker
+from apps.api.app.rate_limit import InMemoryBuckets, RateLimiter, request_cost
+from apps.api.app.routers.api_keys import revoke_api_key
+from apps.api.app.security import get_org_id, get_org_id_async, hash_api_key
 
 
 @pytest.fixture()
@@ -51,3 +59,197 @@ def test_get_org_id_revoked_key(session, monkeypatch):
     with pytest.raises(HTTPException) as exc:
         get_org_id(x_api_key=raw_key, session=session)
     assert exc.value.status_code == 401
+
+
+def test_get_org_id_rate_limited_per_key_and_org(session, monkeypatch):
+    monkeypatch.setenv("API_KEY_SECRET", "test-secret")
+    now = [0.0]
+    limiter = RateLimiter(
+        InMemoryBuckets(clock=lambda: now[0]),
+        key_rate=1, key_burst=2,
+        org_rate=1, org_burst=3,
+    )
+    monkeypatch.setattr("apps.api.app.security.rate_limiter", limiter)
+    metrics.reset()
+
+    org_id = uuid4()
+    for raw_key in ("sk_test_a", "sk_test_b"):
+        session.add(ApiKey(key_id=uuid4(), org_id=org_id, user_id=uuid4(), prefix="sk_", key_hash=hash_api_key(raw_key)))
+    session.commit()
+
+    assert get_org_id(x_api_key="sk_test_a", session=session) == org_id
+    assert get_org_id(x_api_key="sk_test_a", session=session) == org_id
+    with pytest.raises(HTTPException) as exc:
+        get_org_id(x_api_key="sk_test_a", session=session)
+    assert exc.value.status_code == 429
+    assert exc.value.headers == {"Retry-After": "1"}
+
+    # Another key of the same org only has the org's last token left.
+    assert get_org_id(x_api_key="sk_test_b", session=session) == org_id
+    with pytest.raises(HTTPException):
+        get_org_id(x_api_key="sk_test_b", session=session)
+
+    now[0] += 1.0
+    assert get_org_id(x_api_key="sk_test_b", session=session) == org_id
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["rate_limit_throttled_key_total"] == 1
+    assert counters["rate_limit_throttled_org_total"] == 1
+
+
+def test_rate_limit_charges_by_body_size_and_both_buckets_at_once(session, monkeypatch):
+    monkeypatch.setenv("API_KEY_SECRET", "test-secret")
+    now = [0.0]
+    limiter = RateLimiter(
+        InMemoryBuckets(clock=lambda: now[0]),
+        key_rate=1, key_burst=10,
+        org_rate=1, org_burst=4,
+    )
+    monkeypatch.setattr("apps.api.app.security.rate_limiter", limiter)
+    org_id = uuid4()
+    session.add(ApiKey(key_id=uuid4(), org_id=org_id, user_id=uuid4(), prefix="sk_", key_hash=hash_api_key("sk_test_big")))
+    session.commit()
+
+    def request(size):
+        return Request({"type": "http", "headers": [(b"content-length", str(size).encode())]})
+
+    assert request_cost("1") == 1 and request_cost(None) == 1 and request_cost("x") == 1
+    assert request_cost(str(3 * 65536 + 1)) == 4
+
+    # 3 tokens from both buckets; the org has 1 left.
+    assert get_org_id(x_api_key="sk_test_big", session=session, request=request(3 * 65536)) == org_id
+    with pytest.raises(HTTPException) as exc:
+        get_org_id(x_api_key="sk_test_big", session=session, request=request(2 * 65536))
+    assert exc.value.headers == {"Retry-After": "1"}
+    # The throttled request took nothing from the key's bucket either.
+    assert limiter.buckets._buckets["key:" + str(session.exec(select(ApiKey)).one().key_id)][0] == 7
+
+    # Larger than the org's bucket: capped at its size, so it passes once the bucket is full.
+    with pytest.raises(HTTPException) as exc:
+        get_org_id(x_api_key="sk_test_big", session=session, request=request(100 * 65536))
+    assert exc.value.headers == {"Retry-After": "3"}
+    now[0] += 3.0
+    assert get_org_id(x_api_key="sk_test_big", session=session, request=request(100 * 65536)) == org_id
+
+
+def test_get_org_id_async_matches_sync(tmp_path, monkeypatch):
+    monkeypatch.setenv("API_KEY_SECRET", "test-secret")
+    engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    SQLModel.metadata.create_all(engine)
+    org_id = uuid4()
+    with Session(engine) as session:
+        session.add(ApiKey(key_id=uuid4(), org_id=org_id, user_id=uuid4(), prefix="sk_", key_hash=hash_api_key("sk_test_async")))
+        session.commit()
+
+    async def check():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'keys.db'}")
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                assert await get_org_id_async(x_api_key="sk_test_async", session=session) == org_id
+                with pytest.raises(HTTPException) as exc:
+                    await get_org_id_async(x_api_key="sk_test_other", session=session)
+                assert exc.value.status_code == 401
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(check())
+
+
+def test_get_org_id_caches_lookups_and_revocation_invalidates(session, monkeypatch):
+    monkeypatch.setenv("API_KEY_SECRET", "test-secret")
+    now = [0.0]
+    cache = ApiKeyCache(ttl=30, negative_ttl=5, clock=lambda: now[0])
+    monkeypatch.setattr("apps.api.app.security.api_key_cache", cache)
+    monkeypatch.setattr("apps.api.app.routers.api_keys.api_key_cache", cache)
+    metrics.reset()
+
+    # Unknown keys are cached negatively, briefly.
+    with pytest.raises(HTTPException):
+        get_org_id(x_api_key="sk_test_new", session=session)
+    user = User(user_id=uuid4(), org_id=uuid4(), email="a@example.com", password_hash="x")
+    api_key = ApiKey(key_id=uuid4(), org_id=user.org_id, user_id=user.user_id, prefix="sk_", key_hash=hash_api_key("sk_test_new"))
+    session.add(api_key)
+    session.commit()
+    with pytest.raises(HTTPException):
+        get_org_id(x_api_key="sk_test_new", session=session)
+
+    now[0] += 5
+    assert get_org_id(x_api_key="sk_test_new", session=session) == user.org_id
+    assert get_org_id(x_api_key="sk_test_new", session=session) == user.org_id
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["api_key_cache_hits_total"] == 2
+    assert counters["api_key_cache_misses_total"] == 2
+
+    revoke_api_key(api_key.key_id, user=user, session=session)
+    with pytest.raises(HTTPException) as exc:
+        get_org_id(x_api_key="sk_test_new", session=session)
+    assert exc.value.status_code == 401
+
+
+def test_invalid_keys_do_not_evict_valid_ones():
+    cache = ApiKeyCache(ttl=30, negative_ttl=5, max_size=2, negative_max_size=3)
+    key = ApiKey(key_id=uuid4(), org_id=uuid4(), user_id=uuid4(), prefix="sk_", key_hash="valid")
+    cache.put("valid", key)
+    for i in range(100):
+        cache.put(f"bad{i}", None)
+
+    assert cache.get("valid") == (key.org_id, key.key_id)
+    assert cache.get("bad99") is None
+    assert cache.get("bad0") is MISS
+
+
+def test_revocation_on_another_replica_is_picked_up_by_polling(session, monkeypatch):
+    monkeypatch.setenv("API_KEY_SECRET", "test-secret")
+    cache = ApiKeyCache(ttl=30)
+    monkeypatch.setattr("apps.api.app.security.api_key_cache", cache)
+    org_id = uuid4()
+    keys = [
+        ApiKey(key_id=uuid4(), org_id=org_id, user_id=uuid4(), prefix="sk_", key_hash=hash_api_key(f"sk_test_{i}"))
+        for i in range(2)
+    ]
+    session.add_all(keys)
+    session.commit()
+    for i in range(2):
+        assert get_org_id(x_api_key=f"sk_test_{i}", session=session) == org_id
+    assert cache.invalidate_revoked(session) == 0
+
+    # Revoked elsewhere: this replica's cache still has the key.
+    keys[0].revoked_at = datetime.utcnow()
+    session.add(keys[0])
+    session.commit()
+    assert get_org_id(x_api_key="sk_test_0", session=session) == org_id
+
+    assert cache.invalidate_revoked(session) == 1
+    with pytest.raises(HTTPException) as exc:
+        get_org_id(x_api_key="sk_test_0", session=session)
+    assert exc.value.status_code == 401
+    assert get_org_id(x_api_key="sk_test_1", session=session) == org_id
+
+
+def test_api_key_usage_is_flushed_in_one_batch(session, monkeypatch):
+    monkeypatch.setenv("API_KEY_SECRET", "test-secret")
+    usage = ApiKeyUsageTracker()
+    monkeypatch.setattr("apps.api.app.security.api_key_usage", usage)
+
+    keys = [
+        ApiKey(key_id=uuid4(), org_id=uuid4(), user_id=uuid4(), prefix="sk_", key_hash=hash_api_key(f"sk_test_{i}"))
+        for i in range(2)
+    ]
+    keys[1].last_used_at = datetime(2030, 1, 1)
+    session.add_all(keys)
+    session.commit()
+
+    for _ in range(3):
+        get_org_id(x_api_key="sk_test_0", session=session)
+        get_org_id(x_api_key="sk_test_1", session=session)
+    # Requests leave the rows alone until the flush.
+    assert not session.dirty
+    assert usage.pending() == 2
+
+    assert usage.flush(session) == 2
+    assert usage.pending() == 0
+    session.expire_all()
+    assert keys[0].last_used_at is not None
+    # A newer value (e.g. from another replica) is not overwritten.
+    assert keys[1].last_used_at == datetime(2030, 1, 1)
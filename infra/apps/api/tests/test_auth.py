@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+import pytest
+
+from apps.api.app import metrics
+from apps.api.app.password_pool import PasswordPool, PasswordPoolFull
+
+
+CREDENTIALS = {"email": "a@example.com", "password": "correct horse"}
+
+
+def test_signup_login_and_logout(client):
+    assert client.post("/v1/auth/signup", json=CREDENTIALS).status_code == 200
+    assert client.get("/v1/ui/dashboard").status_code == 200
+
+    assert client.post("/v1/auth/login", json={**CREDENTIALS, "password": "wrong pass"}).status_code == 401
+    assert client.post("/v1/auth/login", json=CREDENTIALS).status_code == 200
+    assert client.post("/v1/auth/logout").status_code == 200
+    assert client.get("/v1/ui/dashboard").status_code == 401
+
+
+def test_login_rejected_fast_when_password_pool_is_saturated(client, monkeypatch):
+    assert client.post("/v1/auth/signup", json=CREDENTIALS).status_code == 200
+    metrics.reset()
+    release = threading.Event()
+
+    async def saturate():
+        # Occupy the only worker until `release` is set.
+        pool = PasswordPool(workers=1, max_pending=0)
+        monkeypatch.setattr("apps.api.app.routers.auth.password_pool", pool)
+        busy = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert metrics.snapshot()["gauges"]["password_pool_in_flight"] == 1
+        with pytest.raises(PasswordPoolFull):
+            await pool.run(lambda: None)
+        return busy
+
+    loop = asyncio.new_event_loop()
+    try:
+        busy = loop.run_until_complete(saturate())
+        resp = client.post("/v1/auth/login", json=CREDENTIALS)
+        assert resp.status_code == 503
+        assert resp.headers["Retry-After"] == "1"
+        release.set()
+        loop.run_until_complete(busy)
+    finally:
+        loop.close()
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["password_pool_rejected_total"] == 2
+    assert metrics.snapshot()["gauges"]["password_pool_queue_depth"] == 0
+
+
+def test_metrics_need_the_metrics_token(client, monkeypatch):
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr("apps.api.app.security.METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+    resp = client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert resp.status_code == 200
+    assert set(resp.json()) == {"counters", "gauges"}
@@ -0,0 +1,134 @@
+import gzip
+import json
+import math
+from uuid import uuid4
+
+import pytest
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import ApiKey, PredictionEvent
+from apps.api.app import metrics
+from apps.api.app.main import app
+from apps.api.app.rate_limit import InMemoryBuckets, RateLimiter
+from apps.api.app.security import get_org_id_async, hash_api_key
+
+
+EVENTS = [
+    {"model_id": "fraud_v1", "entity_id": f"user_{i}", "score": 0.5, "event_time": "2026-01-16T12:00:00Z"}
+    for i in range(50)
+]
+
+
+def _count(engine):
+    with Session(engine) as session:
+        return len(session.exec(select(PredictionEvent)).all())
+
+
+def test_gzip_batch_and_metrics(client, engine):
+    metrics.reset()
+    raw = json.dumps(EVENTS).encode()
+    body = gzip.compress(raw)
+    resp = client.post(
+        "/v1/events/prediction:batch",
+        content=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["accepted"] == 50
+    assert _count(engine) == 50
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["ingest_compressed_bytes_total"] == len(body)
+    assert counters["ingest_decompressed_bytes_total"] == len(raw)
+
+
+def test_gzip_stream_read_incrementally(client, engine):
+    body = gzip.compress("".join(json.dumps(e) + "\n" for e in EVENTS).encode())
+
+    def gen():
+        for i in range(0, len(body), 16):
+            yield body[i:i + 16]
+
+    resp = client.post(
+        "/v1/events/prediction:stream",
+        content=gen(),
+        headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["accepted"] == 50
+
+
+def test_zstd_single_event(client, engine):
+    zstandard = pytest.importorskip("zstandard")
+    body = zstandard.ZstdCompressor().compress(json.dumps(EVENTS[0]).encode())
+    resp = client.post(
+        "/v1/events/prediction",
+        content=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "zstd"},
+    )
+    assert resp.status_code == 200
+    assert _count(engine) == 1
+
+
+def test_decompression_limits_and_errors(client, engine, monkeypatch):
+    monkeypatch.setattr(
+        "apps.api.app.decompression.INGEST_MAX_DECOMPRESSED_BYTES", 1024 * 1024
+    )
+    bomb = gzip.compress(b"[" + b" " * (8 * 1024 * 1024) + b"]")
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    resp = client.post("/v1/events/prediction:batch", content=bomb, headers=headers)
+    assert resp.status_code == 413
+
+    truncated = gzip.compress(json.dumps(EVENTS).encode())[:-8]
+    resp = client.post("/v1/events/prediction:batch", content=truncated, headers=headers)
+    assert resp.status_code == 400
+    resp = client.post("/v1/events/prediction:batch", content=b"not gzip", headers=headers)
+    assert resp.status_code == 400
+
+    resp = client.post(
+        "/v1/events/prediction:batch",
+        content=b"[]",
+        headers={"Content-Type": "application/json", "Content-Encoding": "br"},
+    )
+    assert resp.status_code == 415
+    assert _count(engine) == 0
+
+
+@pytest.fixture()
+def keyed_client(client, engine, org_id, monkeypatch):
+    """`client` authenticating with a real API key, rate limited by body size."""
+    monkeypatch.setenv("API_KEY_SECRET", "test-secret")
+    with Session(engine) as session:
+        session.add(ApiKey(key_id=uuid4(), org_id=org_id, user_id=uuid4(), prefix="sk_", key_hash=hash_api_key("sk_test")))
+        session.commit()
+    app.dependency_overrides.pop(get_org_id_async)
+    limiter = RateLimiter(InMemoryBuckets(clock=lambda: 0.0), key_rate=1, key_burst=1000)
+    monkeypatch.setattr("apps.api.app.security.rate_limiter", limiter)
+    monkeypatch.setattr("apps.api.app.rate_limit.rate_limiter", limiter)
+    client.headers["X-API-Key"] = "sk_test"
+    return client, limiter
+
+
+def _tokens(limiter):
+    (tokens, _), = limiter.buckets._buckets.values()
+    return tokens
+
+
+@pytest.mark.parametrize("mode", ["plain", "gzip", "chunked"])
+def test_rate_limit_cost_follows_the_decompressed_body(keyed_client, monkeypatch, mode):
+    client, limiter = keyed_client
+    monkeypatch.setattr("apps.api.app.rate_limit.RATE_LIMIT_TOKEN_BYTES", 1024)
+    raw = "".join(json.dumps(e) + "\n" for e in EVENTS).encode()
+    headers = {"Content-Type": "application/x-ndjson"}
+    if mode == "gzip":
+        body = gzip.compress(raw)
+        headers["Content-Encoding"] = "gzip"
+    elif mode == "chunked":
+        body = (raw[i:i + 100] for i in range(0, len(raw), 100))
+    else:
+        body = raw
+
+    resp = client.post("/v1/events/prediction:stream", content=body, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["accepted"] == 50
+    assert _tokens(limiter) == 1000 - math.ceil(len(raw) / 1024)
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import PredictionEvent, ModelRegistry, MonitorConfig
+from apps.api.app.frames import FRAME_CONTENT_TYPE, encode_frame
+from apps.api.app.model_stats import model_stats
+
+
+def _event(model_id="fraud_v1", score=0.5, **kw):
+    return {
+        "model_id": model_id,
+        "entity_id": "user_1",
+        "score": score,
+        "event_time": "2026-01-16T12:00:00Z",
+        **kw,
+    }
+
+
+def test_batch_inserts_events_and_registers_models(client, engine, org_id):
+    payload = [_event(), _event(), _event(model_id="churn_v2")]
+    resp = client.post("/v1/events/prediction:batch", json=payload)
+    assert resp.status_code == 200
+    assert resp.json() == {"accepted": 3, "rejected": 0, "errors": []}
+
+    with Session(engine) as session:
+        model_stats.flush(session)
+        assert len(session.exec(select(PredictionEvent)).all()) == 3
+        models = {m.model_id: m for m in session.exec(select(ModelRegistry)).all()}
+        assert models["fraud_v1"].event_count == 2
+        assert models["churn_v2"].event_count == 1
+        assert len(session.exec(select(MonitorConfig)).all()) == 2
+
+    resp = client.post("/v1/events/prediction:batch", json=[_event()])
+    assert resp.status_code == 200
+    with Session(engine) as session:
+        model_stats.flush(session)
+        assert session.get(ModelRegistry, (org_id, "fraud_v1")).event_count == 3
+        assert len(session.exec(select(MonitorConfig)).all()) == 2
+
+
+def test_batch_reports_bad_rows_without_rejecting_batch(client, engine):
+    payload = [_event(), {"model_id": "fraud_v1"}, _event(score="not-a-number")]
+    resp = client.post("/v1/events/prediction:batch", json=payload)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["accepted"] == 1
+    assert body["rejected"] == 2
+    assert [e["index"] for e in body["errors"]] == [1, 2]
+
+    with Session(engine) as session:
+        assert len(session.exec(select(PredictionEvent)).all()) == 1
+
+
+def test_non_finite_scores_are_rejected(client, engine):
+    # json.dumps writes Infinity / NaN, and the JSON parser reads them back.
+    body = json.dumps([_event(), _event(score=float("inf")), _event(score=float("nan"))])
+    resp = client.post("/v1/events/prediction:batch", content=body, headers={"Content-Type": "application/json"})
+    assert resp.status_code == 200
+    assert resp.json()["accepted"] == 1
+    assert [(e["index"], e["errors"][0]["type"]) for e in resp.json()["errors"]] == [
+        (1, "finite_number"), (2, "finite_number"),
+    ]
+
+    frame = encode_frame([{**_event(score=float("-inf")), "event_time": datetime(2026, 1, 16)}])
+    resp = client.post("/v1/events/prediction:batch", content=frame, headers={"Content-Type": FRAME_CONTENT_TYPE})
+    assert resp.json()["rejected"] == 1
+    assert resp.json()["errors"][0]["errors"][0]["loc"] == ["score"]
+
+    with Session(engine) as session:
+        assert len(session.exec(select(PredictionEvent)).all()) == 1
+
+
+def test_batch_too_large(client, monkeypatch):
+    monkeypatch.setattr("apps.api.app.main.INGEST_BATCH_MAX_EVENTS", 2)
+    resp = client.post("/v1/events/prediction:batch", json=[_event()] * 3)
+    assert resp.status_code == 413
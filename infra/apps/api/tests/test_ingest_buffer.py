@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import PredictionEvent, ModelRegistry
+from apps.sentryml_core.schemas import PredictionEventIn
+from apps.api.app import metrics
+from apps.api.app.ingest import event_row
+from apps.api.app.main import app
+from apps.api.app.background import PeriodicTask
+from apps.api.app.ingest_buffer import IngestBuffer
+
+
+EVENT = {
+    "model_id": "fraud_v1",
+    "entity_id": "user_1",
+    "score": 0.5,
+    "event_time": "2026-01-16T12:00:00Z",
+}
+
+
+def test_buffered_ingest_drains_on_shutdown(client, engine, org_id, monkeypatch):
+    buffer = IngestBuffer(
+        flush_rows=2,
+        flush_interval=60,
+        session_factory=lambda: Session(engine),
+    )
+    monkeypatch.setattr("apps.api.app.main.ingest_buffer", buffer)
+    monkeypatch.setattr("apps.api.app.main.engine", engine)
+    metrics.reset()
+
+    with TestClient(app) as c:
+        event_ids = []
+        for _ in range(3):
+            resp = c.post("/v1/events/prediction", json=EVENT)
+            assert resp.status_code == 202
+            event_ids.append(resp.json()["event_id"])
+
+    with Session(engine) as session:
+        rows = session.exec(select(PredictionEvent)).all()
+        assert sorted(str(r.event_id) for r in rows) == sorted(event_ids)
+        assert session.get(ModelRegistry, (org_id, "fraud_v1")).event_count == 3
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["ingest_buffer_enqueued_total"] == 3
+    assert counters["ingest_buffer_flushed_rows_total"] == 3
+
+
+def test_buffered_ingest_backpressure(client, engine, monkeypatch):
+    buffer = IngestBuffer(max_rows=1, session_factory=lambda: Session(engine))
+    monkeypatch.setattr("apps.api.app.main.ingest_buffer", buffer)
+
+    assert client.post("/v1/events/prediction", json=EVENT).status_code == 202
+    resp = client.post("/v1/events/prediction", json=EVENT)
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+
+    assert buffer.flush_once() == 1
+    assert client.post("/v1/events/prediction", json=EVENT).status_code == 202
+
+
+def test_flushed_rows_are_stamped_by_the_database(engine, org_id):
+    # A row that sat in the buffer (or was retried) must not look older to the
+    # rollup aggregator than when it became visible.
+    buffer = IngestBuffer(session_factory=lambda: Session(engine))
+    accepted = datetime.utcnow() - timedelta(hours=1)
+    buffer.put(event_row(org_id, PredictionEventIn(**EVENT), accepted))
+    before = datetime.utcnow() - timedelta(seconds=1)
+    assert buffer.flush_once() == 1
+
+    with Session(engine) as session:
+        row = session.exec(select(PredictionEvent)).one()
+        assert before <= row.ingested_at <= datetime.utcnow() + timedelta(seconds=1)
+
+
+def test_bad_row_is_dropped_after_bounded_retries(engine, org_id, caplog):
+    buffer = IngestBuffer(max_retries=2, session_factory=lambda: Session(engine))
+    rows = [event_row(org_id, PredictionEventIn(**EVENT), datetime.utcnow()) for _ in range(5)]
+    rows[3]["event_id"] = rows[1]["event_id"]
+    for row in rows:
+        buffer.put(row)
+    metrics.reset()
+
+    with pytest.raises(IntegrityError):
+        buffer.flush_once()
+    assert len(buffer) == 5
+    assert buffer.flush_once() == 4
+    assert len(buffer) == 0
+
+    with Session(engine) as session:
+        assert len(session.exec(select(PredictionEvent)).all()) == 4
+    counters = metrics.snapshot()["counters"]
+    assert counters["ingest_buffer_dropped_rows_total"] == 1
+    assert counters["ingest_buffer_flush_errors_total"] == 2
+    assert str(rows[3]["event_id"]) in caplog.text
+
+
+def test_transient_errors_never_drop_rows(engine, org_id):
+    def unavailable():
+        raise OperationalError("connect", {}, Exception("connection refused"))
+
+    buffer = IngestBuffer(max_retries=1, session_factory=unavailable)
+    buffer.put(event_row(org_id, PredictionEventIn(**EVENT), datetime.utcnow()))
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            buffer.flush_once()
+    assert len(buffer) == 1
+
+    buffer.session_factory = lambda: Session(engine)
+    assert buffer.flush_once() == 1
+
+
+def test_shutdown_runs_every_step_when_one_fails(client, engine, org_id, monkeypatch, caplog):
+    buffer = IngestBuffer(flush_rows=100, flush_interval=60, session_factory=lambda: Session(engine))
+    polls, disposed = [], []
+
+    def broken_flush():
+        raise RuntimeError("boom")
+
+    async def dispose():
+        disposed.append(True)
+
+    monkeypatch.setattr("apps.api.app.main.ingest_buffer", buffer)
+    monkeypatch.setattr("apps.api.app.main.engine", engine)
+    monkeypatch.setattr("apps.api.app.main.model_stats_task", PeriodicTask("model_stats", broken_flush, 60))
+    monkeypatch.setattr(
+        "apps.api.app.main.api_key_revocation_task",
+        PeriodicTask("api_key_revocations", lambda: polls.append(True), 60, final_run=False),
+    )
+    monkeypatch.setattr("apps.api.app.main.dispose_async_engine", dispose)
+
+    with TestClient(app) as c:
+        assert c.post("/v1/events/prediction", json=EVENT).status_code == 202
+
+    assert "failed to stop model_stats" in caplog.text
+    with Session(engine) as session:
+        assert len(session.exec(select(PredictionEvent)).all()) == 1
+    # The revocation poll has nothing to save on the way out.
+    assert polls == []
+    assert disposed == [True]
@@ -0,0 +1,76 @@
+import struct
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import ModelRegistry, PredictionEvent
+from apps.api.app.frames import FRAME_CONTENT_TYPE, decode_frame, encode_frame
+from apps.api.app.main import app
+
+
+HEADERS = {"Content-Type": FRAME_CONTENT_TYPE}
+
+
+def _event(model_id="fraud_v1", entity_id="user_1", score=0.5, **kw):
+    return {
+        "model_id": model_id,
+        "entity_id": entity_id,
+        "score": score,
+        "event_time": datetime(2026, 1, 16, 12, 0, tzinfo=timezone.utc),
+        **kw,
+    }
+
+
+def test_frame_batch_is_stored_like_json(client, engine):
+    events = [
+        _event(),
+        _event(entity_id="ü-2", score=0.25, prediction="fraud"),
+        _event(model_id="churn_v2", score=-1.5),
+    ]
+    resp = client.post("/v1/events/prediction:batch", content=encode_frame(events), headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.json() == {"accepted": 3, "rejected": 0, "errors": []}
+
+    with Session(engine) as session:
+        rows = session.exec(select(PredictionEvent).order_by(PredictionEvent.score)).all()
+        assert [(r.entity_id, r.score, r.prediction) for r in rows] == [
+            ("user_1", -1.5, None), ("ü-2", 0.25, "fraud"), ("user_1", 0.5, None),
+        ]
+        assert {r.event_time for r in rows} == {datetime(2026, 1, 16, 12, 0)}
+        assert len(session.exec(select(ModelRegistry)).all()) == 2
+
+
+def test_frame_bad_rows_and_bad_frames():
+    frame = bytearray(encode_frame([_event(), _event()]))
+    # Point the second event's model index past the dictionary.
+    header = struct.calcsize("<4sBBHII") + 2 + len("fraud_v1")
+    frame[header + 4:header + 8] = struct.pack("<I", 7)
+    rows, errors = decode_frame(bytes(frame), "org", datetime(2026, 1, 1), 10)
+    assert len(rows) == 1
+    assert [e.index for e in errors] == [1]
+    assert errors[0].errors[0]["loc"] == ["model_id"]
+
+
+def test_frame_http_errors(client, monkeypatch):
+    frame = encode_frame([_event(), _event()])
+    resp = client.post("/v1/events/prediction:batch", content=frame[:-3], headers=HEADERS)
+    assert resp.status_code == 400
+
+    # Entity offsets 0, 6, 3: the second string would end before it starts.
+    events = [_event(entity_id="user_1"), _event(entity_id="user_2")]
+    frame = bytearray(encode_frame(events))
+    offsets = frame.index(struct.pack("<3I", 0, 6, 12))
+    frame[offsets + 8:offsets + 12] = struct.pack("<I", 3)
+    resp = client.post("/v1/events/prediction:batch", content=bytes(frame), headers=HEADERS)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "String offsets must not decrease"
+
+    frame = encode_frame(events)
+    monkeypatch.setattr("apps.api.app.main.INGEST_BATCH_MAX_EVENTS", 1)
+    resp = client.post("/v1/events/prediction:batch", content=frame, headers=HEADERS)
+    assert resp.status_code == 413
+
+
+def test_openapi_documents_both_content_types():
+    body = app.openapi()["paths"]["/v1/events/prediction:batch"]["post"]["requestBody"]
+    assert set(body["content"]) == {"application/json", FRAME_CONTENT_TYPE}
@@ -0,0 +1,55 @@
+import json
+
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import PredictionEvent, ModelRegistry
+from apps.api.app.model_stats import model_stats
+
+
+def _line(model_id="fraud_v1", score=0.5):
+    return json.dumps({
+        "model_id": model_id,
+        "entity_id": "user_1",
+        "score": score,
+        "event_time": "2026-01-16T12:00:00Z",
+    })
+
+
+def test_stream_flushes_in_chunks(client, engine, org_id, monkeypatch):
+    monkeypatch.setattr("apps.api.app.main.INGEST_STREAM_CHUNK_SIZE", 2)
+    lines = [_line(), _line(), "", "{not json", _line(score="bad"), _line(model_id="churn_v2")]
+    body = "\n".join(lines) + "\n"
+
+    def gen():
+        # Split mid-line to exercise incremental parsing.
+        data = body.encode("utf-8")
+        for i in range(0, len(data), 7):
+            yield data[i:i + 7]
+
+    resp = client.post(
+        "/v1/events/prediction:stream",
+        content=gen(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    out = resp.json()
+    assert out["accepted"] == 3
+    assert out["rejected"] == 2
+    assert [(c["accepted"], c["rejected"]) for c in out["chunks"]] == [(2, 0), (0, 2), (1, 0)]
+    assert [e["index"] for e in out["chunks"][1]["errors"]] == [3, 4]
+
+    with Session(engine) as session:
+        model_stats.flush(session)
+        assert len(session.exec(select(PredictionEvent)).all()) == 3
+        assert session.get(ModelRegistry, (org_id, "fraud_v1")).event_count == 2
+
+
+def test_stream_skips_oversized_line(client, monkeypatch):
+    monkeypatch.setattr("apps.api.app.main.INGEST_STREAM_MAX_LINE_BYTES", 256)
+    body = "x" * 1000 + "\n" + _line() + "\n"
+    resp = client.post("/v1/events/prediction:stream", content=body)
+    assert resp.status_code == 200
+    out = resp.json()
+    assert out["accepted"] == 1
+    assert out["rejected"] == 1
+    assert out["chunks"][0]["errors"][0]["errors"][0]["type"] == "line_too_long"
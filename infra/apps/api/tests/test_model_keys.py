@@ -0,0 +1,40 @@
+from sqlmodel import Session, select
+
+from apps.sentryml_core.model_keys import assign_model_keys, lookup_model_key, model_keys
+from apps.sentryml_core.models import ModelKey, PredictionEvent
+
+
+def test_events_store_integer_model_key(client, engine, org_id):
+    resp = client.post("/v1/events/prediction", json={
+        "model_id": "fraud_v1", "entity_id": "user_1", "score": 0.5,
+        "event_time": "2026-01-16T12:00:00Z",
+    })
+    assert resp.status_code == 200
+    assert resp.json()["model_id"] == "fraud_v1"
+    assert resp.json()["org_id"] == str(org_id)
+
+    with Session(engine) as session:
+        key = session.exec(select(ModelKey)).one()
+        assert (key.org_id, key.model_id) == (org_id, "fraud_v1")
+        event = session.exec(select(PredictionEvent)).one()
+        assert event.model_key == key.model_key
+    assert model_keys.get(org_id, "fraud_v1") == key.model_key
+
+
+def test_assign_is_idempotent_and_rollback_is_not_cached(engine, org_id):
+    with Session(engine) as session:
+        keys = assign_model_keys(session, org_id, ["a", "b"])
+        session.rollback()
+    assert model_keys.get(org_id, "a") is None
+
+    with Session(engine) as session:
+        keys = assign_model_keys(session, org_id, ["a", "b"])
+        session.commit()
+        assert assign_model_keys(session, org_id, ["b", "a"]) == keys
+        assert len(session.exec(select(ModelKey)).all()) == 2
+    assert model_keys.get(org_id, "b") == keys["b"]
+
+    model_keys.reset()
+    with Session(engine) as session:
+        assert lookup_model_key(session, org_id, "a") == keys["a"]
+        assert lookup_model_key(session, org_id, "missing") is None
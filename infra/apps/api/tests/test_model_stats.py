@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from apps.sentryml_core.models import ModelRegistry, MonitorConfig
+from apps.api.app.ingest import register_models
+from apps.api.app.model_stats import model_stats, queue_model_stats
+
+
+def test_deltas_fold_additively_and_keep_latest_seen(engine, org_id):
+    t0 = datetime(2026, 1, 1)
+    with Session(engine) as session:
+        session.add(ModelRegistry(org_id=org_id, model_id="m", first_seen_at=t0, last_seen_at=t0, event_count=10))
+        session.commit()
+
+    model_stats.record(org_id, "m", 3, t0 + timedelta(minutes=5))
+    model_stats.record(org_id, "m", 2, t0 + timedelta(minutes=1))
+    with Session(engine) as session:
+        assert model_stats.flush(session) == 1
+        assert model_stats.flush(session) == 0
+        model = session.get(ModelRegistry, (org_id, "m"))
+        assert model.event_count == 15
+        assert model.last_seen_at == t0 + timedelta(minutes=5)
+
+
+def test_queued_deltas_apply_on_commit_only(engine, org_id):
+    now = datetime(2026, 1, 1)
+    with Session(engine) as session:
+        queue_model_stats(session, org_id, {"m": 4}, now)
+        session.rollback()
+    assert model_stats.pending() == 0
+    assert not model_stats.is_known(org_id, "m")
+
+    with Session(engine) as session:
+        queue_model_stats(session, org_id, {"m": 4}, now)
+        session.commit()
+    assert model_stats.pending() == 1
+    assert model_stats.is_known(org_id, "m")
+
+
+def test_concurrent_first_contact_registers_once(engine, org_id):
+    now = datetime(2026, 1, 1)
+    # Two replicas that have never seen the model both register it.
+    for _ in range(2):
+        model_stats.reset()
+        with Session(engine) as session:
+            register_models(session, org_id, {"new_model": 1}, now)
+            session.commit()
+        with Session(engine) as session:
+            model_stats.flush(session)
+
+    with Session(engine) as session:
+        assert session.get(ModelRegistry, (org_id, "new_model")).event_count == 2
+        configs = session.exec(select(MonitorConfig).where(MonitorConfig.model_id == "new_model")).all()
+        assert len(configs) == 1
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import Session
+
+from apps.api.app import metrics
+from apps.api.app.session_cache import SessionCache
+
+from apps.sentryml_core.models import (ModelRegistry, PredictionRollup,
+                                       SessionToken, User)
+
+
+EVENT = {
+    "model_id": "fraud_v1",
+    "entity_id": "user_1",
+    "score": 0.5,
+    "event_time": "2026-01-16T12:00:00Z",
+}
+
+
+def login(engine, org_id) -> str:
+    user = User(user_id=uuid4(), org_id=org_id, email="a@example.com", password_hash="x")
+    token = SessionToken(user_id=user.user_id)
+    with Session(engine) as session:
+        session.add(user)
+        session.add(token)
+        session.commit()
+        return str(token.session_id)
+
+
+def test_dashboard_counts_raw_and_rolled_up_events(client, engine, org_id):
+    session_id = login(engine, org_id)
+
+    for _ in range(2):
+        assert client.post("/v1/events/prediction", json=EVENT).status_code == 200
+
+    horizon = datetime(2026, 1, 16)
+    with Session(engine) as session:
+        model = session.get(ModelRegistry, (org_id, "fraud_v1"))
+        model.raw_rolled_up_until = horizon
+        session.add(model)
+        session.add(PredictionRollup(
+            org_id=org_id, model_id="fraud_v1",
+            bucket_start=horizon - timedelta(hours=1), count=5,
+        ))
+        session.commit()
+
+    client.cookies.set("sentryml_session", session_id)
+    resp = client.get("/v1/ui/dashboard")
+    assert resp.status_code == 200
+    [row] = resp.json()["models"]
+    assert row["model_id"] == "fraud_v1"
+    assert row["prediction_count"] == 7
+
+    client.cookies.clear()
+    assert client.get("/v1/ui/dashboard").status_code == 401
+
+
+def test_session_is_cached_until_logout(client, engine, org_id):
+    session_id = login(engine, org_id)
+    client.cookies.set("sentryml_session", session_id)
+    metrics.reset()
+
+    for _ in range(3):
+        assert client.get("/v1/ui/dashboard").status_code == 200
+    counters = metrics.snapshot()["counters"]
+    assert counters["ui_session_cache_misses_total"] == 1
+    assert counters["ui_session_cache_hits_total"] == 2
+
+    assert client.post("/v1/auth/logout").status_code == 200
+    # A copy of the cookie kept elsewhere is refused too.
+    client.cookies.set("sentryml_session", session_id)
+    assert client.get("/v1/ui/dashboard").status_code == 401
+
+
+def test_logout_reaches_other_replicas_on_revocation_poll(client, engine, org_id, monkeypatch):
+    # The dashboard is served by a second replica; logout runs on this one.
+    replica = SessionCache(ttl=30, max_size=100)
+    monkeypatch.setattr("apps.api.app.deps_auth.session_cache", replica)
+    session_id = login(engine, org_id)
+    client.cookies.set("sentryml_session", session_id)
+    assert client.get("/v1/ui/dashboard").status_code == 200
+
+    assert client.post("/v1/auth/logout").status_code == 200
+    client.cookies.set("sentryml_session", session_id)
+    assert client.get("/v1/ui/dashboard").status_code == 200
+
+    with Session(engine) as session:
+        assert replica.invalidate_revoked(session) == 1
+    assert client.get("/v1/ui/dashboard").status_code == 401
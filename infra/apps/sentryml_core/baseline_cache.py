@@ -0,0 +1,87 @@
+"""
+Baseline bins persisted across worker runs.
+
+A monitor's baseline window covers days of scores, yet between two worker
+runs it only moves by the run interval. Fetching and re-binning all of it
+every run is the bulk of the drift job. Instead, the window is aligned to
+a fixed grid (see baseline_window) and its BaselineBins are stored in
+`baseline_cache`, one row per model.
+
+Staleness rules. A cached row is used only while all of these still match:
+- the aligned baseline window (start, end). It rolls over once per
+  refresh period, and then the bins are rebuilt.
+- the monitor's num_bins and its config version (MonitorConfig.updated_at,
+  bumped by every monitor update)
+- the drift source (raw scores or hourly sketches)
+
+Within a period the cache does not see:
+- events that arrive late with an event_time inside the cached window
+- raw rows of the window being replaced by rollups
+Both are picked up at the next roll-over. The current window is never
+cached.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+from sqlmodel import Session
+
+from apps.sentryml_core.drift import BaselineBins
+from apps.sentryml_core.models import BaselineCache, MonitorConfig
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def baseline_window(
+    current_start: datetime, baseline_days: int, refresh_hours: float
+) -> Tuple[datetime, datetime]:
+    """
+    The baseline window ending at the last multiple of `refresh_hours` (since
+    the epoch) at or before `current_start`, so it stays put between runs.
+    Lags the current window by less than one refresh period.
+    """
+    period = timedelta(hours=refresh_hours)
+    end = _EPOCH + ((current_start - _EPOCH) // period) * period
+    return end - timedelta(days=baseline_days), end
+
+
+def cached_baseline_bins(
+    session: Session,
+    monitor: MonitorConfig,
+    source: str,
+    start: datetime,
+    end: datetime,
+    build: Callable[[], Optional[BaselineBins]],
+    now: datetime,
+) -> Optional[BaselineBins]:
+    """
+    Bins for `monitor`'s baseline window from the cache, or from `build()`
+    (stored for later runs) when the cached row is missing or stale. `build`
+    returning None (no baseline data) is not cached. The caller owns the commit.
+    """
+    row = session.get(BaselineCache, (monitor.org_id, monitor.model_id))
+    if (
+        row is not None
+        and row.source == source
+        and row.baseline_start == start
+        and row.baseline_end == end
+        and row.num_bins == monitor.num_bins
+        and row.config_version == monitor.updated_at
+    ):
+        return BaselineBins.from_dict(row.bins)
+
+    bins = build()
+    if bins is None:
+        return None
+    if row is None:
+        row = BaselineCache(org_id=monitor.org_id, model_id=monitor.model_id)
+    row.source = source
+    row.baseline_start = start
+    row.baseline_end = end
+    row.num_bins = monitor.num_bins
+    row.config_version = monitor.updated_at
+    row.bins = bins.to_dict()
+    row.built_at = now
+    session.add(row)
+    return bins
@@ -1,5 +1,12 @@
+from sqlalchemy import DateTime
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 import os
+from typing import Optional
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -10,4 +17,90 @@ engine = create_engine(
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def async_database_url(url: str) -> str:
+    """
+    The asyncio-driver form of a sync database URL: asyncpg for Postgres,
+    aiosqlite for SQLite. Other URLs are returned unchanged.
+    """
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend == "postgresql":
+        u = u.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    return u.render_as_string(hide_password=False)
+
+
+# Defaults to DATABASE_URL with the driver swapped, so one setting serves both.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    async_database_url(DATABASE_URL) if DATABASE_URL else None
+)
+
+_async_engine: Optional[AsyncEngine] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    The engine behind async routes. Created on first use, so processes that
+    never serve one (worker, migrations) do not need the asyncio driver.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+async def get_async_session():
+    # Nothing is lazy-loaded under asyncio, so keep attributes after commit.
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+def dialect_insert(session: Session):
+    """
+    Return the dialect-specific `insert` construct (supports ON CONFLICT)
+    for the database behind `session`. Postgres in production, SQLite in tests.
+    """
+    name = session.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {name}")
+    return insert
+
+
+class db_utcnow(FunctionElement):
+    """
+    Naive UTC wall-clock time on the database server, evaluated per row as
+    it is inserted (not at transaction start). Used for
+    prediction_events.ingested_at, see sentryml_core.rollups.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(db_utcnow)
+def _db_utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(db_utcnow, "postgresql")
+def _db_utcnow_postgresql(element, compiler, **kw):
+    return "timezone('utc', clock_timestamp())"
+
+
+@compiles(db_utcnow, "sqlite")
+def _db_utcnow_sqlite(element, compiler, **kw):
+    # Same text format SQLAlchemy stores SQLite datetimes in (microseconds).
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
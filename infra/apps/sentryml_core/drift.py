@@ -1,7 +1,16 @@
 from __future__ import annotations
 
+import bisect
 import math
-from typing import Sequence, List, Tuple
+import random
+from typing import Callable, Iterable, Optional, Sequence, List, Tuple, Union
+
+from apps.sentryml_core.sketch import ScoreSketch
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
 
 def _quantile(sorted_vals: Sequence[float], q: float) -> float:
     """
@@ -35,7 +44,10 @@ def quantile_edges(baseline: Sequence[float], num_bins: int) -> List[float]:
         raise ValueError("baseline is empty")
     
     edges = [_quantile(b, n / num_bins) for n in range(num_bins + 1)]
+    return _nudge_ties(edges)
 
+
+def _nudge_ties(edges: List[float]) -> List[float]:
     # Ensure strictly increasing edges (handle constant/near-constant distributions)
     # Nudge ties by a tiny epsilon that grows with magnitude.
     for i in range(1, len(edges)):
@@ -90,33 +102,170 @@ def winsorize(values: Sequence[float], lo: float, hi: float) -> List[float]:
     return out
 
 def psi_quantile(
-        baseline: Sequence[float],
-        current: Sequence[float],
+        baseline: Union[Sequence[float], ScoreSketch],
+        current: Union[Sequence[float], ScoreSketch],
         num_bins: int = 10,
         eps: float = 1e-6,
         winsor_q: float = 0.01, # clip current to baseline [q, 1-q]
 ) -> float:
     """
     PSI with quantile bins derived from baseline.
-    Works for unbounded scores.
+    Works for unbounded scores. Also accepts two ScoreSketches (see psi_sketch).
     
     - Compute edges from baseline quantiles.
     - Winsorize current to baseline [q, 1-q] range to reduce extreme outliner impact.
     """
+    if isinstance(baseline, ScoreSketch) and isinstance(current, ScoreSketch):
+        return psi_sketch(baseline, current, num_bins=num_bins, eps=eps, winsor_q=winsor_q)
     if len(baseline) == 0 or len(current) == 0:
         return 0.0
-    
+    if np is not None:
+        return _psi_quantile_np(baseline, current, num_bins, eps, winsor_q)
+    return _psi_quantile_py(baseline, current, num_bins, eps, winsor_q)
+
+
+class BaselineBins:
+    """
+    Everything PSI needs from a baseline: the quantile bin edges, the winsor
+    bounds applied to current values and the baseline's count per bin. Built
+    once, it can be scored against any number of current windows (and cached,
+    see to_dict).
+    """
+
+    def __init__(self, edges: List[float], lo: float, hi: float, counts: List[int]):
+        self.edges = edges
+        self.lo = lo
+        self.hi = hi
+        self.counts = counts
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def to_dict(self) -> dict:
+        return {"edges": self.edges, "lo": self.lo, "hi": self.hi, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BaselineBins":
+        return cls(
+            [float(e) for e in data["edges"]],
+            float(data["lo"]),
+            float(data["hi"]),
+            [int(c) for c in data["counts"]],
+        )
+
+
+def baseline_bins(
+        baseline: Union[Sequence[float], ScoreSketch],
+        num_bins: int = 10,
+        winsor_q: float = 0.01,
+) -> BaselineBins:
+    """The baseline half of psi_quantile / psi_sketch."""
+    if num_bins <= 1:
+        raise ValueError("num_bins must be > 1")
+    if isinstance(baseline, ScoreSketch):
+        return _baseline_bins_sketch(baseline, num_bins, winsor_q)
+    if np is not None:
+        return _baseline_bins_np(baseline, num_bins, winsor_q)
+    return _baseline_bins_py(baseline, num_bins, winsor_q)
+
+
+def psi_from_bins(
+        bins: BaselineBins,
+        current: Union[Sequence[float], ScoreSketch],
+        eps: float = 1e-6,
+) -> float:
+    """
+    The current half: same value as psi_quantile (raw) or psi_sketch (sketch)
+    would give for the baseline `bins` were built from.
+    """
+    if not isinstance(current, ScoreSketch) and len(current) == 0:
+        return 0.0
+    return psi_from_counts(bins.counts, bin_counts(bins, current), eps)
+
+
+def bin_counts(bins: BaselineBins, current: Union[Sequence[float], ScoreSketch]) -> List[int]:
+    """Count of (winsorized) `current` per bin of `bins`."""
+    if isinstance(current, ScoreSketch):
+        return _current_counts_sketch(bins, current)
+    if np is not None and len(current):
+        return _current_counts_np(bins, current)
+    return _current_counts_py(bins, current)
+
+
+def baseline_quantiles(num_bins: int, winsor_q: float = 0.01) -> List[float]:
+    """
+    The baseline quantiles (q in [0, 1]) BaselineBins is derived from: the
+    num_bins + 1 bin edges, then the two winsor bounds. For engines that get
+    quantiles from elsewhere (see edges_from_quantiles).
+    """
+    if num_bins <= 1:
+        raise ValueError("num_bins must be > 1")
+    return [n / num_bins for n in range(num_bins + 1)] + [winsor_q, 1.0 - winsor_q]
+
+
+def edges_from_quantiles(values: Sequence[float]) -> Tuple[List[float], float, float]:
+    """(edges, lo, hi) from the values at baseline_quantiles(), as psi_quantile derives them."""
+    return _nudge_ties([float(v) for v in values[:-2]]), float(values[-2]), float(values[-1])
+
+
+def _baseline_bins_py(baseline, num_bins, winsor_q) -> BaselineBins:
     edges = quantile_edges(baseline, num_bins)
 
-    # Winsorize current using baseline's inner quantiles
+    # Winsor bounds for current: baseline's inner quantiles
     b_sorted = sorted(float(x) for x in baseline)
     lo = _quantile(b_sorted, winsor_q)
     hi = _quantile(b_sorted, 1.0 - winsor_q)
-    cur = winsorize(current, lo, hi)
+    return BaselineBins(edges, lo, hi, _histogram(baseline, edges))
+
+
+def _current_counts_py(bins: BaselineBins, current) -> List[int]:
+    return _histogram(winsorize(current, bins.lo, bins.hi), bins.edges)
+
+
+def _psi_quantile_py(baseline, current, num_bins, eps, winsor_q) -> float:
+    """Pure-Python engine, used when NumPy is not installed."""
+    bins = _baseline_bins_py(baseline, num_bins, winsor_q)
+    return psi_from_counts(bins.counts, _current_counts_py(bins, current), eps)
+
+
+def _baseline_bins_np(baseline, num_bins, winsor_q) -> BaselineBins:
+    if num_bins <= 1:
+        raise ValueError("num_bins must be > 1")
+    b = np.sort(np.asarray(baseline, dtype=np.float64))
+    edges = _nudge_ties([_quantile(b, n / num_bins) for n in range(num_bins + 1)])
+    lo = _quantile(b, winsor_q)
+    hi = _quantile(b, 1.0 - winsor_q)
+    return BaselineBins(edges, lo, hi, _histogram_np(b, edges))
+
+
+def _current_counts_np(bins: BaselineBins, current) -> List[int]:
+    cur = np.asarray(current, dtype=np.float64)
+    # Not np.clip: winsorize() keeps `lo` when lo > hi (winsor_q > 0.5).
+    cur = np.where(cur < bins.lo, bins.lo, np.where(cur > bins.hi, bins.hi, cur))
+    return _histogram_np(cur, bins.edges)
+
+
+def _psi_quantile_np(baseline, current, num_bins, eps, winsor_q) -> float:
+    """
+    Vectorized engine with the same results as _psi_quantile_py: one sort,
+    edges and winsor bounds from the same _quantile arithmetic, binning by
+    searchsorted.
+    """
+    bins = _baseline_bins_np(baseline, num_bins, winsor_q)
+    return psi_from_counts(bins.counts, _current_counts_np(bins, current), eps)
 
-    b_counts = _histogram(baseline, edges)
-    c_counts = _histogram(cur, edges)
 
+def _histogram_np(values, edges: Sequence[float]) -> List[int]:
+    """_histogram over an array: same bins, NaNs dropped as _histogram drops them."""
+    values = values[~np.isnan(values)]
+    idx = np.searchsorted(np.asarray(edges), values, side="right") - 1
+    idx = np.clip(idx, 0, len(edges) - 2)
+    return np.bincount(idx, minlength=len(edges) - 1).tolist()
+
+
+def psi_from_counts(b_counts: Sequence[int], c_counts: Sequence[int], eps: float = 1e-6) -> float:
+    """PSI between two histograms over the same bins."""
     b_total = sum(b_counts)
     c_total = sum(c_counts)
     if b_total == 0 or c_total == 0:
@@ -128,4 +277,255 @@ def psi_quantile(
         c_pct = max(c / c_total, eps)
         score += (c_pct - b_pct) * math.log(c_pct / b_pct)
 
-    return float(score)
\ No newline at end of file
+    return float(score)
+
+
+def _bin_index(x: float, edges: Sequence[float]) -> int:
+    """Same bins as _histogram: out-of-range values go to the end bins, last bin includes right edge."""
+    if x >= edges[-1]:
+        return len(edges) - 2
+    return max(bisect.bisect_right(edges, x) - 1, 0)
+
+
+def _baseline_bins_sketch(baseline: ScoreSketch, num_bins, winsor_q) -> BaselineBins:
+    edges = _nudge_ties([baseline.quantile(n / num_bins) for n in range(num_bins + 1)])
+    lo = baseline.quantile(winsor_q)
+    hi = baseline.quantile(1.0 - winsor_q)
+
+    counts = [0] * num_bins
+    for v, c in baseline.items():
+        counts[_bin_index(v, edges)] += c
+    return BaselineBins(edges, lo, hi, counts)
+
+
+def _current_counts_sketch(bins: BaselineBins, current: ScoreSketch) -> List[int]:
+    counts = [0] * (len(bins.edges) - 1)
+    for v, c in current.items():
+        counts[_bin_index(min(max(v, bins.lo), bins.hi), bins.edges)] += c
+    return counts
+
+
+def psi_sketch(
+        baseline: ScoreSketch,
+        current: ScoreSketch,
+        num_bins: int = 10,
+        eps: float = 1e-6,
+        winsor_q: float = 0.01,
+) -> float:
+    """
+    psi_quantile computed from two ScoreSketches (e.g. merged hourly rollups)
+    instead of raw scores.
+
+    Error bound: a sketch with relative accuracy alpha moves every value, and
+    every quantile edge / winsor bound, by at most alpha * |value|. Only values
+    within that distance of a bin edge can change bins, so each bin fraction is
+    off by at most the share of the data in the band edge * (1 +/- 2 * alpha).
+    With the default alpha = 0.01 and 10 bins this keeps PSI within about 0.01
+    of psi_quantile on continuous score distributions (see tests). Large
+    masses of identical values sitting exactly on an edge can exceed this.
+    """
+    if baseline.count == 0 or current.count == 0:
+        return 0.0
+    if num_bins <= 1:
+        raise ValueError("num_bins must be > 1")
+
+    bins = _baseline_bins_sketch(baseline, num_bins, winsor_q)
+    return psi_from_counts(bins.counts, _current_counts_sketch(bins, current), eps)
+
+
+class KLLSketch:
+    """
+    Streaming quantile estimator (KLL: Karnin, Lang & Liberty 2016) in
+    O(k log(n / k)) memory, however many values it has seen.
+
+    Values are kept in a stack of levels. Level h holds values that each
+    stand for 2**h inputs, and the capacity of lower levels shrinks
+    geometrically (by `c`) from `k` at the top. A full level is sorted, and
+    every other value, starting at a random offset, is promoted to the next
+    level. Total weight stays exactly `count`. Ranks, and so quantiles, come
+    back with a normalized rank error of roughly 1 / k (about 0.5% at the
+    default k=200, see tests). Larger k is more accurate and larger.
+
+    `seed` fixes the promotion coin flips, so the same input gives the same
+    sketch (and PSI) on every run.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2.0 / 3.0, seed: Optional[int] = 0):
+        if k < 8:
+            raise ValueError("k must be >= 8")
+        self.k = k
+        self.c = c
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._rng = random.Random(seed)
+        self._levels: List[List[float]] = []
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def _grow(self) -> None:
+        self._levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self._levels)))
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self._levels) - height - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def add_many(self, values: Iterable[float]) -> None:
+        """Add a chunk of values; memory goes back to O(sketch) before returning."""
+        chunk = [float(x) for x in values]
+        chunk = [x for x in chunk if x == x]  # drop NaNs, as _histogram does
+        if not chunk:
+            return
+        lo, hi = min(chunk), max(chunk)
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.count += len(chunk)
+        self._levels[0].extend(chunk)
+        self._size += len(chunk)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def add(self, x: float) -> None:
+        self.add_many((x,))
+
+    def _compress(self) -> None:
+        for h, level in enumerate(self._levels):
+            if len(level) < self._capacity(h):
+                continue
+            if h + 1 == len(self._levels):
+                self._grow()
+            level.sort()
+            # An odd value out stays behind at its weight.
+            kept = [level.pop()] if len(level) % 2 else []
+            self._levels[h + 1].extend(level[self._rng.random() < 0.5::2])
+            self._levels[h] = kept
+            self._size = sum(len(lv) for lv in self._levels)
+            return
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self._levels) < len(other._levels):
+            self._grow()
+        for h, level in enumerate(other._levels):
+            self._levels[h].extend(level)
+        self.count += other.count
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._size = sum(len(lv) for lv in self._levels)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def items(self) -> List[Tuple[float, int]]:
+        """(value, weight) pairs, ascending by value."""
+        return sorted((x, 1 << h) for h, level in enumerate(self._levels) for x in level)
+
+    def quantile(self, q: float) -> float:
+        """
+        q in [0, 1]. Same rank convention as ScoreSketch.quantile: the value
+        holding rank round(q * (count - 1)), without interpolation.
+        """
+        if self.count == 0:
+            raise ValueError("Empty sketch")
+        if q <= 0:
+            return float(self.min)
+        if q >= 1:
+            return float(self.max)
+        rank = int(round(q * (self.count - 1)))
+        seen = 0
+        for x, w in self.items():
+            seen += w
+            if seen > rank:
+                return x
+        return float(self.max)
+
+
+class HistogramAccumulator:
+    """
+    Counts per bin of `edges` (same bins as _histogram) for values fed one
+    chunk at a time, winsorized to `clamp` = (lo, hi) first if given.
+    Memory is O(bins + chunk).
+    """
+
+    def __init__(self, edges: Sequence[float], clamp: Optional[Tuple[float, float]] = None):
+        self.edges = list(edges)
+        self.clamp = clamp
+        self.counts = [0] * (len(self.edges) - 1)
+
+    def add_many(self, values: Sequence[float]) -> None:
+        if len(values) == 0:
+            return
+        if np is not None:
+            v = np.asarray(values, dtype=np.float64)
+            if self.clamp is not None:
+                lo, hi = self.clamp
+                v = np.where(v < lo, lo, np.where(v > hi, hi, v))
+            counts = _histogram_np(v, self.edges)
+        else:
+            if self.clamp is not None:
+                values = winsorize(values, *self.clamp)
+            counts = _histogram(values, self.edges)
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+
+
+def streaming_baseline_bins(
+        baseline_chunks: Callable[[], Iterable[Sequence[float]]],
+        num_bins: int = 10,
+        winsor_q: float = 0.01,
+        k: int = 200,
+) -> Optional[BaselineBins]:
+    """
+    baseline_bins in O(bins + sketch + chunk) memory. `baseline_chunks()` is
+    called twice and must yield the same chunks each time: once to feed a
+    KLLSketch for the edges and winsor bounds, once to count the bins
+    exactly. None if the baseline is empty.
+    """
+    if num_bins <= 1:
+        raise ValueError("num_bins must be > 1")
+    sketch = KLLSketch(k=k)
+    for chunk in baseline_chunks():
+        sketch.add_many(chunk)
+    if sketch.count == 0:
+        return None
+
+    edges, lo, hi = edges_from_quantiles(
+        [sketch.quantile(q) for q in baseline_quantiles(num_bins, winsor_q)]
+    )
+    acc = HistogramAccumulator(edges)
+    for chunk in baseline_chunks():
+        acc.add_many(chunk)
+    return BaselineBins(edges, lo, hi, acc.counts)
+
+
+def streaming_bin_counts(bins: BaselineBins, current_chunks: Iterable[Sequence[float]]) -> List[int]:
+    """bin_counts over a current window fed chunk by chunk."""
+    acc = HistogramAccumulator(bins.edges, clamp=(bins.lo, bins.hi))
+    for chunk in current_chunks:
+        acc.add_many(chunk)
+    return acc.counts
+
+
+def psi_streaming(
+        baseline_chunks: Callable[[], Iterable[Sequence[float]]],
+        current_chunks: Iterable[Sequence[float]],
+        num_bins: int = 10,
+        eps: float = 1e-6,
+        winsor_q: float = 0.01,
+        k: int = 200,
+) -> float:
+    """
+    psi_quantile over chunked input in O(bins + sketch + chunk) memory.
+
+    Error bound: only the edges and winsor bounds are estimated, and each
+    sits within a rank error of about 1 / k of the exact quantile. Bin
+    counts on both sides are exact for those edges. So each baseline bin
+    holds 1 / num_bins +/- 2 / k of the data instead of exactly
+    1 / num_bins, and the current bins shift by the share of current data
+    in the same bands. At k=200 and 10 bins this keeps PSI within about
+    0.01 of psi_quantile on continuous score distributions (see tests).
+    """
+    bins = streaming_baseline_bins(baseline_chunks, num_bins=num_bins, winsor_q=winsor_q, k=k)
+    if bins is None:
+        return 0.0
+    return psi_from_counts(bins.counts, streaming_bin_counts(bins, current_chunks), eps)
@@ -0,0 +1,161 @@
+"""
+Drift histograms computed by the database.
+
+fetch_scores ships every raw score of both windows to the worker only to
+bin it there. The functions here leave the scores where they are: the
+database computes the baseline quantiles and each window's count per bin,
+and only ~num_bins numbers per window come back.
+
+- Quantiles. On Postgres, one percentile_cont over an array of all the
+  needed q. Elsewhere (SQLite), the rows at the ranks drift._quantile
+  interpolates between are picked with ROW_NUMBER() and interpolated here.
+- Bins. On Postgres, width_bucket over the inner edges. Elsewhere, a CASE
+  over them. Either way the counts come from a GROUP BY on the bin.
+
+The bins, the winsorizing of current scores and the PSI are those of
+psi_quantile. On SQLite the result is identical. Postgres interpolates
+percentile_cont as lo + (hi - lo) * frac, so an edge can differ from
+psi_quantile's in the last bit. That only moves scores lying exactly on the
+edge.
+
+Only raw events are read. Windows reaching back past a model's raw retention
+horizon must use another source (run_once falls back to fetch_scores).
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, case, cast, func, type_coerce
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+from apps.sentryml_core.drift import BaselineBins, baseline_quantiles, edges_from_quantiles
+from apps.sentryml_core.model_keys import lookup_model_key
+from apps.sentryml_core.models import PredictionEvent
+
+
+def _window(model_key: int, start: datetime, end: datetime):
+    return (
+        (PredictionEvent.model_key == model_key)
+        & (PredictionEvent.event_time >= start)
+        & (PredictionEvent.event_time < end)
+        & (PredictionEvent.score != None)  # noqa: E711
+    )
+
+
+def _is_postgres(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def _float8(values: Sequence[float]):
+    # Bound as float8, not as numeric literals, so comparisons are exact.
+    return postgresql.array([cast(v, postgresql.DOUBLE_PRECISION) for v in values])
+
+
+def _interpolate(by_rank: Dict[int, float], n: int, q: float) -> float:
+    """drift._quantile over the sorted window, given the values at the ranks it reads."""
+    if n == 1:
+        return float(by_rank[0])
+    pos = (n - 1) * q
+    lo = int(math.floor(pos))
+    hi = int(math.ceil(pos))
+    if lo == hi:
+        return float(by_rank[lo])
+    frac = pos - lo
+    return float(by_rank[lo] * (1 - frac) + by_rank[hi] * frac)
+
+
+def window_quantiles(session: Session, cond, qs: List[float]) -> Tuple[int, List[float]]:
+    """(row count, score quantiles at `qs`) of the events matching `cond`."""
+    if _is_postgres(session):
+        n, values = session.exec(
+            select(
+                func.count(),
+                type_coerce(
+                    func.percentile_cont(_float8(qs)).within_group(PredictionEvent.score),
+                    postgresql.ARRAY(Float),
+                ),
+            ).where(cond)
+        ).one()
+        return int(n), [float(v) for v in values or []]
+
+    n = session.exec(select(func.count()).select_from(PredictionEvent).where(cond)).one()
+    if n == 0:
+        return 0, []
+    ranks = set()
+    for q in qs:
+        pos = (n - 1) * q
+        ranks.update((int(math.floor(pos)), int(math.ceil(pos))))
+    ranked = select(
+        PredictionEvent.score,
+        (func.row_number().over(order_by=PredictionEvent.score) - 1).label("rank"),
+    ).where(cond).subquery()
+    by_rank = dict(session.exec(
+        select(ranked.c.rank, ranked.c.score).where(ranked.c.rank.in_(sorted(ranks)))
+    ).all())
+    return n, [_interpolate(by_rank, n, q) for q in qs]
+
+
+def window_bin_counts(
+    session: Session,
+    cond,
+    edges: List[float],
+    clamp: Optional[Tuple[float, float]] = None,
+) -> List[int]:
+    """Count per bin (drift._histogram's bins) of the scores matching `cond`, clamped to `clamp` first."""
+    x = PredictionEvent.score
+    if clamp is not None:
+        lo, hi = clamp
+        # Same order as winsorize(): lo wins when lo > hi.
+        x = case((x < lo, lo), (x > hi, hi), else_=x)
+
+    inner = edges[1:-1]
+    if _is_postgres(session):
+        # Bins are [e_i, e_i+1): the number of inner edges <= x.
+        bin_ = func.width_bucket(cast(x, postgresql.DOUBLE_PRECISION), _float8(inner))
+    else:
+        bin_ = case(*((x < e, i) for i, e in enumerate(inner)), else_=len(inner))
+    binned = select(bin_.label("bin")).where(cond).subquery()
+
+    counts = [0] * (len(edges) - 1)
+    for i, c in session.exec(select(binned.c.bin, func.count()).group_by(binned.c.bin)).all():
+        counts[int(i)] = int(c)
+    return counts
+
+
+def sql_baseline_bins(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: datetime,
+    end: datetime,
+    num_bins: int = 10,
+    winsor_q: float = 0.01,
+) -> Optional[BaselineBins]:
+    """drift.baseline_bins over the raw scores in [start, end). None if there are none."""
+    key = lookup_model_key(session, org_id, model_id)
+    if key is None:
+        return None
+    cond = _window(key, start, end)
+    n, values = window_quantiles(session, cond, baseline_quantiles(num_bins, winsor_q))
+    if n == 0:
+        return None
+    edges, lo, hi = edges_from_quantiles(values)
+    return BaselineBins(edges, lo, hi, window_bin_counts(session, cond, edges))
+
+
+def sql_bin_counts(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: datetime,
+    end: datetime,
+    bins: BaselineBins,
+) -> List[int]:
+    """drift.bin_counts over the raw scores in [start, end)."""
+    key = lookup_model_key(session, org_id, model_id)
+    if key is None:
+        return [0] * (len(bins.edges) - 1)
+    return window_bin_counts(session, _window(key, start, end), bins.edges, clamp=(bins.lo, bins.hi))
@@ -0,0 +1,208 @@
+"""
+Incremental drift windows.
+
+`window_sketch` re-merges every hourly rollup of a window on each call: a
+7-day baseline is 168 rollup reads per model per run, although the window
+only moved by one run interval. A DriftWindowState keeps the merged
+ScoreSketch of a window instead, one row per (org, model, window name), and
+each run only
+- adds the raw events ingested since the state was last synced whose hour
+  is inside the stored window,
+- subtracts the rollups of the hours that slid out at the start, and
+- merges the rollups of the hours that slid in at the end.
+The cost of a run follows the new events and the elapsed hours, not the
+window length.
+
+Invariant: a state holds exactly the scored events with an event_time in its
+hours [window_start, window_end) and ingested before `synced_until`, which is
+always a value of the rollup ingest checkpoint. The rollups it subtracts or
+merges hold exactly those events too, so nothing is counted twice. Per-hour
+min/max are stored next to the sketch so its min/max stay exact when hours
+drop out.
+
+The checkpoint is read FOR SHARE (rollups.synced_checkpoint), so an
+aggregator committing halfway through cannot hand us rollups holding events
+ingested after it. Without row locks (SQLite) the checkpoint is read again at
+the end instead, and the state is rebuilt if it moved.
+
+Like rollups, states are hour-granular: a window [start, end) covers the hours
+whose bucket starts in it. A state is rebuilt from the rollups when there is
+none yet, when the window moves backwards (e.g. a monitor's window got
+longer), when it moved past the stored window entirely, or when the stored
+state turns out not to match the rollups it subtracts.
+"""
+from __future__ import annotations
+
+import logging
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from apps.sentryml_core.model_keys import lookup_model_key
+from apps.sentryml_core.models import DriftWindowState, PredictionEvent, PredictionRollup
+from apps.sentryml_core.rollups import (
+    ROLLUP_BUCKET,
+    SKETCH_ALPHA,
+    floor_hour,
+    synced_checkpoint,
+    window_sketch,
+)
+from apps.sentryml_core.sketch import ScoreSketch
+
+
+logger = logging.getLogger(__name__)
+
+
+def ceil_hour(ts: datetime) -> datetime:
+    start = floor_hour(ts)
+    return start if start == ts else start + ROLLUP_BUCKET
+
+
+def _rollups(session: Session, org_id, model_id: str, start: datetime, end: datetime) -> List[PredictionRollup]:
+    if start >= end:
+        return []
+    return list(session.exec(
+        select(PredictionRollup).where(
+            (PredictionRollup.org_id == org_id)
+            & (PredictionRollup.model_id == model_id)
+            & (PredictionRollup.bucket_start >= start)
+            & (PredictionRollup.bucket_start < end)
+        )
+    ).all())
+
+
+def _add_events(
+    session: Session,
+    sketch: ScoreSketch,
+    bounds: Dict[str, list],
+    model_key: int,
+    cond,
+) -> None:
+    rows = session.exec(
+        select(PredictionEvent.event_time, PredictionEvent.score).where(
+            (PredictionEvent.model_key == model_key) & (PredictionEvent.score != None) & cond  # noqa: E711
+        )
+    )
+    for event_time, score in rows:
+        if not math.isfinite(score):
+            continue
+        sketch.add(score)
+        b = bounds.setdefault(floor_hour(event_time).isoformat(), [score, score])
+        b[0], b[1] = min(b[0], score), max(b[1], score)
+
+
+def _add_rollups(sketch: ScoreSketch, bounds: Dict[str, list], rollups: List[PredictionRollup]) -> None:
+    for r in rollups:
+        if r.sketch:
+            sketch.merge(ScoreSketch.from_dict(r.sketch))
+            bounds[r.bucket_start.isoformat()] = [r.score_min, r.score_max]
+
+
+def _drop_rollups(sketch: ScoreSketch, bounds: Dict[str, list], rollups: List[PredictionRollup]) -> None:
+    for r in rollups:
+        if r.sketch:
+            sketch.subtract(ScoreSketch.from_dict(r.sketch))
+        bounds.pop(r.bucket_start.isoformat(), None)
+
+
+def _slide(
+    session: Session,
+    row: DriftWindowState,
+    key: int,
+    org_id,
+    model_id: str,
+    first: datetime,
+    last: datetime,
+    synced_until: datetime,
+) -> Optional[Tuple[ScoreSketch, Dict[str, list]]]:
+    """The stored state moved to [first, last) and synced to `synced_until`, or None if it can't be."""
+    sketch = ScoreSketch.from_dict(row.sketch)
+    bounds = {h: list(b) for h, b in row.hour_bounds.items()}
+    # Catch up on the stored hours first, so the rollups dropped below
+    # hold exactly what the state does.
+    _add_events(
+        session,
+        sketch,
+        bounds,
+        key,
+        (PredictionEvent.ingested_at >= row.synced_until)
+        & (PredictionEvent.ingested_at < synced_until)
+        & (PredictionEvent.event_time >= row.window_start)
+        & (PredictionEvent.event_time < row.window_end),
+    )
+    try:
+        _drop_rollups(sketch, bounds, _rollups(session, org_id, model_id, row.window_start, first))
+    except ValueError:
+        logger.warning("drift state %s/%s/%s does not match its rollups; rebuilding", org_id, model_id, row.name)
+        return None
+    _add_rollups(sketch, bounds, _rollups(session, org_id, model_id, row.window_end, last))
+    return sketch, bounds
+
+
+def incremental_window_sketch(
+    session: Session,
+    org_id,
+    model_id: str,
+    name: str,
+    start: datetime,
+    end: datetime,
+    now: datetime,
+) -> ScoreSketch:
+    """
+    Sketch of all scores in the hours of [start, end), same as `window_sketch`,
+    from the model's `name` state brought up to date and stored. Events not yet
+    aggregated are read raw and not stored. The caller owns the commit.
+    """
+    first, last = ceil_hour(start), ceil_hour(end)
+    synced_until = synced_checkpoint(session)
+    key = lookup_model_key(session, org_id, model_id)
+    if synced_until is None or key is None:
+        # Nothing aggregated (or ingested) yet.
+        return window_sketch(session, org_id, model_id, first, last)
+
+    row = session.get(DriftWindowState, (org_id, model_id, name))
+    updated = None
+    if not (
+        row is None
+        or first < row.window_start
+        or last < row.window_end
+        or first >= row.window_end
+        or synced_until < row.synced_until
+    ):
+        updated = _slide(session, row, key, org_id, model_id, first, last, synced_until)
+        if updated is not None and synced_checkpoint(session) != synced_until:
+            # Moved under us: only possible without row locks.
+            updated = None
+    if updated is None:
+        synced_until = synced_checkpoint(session)
+        sketch = ScoreSketch(alpha=SKETCH_ALPHA)
+        bounds: Dict[str, list] = {}
+        _add_rollups(sketch, bounds, _rollups(session, org_id, model_id, first, last))
+    else:
+        sketch, bounds = updated
+    if bounds:
+        sketch.min = min(b[0] for b in bounds.values())
+        sketch.max = max(b[1] for b in bounds.values())
+
+    if row is None:
+        row = DriftWindowState(org_id=org_id, model_id=model_id, name=name)
+    row.window_start = first
+    row.window_end = last
+    row.synced_until = synced_until
+    row.sketch = sketch.to_dict()
+    row.hour_bounds = bounds
+    row.updated_at = now
+    session.add(row)
+
+    _add_events(
+        session,
+        sketch,
+        {},
+        key,
+        (PredictionEvent.ingested_at >= synced_until)
+        & (PredictionEvent.event_time >= first)
+        & (PredictionEvent.event_time < last),
+    )
+    return sketch
@@ -0,0 +1,98 @@
+"""
+(org_id, model_id) <-> ModelKey.model_key resolution.
+
+Keys are assigned once and never change, so every process caches them forever.
+Keys created inside a transaction only enter the cache once it commits, so a
+rolled-back first event cannot leave a key behind that the database never saw.
+"""
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from apps.sentryml_core.db import dialect_insert
+from apps.sentryml_core.models import ModelKey
+
+
+class ModelKeyCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: Dict[Tuple[Any, str], int] = {}
+
+    def get(self, org_id, model_id: str) -> Optional[int]:
+        return self._keys.get((org_id, model_id))
+
+    def put(self, org_id, model_id: str, key: int) -> None:
+        with self._lock:
+            self._keys[(org_id, model_id)] = key
+
+    def reset(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+model_keys = ModelKeyCache()
+
+
+def _select_keys(session: Session, org_id, model_ids: Iterable[str]) -> Dict[str, int]:
+    rows = session.exec(
+        select(ModelKey.model_id, ModelKey.model_key).where(
+            (ModelKey.org_id == org_id) & (ModelKey.model_id.in_(list(model_ids)))
+        )
+    ).all()
+    return {model_id: key for model_id, key in rows}
+
+
+def assign_model_keys(session: Session, org_id, model_ids: Iterable[str]) -> Dict[str, int]:
+    """
+    Keys for `model_ids`, creating missing ones with an idempotent
+    INSERT ... ON CONFLICT DO NOTHING. Cached models cost no query.
+    The caller owns the commit.
+    """
+    keys: Dict[str, int] = {}
+    missing = []
+    for model_id in model_ids:
+        key = model_keys.get(org_id, model_id)
+        if key is None:
+            missing.append(model_id)
+        else:
+            keys[model_id] = key
+    if not missing:
+        return keys
+
+    session.execute(
+        dialect_insert(session)(ModelKey.__table__).on_conflict_do_nothing(
+            index_elements=["org_id", "model_id"]
+        ),
+        [{"org_id": org_id, "model_id": model_id} for model_id in missing],
+    )
+    found = _select_keys(session, org_id, missing)
+    session.info.setdefault("model_keys", []).extend(
+        (org_id, model_id, key) for model_id, key in found.items()
+    )
+    keys.update(found)
+    return keys
+
+
+def lookup_model_key(session: Session, org_id, model_id: str) -> Optional[int]:
+    """Key of an existing model, or None if it has never received an event."""
+    key = model_keys.get(org_id, model_id)
+    if key is None:
+        key = _select_keys(session, org_id, [model_id]).get(model_id)
+        if key is not None:
+            model_keys.put(org_id, model_id, key)
+    return key
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _cache_new_keys(session):
+    for org_id, model_id, key in session.info.pop("model_keys", []):
+        model_keys.put(org_id, model_id, key)
+
+
+@event.listens_for(OrmSession, "after_transaction_end")
+def _discard_new_keys(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("model_keys", None)
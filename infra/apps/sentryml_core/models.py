@@ -3,7 +3,9 @@ from enum import Enum
 from typing import Optional
 from uuid import UUID, uuid4
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Index
+from sqlalchemy import Column, Index, JSON, UniqueConstraint, text
+
+from apps.sentryml_core.ids import uuid7
 
 
 
@@ -11,6 +13,9 @@ class Org(SQLModel, table=True):
     __tablename__ = "orgs"
     org_id: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str
+    # Raw prediction events older than this are rolled up hourly and deleted.
+    # None -> RAW_RETENTION_DAYS (worker default).
+    raw_retention_days: Optional[int] = Field(default=None)
 
 
 class User(SQLModel, table=True):
@@ -45,26 +50,125 @@ class ApiKey(SQLModel, table=True):
     last_used_at: Optional[datetime] = Field(default=None, index=True)
 
 
+class ModelKey(SQLModel, table=True):
+    """
+    Compact integer surrogate for (org_id, model_id), stored in
+    prediction_events instead of the UUID + string pair. Never reused or
+    renumbered, so callers may cache it (see sentryml_core.model_keys).
+    """
+    __tablename__ = "model_keys"
+    __table_args__ = (
+        UniqueConstraint("org_id", "model_id", name="uq_model_keys_org_model"),
+    )
+
+    model_key: Optional[int] = Field(default=None, primary_key=True)
+    org_id: UUID
+    model_id: str
+
+
 class PredictionEvent(SQLModel, table=True):
     __tablename__ = "prediction_events"
+    # Write-heavy table: keep secondary indexes to what queries actually use.
+    # - window scans / per-model counts / retention deletes filter on
+    #   (model_key, event_time); `score` is included so drift windows
+    #   are index-only scans on Postgres.
+    # - the rollup aggregator scans by ingested_at, which grows with insert
+    #   order, so a tiny BRIN index is enough (plain B-tree on SQLite).
     __table_args__ = (
-        Index("ix_pred_org_model_time", "org_id", "model_id", "event_time"),
+        Index(
+            "ix_pred_model_time_score",
+            "model_key",
+            "event_time",
+            postgresql_include=["score"],
+        ),
+        Index("ix_pred_ingested_at_brin", "ingested_at", postgresql_using="brin"),
     )
 
-    event_id: UUID = Field(default_factory=uuid4, primary_key=True)
+    event_id: UUID = Field(default_factory=uuid7, primary_key=True)
 
-    org_id: UUID = Field(index=True)
-    model_id: str = Field(index=True)
-    entity_id: str = Field(index=True)
+    # ModelKey.model_key; the API speaks (org_id, model_id).
+    model_key: int
+    entity_id: str
 
     score: float
     prediction: Optional[str] = None
 
-    event_time: datetime = Field(index=True)
-    ingested_at: datetime = Field(
-        default_factory=datetime.utcnow,
-        index=True
-    )
+    # Part of the primary key because Postgres range-partitions on it
+    # (see sentryml_core.partitions).
+    event_time: datetime = Field(primary_key=True)
+    ingested_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class PredictionRollup(SQLModel, table=True):
+    """Hourly summary of raw prediction scores, kept after raw rows expire."""
+    __tablename__ = "prediction_rollups"
+
+    org_id: UUID = Field(primary_key=True)
+    model_id: str = Field(primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)
+
+    count: int = Field(default=0)
+    score_min: Optional[float] = None
+    score_max: Optional[float] = None
+    score_sum: float = Field(default=0.0)
+    # ScoreSketch.to_dict()
+    sketch: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+
+
+class WorkerCheckpoint(SQLModel, table=True):
+    """Named high-water marks for incremental worker jobs."""
+    __tablename__ = "worker_checkpoints"
+
+    name: str = Field(primary_key=True)
+    value: datetime
+
+
+class BaselineCache(SQLModel, table=True):
+    """
+    Baseline bins (drift.BaselineBins) of a monitor's last baseline window,
+    reused by the worker while the key columns still match (see
+    sentryml_core.baseline_cache).
+    """
+    __tablename__ = "baseline_cache"
+
+    org_id: UUID = Field(primary_key=True)
+    model_id: str = Field(primary_key=True)
+
+    source: str
+    baseline_start: datetime
+    baseline_end: datetime
+    num_bins: int
+    # MonitorConfig.updated_at when the bins were built.
+    config_version: datetime
+
+    # BaselineBins.to_dict()
+    bins: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    built_at: datetime
+
+
+class DriftWindowState(SQLModel, table=True):
+    """
+    Merged ScoreSketch of one drift window of a model, kept up to date
+    incrementally by the worker (see sentryml_core.drift_state).
+    """
+    __tablename__ = "drift_window_states"
+
+    org_id: UUID = Field(primary_key=True)
+    model_id: str = Field(primary_key=True)
+    # "baseline" / "current"
+    name: str = Field(primary_key=True)
+
+    # Whole hours covered, [window_start, window_end).
+    window_start: datetime
+    window_end: datetime
+    # Holds events ingested before this (a value of the rollup checkpoint).
+    synced_until: datetime
+
+    # ScoreSketch.to_dict()
+    sketch: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    # Hour (ISO) -> [min, max] score, to keep the sketch's min/max exact as hours drop out.
+    hour_bounds: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    updated_at: datetime
 
 
 class ModelRegistry(SQLModel, table=True):
@@ -78,10 +182,15 @@ class ModelRegistry(SQLModel, table=True):
     event_count: int = Field(default=0)
     is_deleted: bool = Field(default=False, index=True)
     deleted_at: datetime | None = Field(default=None)
+    # Raw events before this time live only in prediction_rollups.
+    raw_rolled_up_until: Optional[datetime] = Field(default=None)
 
 
 class MonitorConfig(SQLModel, table=True):
     __tablename__ = "monitor_configs"
+    __table_args__ = (
+        UniqueConstraint("org_id", "model_id", name="uq_monitor_configs_org_model"),
+    )
 
     monitor_id: UUID = Field(default_factory=uuid4, primary_key=True)
     org_id: UUID = Field(index=True)
@@ -104,7 +213,7 @@ class MonitorConfig(SQLModel, table=True):
 class DriftResult(SQLModel, table=True):
     __tablename__ = "drift_results"
 
-    drift_id: UUID = Field(default_factory=uuid4, primary_key=True)
+    drift_id: UUID = Field(default_factory=uuid7, primary_key=True)
 
     org_id: UUID = Field(index=True)
     model_id: str = Field(index=True)
@@ -174,7 +283,7 @@ class IncidentEventActor(str, Enum):
 class IncidentEvent(SQLModel, table=True):
     __tablename__ = "incident_events"
 
-    event_id: UUID = Field(default_factory=uuid4, primary_key=True)
+    event_id: UUID = Field(default_factory=uuid7, primary_key=True)
 
     incident_id: UUID = Field(index=True)
     org_id: UUID = Field(index=True)
@@ -211,26 +320,49 @@ class AlertRoute(SQLModel, table=True):
 
 class SessionToken(SQLModel, table=True):
     __tablename__ = "sessions"
+    # Lookups by user (revoke-all on password reset) and the sweeper's expiry
+    # scan only care about live sessions; revoked rows are swept by revoked_at.
+    __table_args__ = (
+        Index(
+            "ix_sessions_live_user_id",
+            "user_id",
+            postgresql_where=text("revoked_at IS NULL"),
+            sqlite_where=text("revoked_at IS NULL"),
+        ),
+        Index(
+            "ix_sessions_live_expires_at",
+            "expires_at",
+            postgresql_where=text("revoked_at IS NULL"),
+            sqlite_where=text("revoked_at IS NULL"),
+        ),
+    )
 
     session_id: UUID = Field(default_factory=uuid4, primary_key=True)
 
-    user_id: UUID = Field(index=True)
+    user_id: UUID
 
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     expires_at: datetime = Field(
         default_factory=lambda: datetime.utcnow() + timedelta(days=30),
-        index=True,
     )
     revoked_at: Optional[datetime] = Field(default=None, index=True)
 
 
 class PasswordResetToken(SQLModel, table=True):
     __tablename__ = "password_reset_tokens"
+    __table_args__ = (
+        Index(
+            "ix_password_reset_tokens_live_expires_at",
+            "expires_at",
+            postgresql_where=text("used_at IS NULL"),
+            sqlite_where=text("used_at IS NULL"),
+        ),
+    )
 
     reset_id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(index=True)
     token: str = Field(index=True, unique=True)
 
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
-    expires_at: datetime = Field(index=True)
+    expires_at: datetime
     used_at: Optional[datetime] = Field(default=None, index=True)
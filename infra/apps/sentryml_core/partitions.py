@@ -0,0 +1,138 @@
+"""
+Weekly range partitions of `prediction_events` by `event_time` (Postgres only).
+
+The table is converted by the `partition_prediction_events` migration. After that:
+- `ensure_partitions` creates the partitions for the next few weeks ahead of time
+  (a DEFAULT partition catches anything outside them). Postgres refuses to attach
+  a week while DEFAULT holds rows in it, so those rows are moved into the new
+  partition in the same transaction.
+- `drop_partitions_before` detaches and drops whole weeks instead of running a big DELETE.
+  Rows that landed in DEFAULT are not in any week, so `delete_default_before`
+  applies the same cutoff to it with a chunked DELETE.
+
+Every query that filters on `event_time` (e.g. the worker's baseline/current windows)
+only scans the partitions overlapping its range.
+
+On other databases (SQLite in tests) the table is a plain table and these are no-ops.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from apps.sentryml_core.models import PredictionEvent
+
+
+TABLE = "prediction_events"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_INTERVAL = timedelta(days=7)
+_NAME_RE = re.compile(rf"^{TABLE}_p(\d{{8}})$")
+
+
+def partition_start(ts: datetime) -> datetime:
+    """Monday 00:00 of the week containing `ts`."""
+    day = datetime(ts.year, ts.month, ts.day)
+    return day - timedelta(days=day.weekday())
+
+
+def partition_name(start: datetime) -> str:
+    return f"{TABLE}_p{start:%Y%m%d}"
+
+
+def is_partitioned(session: Session) -> bool:
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    return session.exec(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table"
+        ).bindparams(table=TABLE)
+    ).first() is not None
+
+
+def list_partitions(session: Session) -> List[datetime]:
+    """Start of every weekly partition currently attached (DEFAULT excluded)."""
+    names = session.exec(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ).bindparams(table=TABLE)
+    ).all()
+    starts = []
+    for (name,) in names:
+        m = _NAME_RE.match(name)
+        if m:
+            starts.append(datetime.strptime(m.group(1), "%Y%m%d"))
+    return sorted(starts)
+
+
+def ensure_partitions(session: Session, now: datetime, weeks_ahead: int = 4) -> List[str]:
+    """Create missing partitions from the current week through `weeks_ahead`. Returns names created."""
+    if not is_partitioned(session):
+        return []
+    existing = set(list_partitions(session))
+    created = []
+    start = partition_start(now)
+    columns = ", ".join(c.name for c in PredictionEvent.__table__.columns)
+    for _ in range(weeks_ahead + 1):
+        if start not in existing:
+            end = start + PARTITION_INTERVAL
+            name = partition_name(start)
+            bounds = f"FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            # Created detached, filled with the week's rows from DEFAULT, then
+            # attached: ATTACH checks DEFAULT no longer has rows in the range.
+            session.exec(text(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                f"(LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            ))
+            session.exec(text(
+                f"WITH moved AS ("
+                f"DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE event_time >= '{start:%Y-%m-%d}' AND event_time < '{end:%Y-%m-%d}' "
+                f"RETURNING {columns}) "
+                f"INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+            ))
+            session.exec(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+            created.append(name)
+        start += PARTITION_INTERVAL
+    session.commit()
+    return created
+
+
+def drop_partitions_before(session: Session, cutoff: datetime) -> List[str]:
+    """Detach and drop every partition that ends at or before `cutoff`. Returns names dropped."""
+    if not is_partitioned(session):
+        return []
+    dropped = []
+    for start in list_partitions(session):
+        if start + PARTITION_INTERVAL > cutoff:
+            continue
+        name = partition_name(start)
+        session.exec(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        session.exec(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    session.commit()
+    return dropped
+
+
+def delete_default_before(session: Session, cutoff: datetime, chunk_size: int = 10000) -> int:
+    """Delete rows with event_time before `cutoff` from the DEFAULT partition, `chunk_size` per transaction. Returns rows deleted."""
+    if not is_partitioned(session):
+        return 0
+    deleted = 0
+    while True:
+        result = session.exec(text(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE ctid IN ("
+            f"SELECT ctid FROM {DEFAULT_PARTITION} WHERE event_time < :cutoff LIMIT :chunk)"
+        ).bindparams(cutoff=cutoff, chunk=chunk_size))
+        session.commit()
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            return deleted
@@ -0,0 +1,338 @@
+"""
+Hourly rollups of raw prediction scores.
+
+`aggregate_ingested` folds newly ingested events into per-(org, model, hour)
+rollups, each holding a mergeable ScoreSketch. Progress is tracked by the
+`rollups_ingested_until` checkpoint on `ingested_at`. Invariant: the rollups hold
+exactly the events ingested before the checkpoint, so rollups + raw events
+ingested at/after it never double count.
+
+For the checkpoint to be safe to move past a point in time, no event with an
+earlier `ingested_at` may still commit later. The ingest path has the database
+stamp `ingested_at` as it inserts the row (db.db_utcnow), so retries and
+queueing in the API don't back-date it. On Postgres, `settled_until` also
+holds the checkpoint below the start of the oldest transaction still
+writing, so a long ingest transaction is waited for rather than skipped.
+Concurrent aggregators (run_once and retention both call it) are serialized
+on the checkpoint row, see aggregate_ingested.
+
+Once raw events for a model are deleted up to `ModelRegistry.raw_rolled_up_until`
+(the "raw retention horizon"), readers use `prediction_rollups` for anything
+before the horizon and raw `prediction_events` from the horizon on. Rollups are
+hour-granular: a window edge that falls inside a rolled-up hour includes that
+whole hour.
+"""
+from __future__ import annotations
+
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from apps.sentryml_core.model_keys import lookup_model_key
+from apps.sentryml_core.models import (
+    ModelKey,
+    ModelRegistry,
+    PredictionEvent,
+    PredictionRollup,
+    WorkerCheckpoint,
+)
+from apps.sentryml_core.sketch import ScoreSketch
+
+
+ROLLUP_BUCKET = timedelta(hours=1)
+SKETCH_ALPHA = 0.01
+SKETCH_INGEST_LAG = timedelta(minutes=5)
+AGGREGATE_STEP = timedelta(hours=6)
+INGEST_CHECKPOINT = "rollups_ingested_until"
+
+logger = logging.getLogger(__name__)
+
+
+def floor_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def rolled_up_until(session: Session, org_id, model_id: str) -> Optional[datetime]:
+    return session.exec(
+        select(ModelRegistry.raw_rolled_up_until).where(
+            (ModelRegistry.org_id == org_id) & (ModelRegistry.model_id == model_id)
+        )
+    ).first()
+
+
+def _overlapping(org_id, model_id: str, start: Optional[datetime], end: Optional[datetime]):
+    cond = (PredictionRollup.org_id == org_id) & (PredictionRollup.model_id == model_id)
+    if start is not None:
+        cond = cond & (PredictionRollup.bucket_start > start - ROLLUP_BUCKET)
+    if end is not None:
+        cond = cond & (PredictionRollup.bucket_start < end)
+    return cond
+
+
+def load_rollups(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> List[PredictionRollup]:
+    """Hourly rollups overlapping [start, end)."""
+    return list(session.exec(
+        select(PredictionRollup)
+        .where(_overlapping(org_id, model_id, start, end))
+        .order_by(PredictionRollup.bucket_start)
+    ).all())
+
+
+def merged_sketch(rollups: List[PredictionRollup], alpha: float = SKETCH_ALPHA) -> ScoreSketch:
+    sketch = ScoreSketch(alpha=alpha)
+    for r in rollups:
+        if r.sketch:
+            sketch.merge(ScoreSketch.from_dict(r.sketch))
+    return sketch
+
+
+def rollup_scores(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: datetime,
+    end: datetime,
+) -> List[float]:
+    """Approximate scores in [start, end), one bucket value per rolled-up event."""
+    return list(merged_sketch(load_rollups(session, org_id, model_id, start, end)).values())
+
+
+def count_rollup_events(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> int:
+    total = session.exec(
+        select(func.sum(PredictionRollup.count)).where(
+            _overlapping(org_id, model_id, start, end)
+        )
+    ).one()
+    return int(total or 0)
+
+
+def count_events(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: Optional[datetime] = None,
+    scored: bool = False,
+) -> int:
+    """Events since `start` (or ever), raw past the horizon plus rollups before it."""
+    horizon = rolled_up_until(session, org_id, model_id)
+
+    cond = PredictionEvent.model_key == lookup_model_key(session, org_id, model_id)
+    if start is not None:
+        cond = cond & (PredictionEvent.event_time >= start)
+    if horizon is not None:
+        cond = cond & (PredictionEvent.event_time >= horizon)
+    if scored:
+        cond = cond & (PredictionEvent.score != None)  # noqa: E711
+    raw = session.exec(select(func.count()).select_from(PredictionEvent).where(cond)).one()
+
+    rolled = 0
+    if horizon is not None and (start is None or start < horizon):
+        rolled = count_rollup_events(session, org_id, model_id, start, horizon)
+    return int(raw) + rolled
+
+
+def get_checkpoint(session: Session, name: str) -> Optional[datetime]:
+    row = session.get(WorkerCheckpoint, name)
+    return row.value if row else None
+
+
+def set_checkpoint(session: Session, name: str, value: datetime) -> None:
+    row = session.get(WorkerCheckpoint, name)
+    if row is None:
+        row = WorkerCheckpoint(name=name, value=value)
+    row.value = value
+    session.add(row)
+
+
+def _merge_into_rollups(session: Session, sketches: Dict[Tuple[Any, str, datetime], ScoreSketch]) -> None:
+    for (org_id, model_id, bucket), sketch in sketches.items():
+        rollup = session.get(PredictionRollup, (org_id, model_id, bucket))
+        if rollup is None:
+            rollup = PredictionRollup(org_id=org_id, model_id=model_id, bucket_start=bucket)
+        elif rollup.sketch:
+            sketch.merge(ScoreSketch.from_dict(rollup.sketch))
+        rollup.count = sketch.count
+        rollup.score_min = sketch.min
+        rollup.score_max = sketch.max
+        rollup.score_sum = sketch.sum
+        rollup.sketch = sketch.to_dict()
+        session.add(rollup)
+
+
+def settled_until(session: Session, until: datetime) -> datetime:
+    """
+    `until`, or the start of the oldest other transaction that has written
+    and is still open, if earlier (Postgres). Its rows may carry an earlier
+    `ingested_at` and must not be skipped by the checkpoint. Other databases
+    have no such view; there SKETCH_INGEST_LAG is the only margin.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return until
+    oldest = session.execute(text(
+        "SELECT timezone('utc', min(xact_start)) FROM pg_stat_activity "
+        "WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+    )).scalar()
+    return until if oldest is None else min(until, oldest)
+
+
+def _locked_checkpoint(session: Session, shared: bool = False) -> Optional[WorkerCheckpoint]:
+    # FOR UPDATE: a concurrent aggregator waits here for the current step to
+    # commit and then reads the checkpoint it moved to (a no-op on SQLite).
+    # FOR SHARE (`shared`) only keeps aggregators out until the caller commits.
+    return session.exec(
+        select(WorkerCheckpoint)
+        .where(WorkerCheckpoint.name == INGEST_CHECKPOINT)
+        .with_for_update(read=shared)
+        .execution_options(populate_existing=True)
+    ).first()
+
+
+def synced_checkpoint(session: Session) -> Optional[datetime]:
+    """
+    The ingest checkpoint, read from the database FOR SHARE: until the caller's
+    transaction ends no aggregator can move it, so the rollups it reads next
+    hold exactly the events ingested before it. SQLite has no row locks;
+    callers there check that it did not move (see drift_state).
+    """
+    row = _locked_checkpoint(session, shared=True)
+    return row.value if row else None
+
+
+def aggregate_ingested(
+    session: Session,
+    now: datetime,
+    chunk_size: int = 10_000,
+) -> int:
+    """
+    Fold events ingested since the checkpoint (and before now - SKETCH_INGEST_LAG,
+    see settled_until) into hourly rollups, one AGGREGATE_STEP slice per
+    transaction so memory stays bounded on the first run. Returns events
+    aggregated.
+
+    Safe to run concurrently: each step locks the checkpoint row and only
+    commits if it still moves the checkpoint on from where the step read it
+    (compare-and-set), so a slice is never folded in twice. A step that lost
+    the race is rolled back and retried from the new checkpoint.
+    """
+    until = settled_until(session, now - SKETCH_INGEST_LAG)
+    total = 0
+    while True:
+        checkpoint = _locked_checkpoint(session)
+        if checkpoint is None:
+            start = session.exec(select(func.min(PredictionEvent.ingested_at))).one()
+            try:
+                session.add(WorkerCheckpoint(
+                    name=INGEST_CHECKPOINT, value=until if start is None else min(start, until)
+                ))
+                session.commit()
+            except IntegrityError:
+                # Another aggregator created it first.
+                session.rollback()
+            continue
+
+        since = checkpoint.value
+        if since >= until:
+            session.commit()
+            return total
+        step_end = min(since + AGGREGATE_STEP, until)
+        rows = session.exec(
+            select(
+                ModelKey.org_id,
+                ModelKey.model_id,
+                PredictionEvent.event_time,
+                PredictionEvent.score,
+            )
+            .join(ModelKey, ModelKey.model_key == PredictionEvent.model_key)
+            .where(
+                (PredictionEvent.ingested_at >= since)
+                & (PredictionEvent.ingested_at < step_end)
+            )
+            .execution_options(yield_per=chunk_size)
+        )
+        sketches: Dict[Tuple[Any, str, datetime], ScoreSketch] = {}
+        folded = skipped = 0
+        for org_id, model_id, event_time, score in rows:
+            if score is None:
+                continue
+            if not math.isfinite(score):
+                # Rejected at ingest; older rows must not wedge the checkpoint.
+                skipped += 1
+                continue
+            key = (org_id, model_id, floor_hour(event_time))
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = ScoreSketch(alpha=SKETCH_ALPHA)
+            sketch.add(score)
+            folded += 1
+
+        _merge_into_rollups(session, sketches)
+        claimed = session.execute(
+            update(WorkerCheckpoint)
+            .where(
+                (WorkerCheckpoint.name == INGEST_CHECKPOINT)
+                & (WorkerCheckpoint.value == since)
+            )
+            .values(value=step_end)
+        ).rowcount
+        if claimed != 1:
+            session.rollback()
+            continue
+        session.commit()
+        total += folded
+        if skipped:
+            logger.warning("rollups skipped %d non-finite scores ingested in [%s, %s)", skipped, since, step_end)
+
+
+def window_sketch(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: datetime,
+    end: datetime,
+) -> ScoreSketch:
+    """
+    Sketch of all scores in [start, end): rollups whose bucket starts in the window,
+    plus raw events not yet aggregated. Cost is O(hours + recent events), not O(window).
+    """
+    sketch = merged_sketch(list(session.exec(
+        select(PredictionRollup).where(
+            (PredictionRollup.org_id == org_id)
+            & (PredictionRollup.model_id == model_id)
+            & (PredictionRollup.bucket_start >= start)
+            & (PredictionRollup.bucket_start < end)
+        )
+    ).all()))
+
+    key = lookup_model_key(session, org_id, model_id)
+    if key is None:
+        return sketch
+
+    cond = (
+        (PredictionEvent.model_key == key)
+        & (PredictionEvent.event_time >= start)
+        & (PredictionEvent.event_time < end)
+    )
+    since = get_checkpoint(session, INGEST_CHECKPOINT)
+    if since is not None:
+        cond = cond & (PredictionEvent.ingested_at >= since)
+    sketch.add_many(
+        s for s in session.exec(select(PredictionEvent.score).where(cond)) if s is not None and math.isfinite(s)
+    )
+    return sketch
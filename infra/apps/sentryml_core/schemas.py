@@ -1,12 +1,14 @@
 from datetime import datetime, timezone
-from typing import Optional
-from pydantic import field_validator
+from typing import Annotated, Any, Dict, List, Optional
+from uuid import UUID
+from pydantic import AllowInfNan, field_validator
 from sqlmodel import SQLModel
 
 class PredictionEventIn(SQLModel):
     model_id: str
     entity_id: str
-    score: float
+    # JSON parsers accept Infinity / NaN; no drift metric can use them.
+    score: Annotated[float, AllowInfNan(False)]
     prediction: Optional[str] = None
     event_time: datetime
 
@@ -19,6 +21,41 @@ class PredictionEventIn(SQLModel):
         return min(v, now)
 
 
+class PredictionEventOut(SQLModel):
+    event_id: UUID
+    org_id: UUID
+    model_id: str
+    entity_id: str
+    score: float
+    prediction: Optional[str] = None
+    event_time: datetime
+    ingested_at: datetime
+
+
+class IngestItemError(SQLModel):
+    index: int
+    errors: List[Dict[str, Any]]
+
+
+class BatchIngestResult(SQLModel):
+    accepted: int
+    rejected: int
+    errors: List[IngestItemError] = []
+
+
+class ChunkIngestResult(SQLModel):
+    chunk: int
+    accepted: int
+    rejected: int
+    errors: List[IngestItemError] = []
+
+
+class StreamIngestResult(SQLModel):
+    accepted: int
+    rejected: int
+    chunks: List[ChunkIngestResult] = []
+
+
 class ModelItem(SQLModel):
     model_id: str
     event_count: int
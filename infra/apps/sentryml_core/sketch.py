@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Values closer to zero than this share a single "zero" bucket.
+_MIN_INDEXABLE = 1e-9
+
+
+class ScoreSketch:
+    """
+    Mergeable quantile sketch for prediction scores (DDSketch-style log buckets).
+
+    Every value is stored in the bucket (gamma^(k-1), gamma^k] of its magnitude,
+    with gamma = (1 + alpha) / (1 - alpha). Any quantile read back is within a
+    relative error of `alpha` of the exact value (values below 1e-9 in magnitude
+    are treated as 0). Two sketches with the same `alpha` merge exactly, so
+    hourly sketches can be combined into any window.
+
+    Also tracks exact count / min / max / sum.
+    """
+
+    def __init__(self, alpha: float = 0.01):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be in (0, 1)")
+        self.alpha = alpha
+        self._gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self._gamma)
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.sum = 0.0
+
+    def _key(self, magnitude: float) -> int:
+        return int(math.ceil(math.log(magnitude) / self._log_gamma))
+
+    def _value(self, key: int) -> float:
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def add(self, x: float, n: int = 1) -> None:
+        x = float(x)
+        if not math.isfinite(x):
+            raise ValueError(f"cannot add non-finite value {x!r}")
+        if x > _MIN_INDEXABLE:
+            k = self._key(x)
+            self.pos[k] = self.pos.get(k, 0) + n
+        elif x < -_MIN_INDEXABLE:
+            k = self._key(-x)
+            self.neg[k] = self.neg.get(k, 0) + n
+        else:
+            self.zero += n
+        self.count += n
+        self.sum += x * n
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    def add_many(self, values: Iterable[float]) -> None:
+        for x in values:
+            self.add(x)
+
+    def merge(self, other: "ScoreSketch") -> None:
+        if other.alpha != self.alpha:
+            raise ValueError("cannot merge sketches with different alpha")
+        for k, c in other.pos.items():
+            self.pos[k] = self.pos.get(k, 0) + c
+        for k, c in other.neg.items():
+            self.neg[k] = self.neg.get(k, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def subtract(self, other: "ScoreSketch") -> None:
+        """
+        Remove the values of `other`, which must have been merged in before.
+        Counts and sum are exact. min / max can't be narrowed from the buckets
+        alone, so they are kept (cleared once the sketch is empty); callers
+        that know the remaining range set them afterwards.
+        """
+        if other.alpha != self.alpha:
+            raise ValueError("cannot subtract sketches with different alpha")
+        for ours, theirs in ((self.pos, other.pos), (self.neg, other.neg)):
+            if any(ours.get(k, 0) < c for k, c in theirs.items()):
+                raise ValueError("cannot subtract values the sketch does not hold")
+        if self.zero < other.zero or self.count < other.count:
+            raise ValueError("cannot subtract values the sketch does not hold")
+
+        for ours, theirs in ((self.pos, other.pos), (self.neg, other.neg)):
+            for k, c in theirs.items():
+                left = ours.get(k, 0) - c
+                if left:
+                    ours[k] = left
+                else:
+                    ours.pop(k, None)
+        self.zero -= other.zero
+        self.count -= other.count
+        self.sum -= other.sum
+        if self.count == 0:
+            self.min = self.max = None
+            self.sum = 0.0
+
+    def items(self) -> Iterator[Tuple[float, int]]:
+        """(representative value, count) per bucket, ascending, clamped to [min, max]."""
+        for k in sorted(self.neg, reverse=True):
+            yield self._clamp(-self._value(k)), self.neg[k]
+        if self.zero:
+            yield self._clamp(0.0), self.zero
+        for k in sorted(self.pos):
+            yield self._clamp(self._value(k)), self.pos[k]
+
+    def _clamp(self, v: float) -> float:
+        return min(max(v, self.min), self.max)
+
+    def values(self) -> Iterator[float]:
+        """Expand back to one representative value per recorded score, ascending."""
+        for v, c in self.items():
+            for _ in range(c):
+                yield v
+
+    def quantile(self, q: float) -> float:
+        """
+        q in [0, 1]. Same rank convention as drift._quantile, without
+        interpolation: the bucket holding rank round(q * (count - 1)).
+        """
+        if self.count == 0:
+            raise ValueError("Empty sketch")
+        rank = int(round(q * (self.count - 1)))
+        seen = 0
+        for v, c in self.items():
+            seen += c
+            if seen > rank:
+                return v
+        return float(self.max)
+
+    def to_dict(self) -> dict:
+        return {
+            "alpha": self.alpha,
+            "pos": {str(k): c for k, c in self.pos.items()},
+            "neg": {str(k): c for k, c in self.neg.items()},
+            "zero": self.zero,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "sum": self.sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScoreSketch":
+        s = cls(alpha=data["alpha"])
+        s.pos = {int(k): int(c) for k, c in data.get("pos", {}).items()}
+        s.neg = {int(k): int(c) for k, c in data.get("neg", {}).items()}
+        s.zero = int(data.get("zero", 0))
+        s.count = int(data.get("count", 0))
+        s.min = data.get("min")
+        s.max = data.get("max")
+        s.sum = float(data.get("sum", 0.0))
+        return s
@@ -256,7 +256,16 @@ def signup(request: Request):
     )
 
 @app.post("/logout")
-def logout():
+def logout(request: Request):
+    # Revoke server-side too, so the API stops honouring the cookie at once.
+    try:
+        requests.post(
+            f"{API_BASE}/v1/auth/logout",
+            cookies=api_cookie_jar(request),
+            timeout=5,
+        )
+    except requests.RequestException:
+        pass
     resp = RedirectResponse("/", status_code=303)
     resp.delete_cookie("sentryml_session")
     return resp
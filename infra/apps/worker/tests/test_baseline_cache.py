@@ -0,0 +1,91 @@
+import json
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+
+from apps.sentryml_core.baseline_cache import baseline_window, cached_baseline_bins
+from apps.sentryml_core.drift import BaselineBins, baseline_bins, psi_from_bins, psi_quantile
+from apps.sentryml_core.models import MonitorConfig
+from apps.sentryml_core.sketch import ScoreSketch
+
+
+NOW = datetime(2026, 10, 16, 12, 30)
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _scores(n, shift=0.0, seed=0):
+    rng = random.Random(seed)
+    return [rng.betavariate(2 + shift, 5) for _ in range(n)]
+
+
+def test_bins_give_the_same_psi_after_a_round_trip():
+    baseline, current = _scores(5000), _scores(2000, shift=0.5, seed=1)
+    bins = BaselineBins.from_dict(json.loads(json.dumps(baseline_bins(baseline, num_bins=10).to_dict())))
+    assert bins.count == 5000
+    assert psi_from_bins(bins, current) == psi_quantile(baseline, current)
+
+    b_sketch, c_sketch = ScoreSketch(), ScoreSketch()
+    b_sketch.add_many(baseline)
+    c_sketch.add_many(current)
+    assert psi_from_bins(baseline_bins(b_sketch), c_sketch) == psi_quantile(b_sketch, c_sketch)
+
+
+def test_baseline_window_is_aligned_to_the_refresh_grid():
+    current_start = NOW - timedelta(days=1)
+    assert baseline_window(current_start, 7, 6) == (datetime(2026, 10, 8, 12), datetime(2026, 10, 15, 12))
+    # Runs within the same period share the window.
+    later = current_start + timedelta(hours=5, minutes=29)
+    assert baseline_window(later, 7, 6) == baseline_window(current_start, 7, 6)
+    assert baseline_window(later + timedelta(minutes=1), 7, 6)[1] == datetime(2026, 10, 15, 18)
+
+
+def test_cached_bins_are_reused_until_window_or_config_changes(session):
+    monitor = MonitorConfig(org_id=uuid4(), model_id="m", num_bins=10, updated_at=NOW)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return baseline_bins(_scores(1000, seed=len(builds)), num_bins=monitor.num_bins)
+
+    start, end = baseline_window(NOW - timedelta(days=1), 7, 6)
+
+    def get(start=start, end=end, source="raw"):
+        bins = cached_baseline_bins(session, monitor, source, start, end, build, NOW)
+        session.commit()
+        return bins
+
+    first = get()
+    assert get().to_dict() == first.to_dict()
+    assert len(builds) == 1
+
+    # Window roll-over, config update, source switch: rebuilt each time.
+    get(start + timedelta(hours=6), end + timedelta(hours=6))
+    monitor.updated_at = NOW + timedelta(minutes=1)
+    get(start + timedelta(hours=6), end + timedelta(hours=6))
+    get(start + timedelta(hours=6), end + timedelta(hours=6), source="sketch")
+    assert len(builds) == 4
+    get(start + timedelta(hours=6), end + timedelta(hours=6), source="sketch")
+    assert len(builds) == 4
+
+
+def test_empty_baseline_is_not_cached(session):
+    monitor = MonitorConfig(org_id=uuid4(), model_id="m", updated_at=NOW)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return None
+
+    for _ in range(2):
+        assert cached_baseline_bins(session, monitor, "raw", NOW, NOW, build, NOW) is None
+    assert len(builds) == 2
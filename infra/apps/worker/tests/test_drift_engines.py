@@ -0,0 +1,40 @@
+import math
+import random
+
+import pytest
+
+from apps.sentryml_core import drift
+
+pytest.importorskip("numpy")
+
+
+def _cases():
+    rng = random.Random(3)
+    yield [rng.gauss(0, 1) for _ in range(2000)], [rng.gauss(0.3, 1.2) for _ in range(1000)]
+    # Heavy ties: edges get nudged apart.
+    yield [rng.choice([0.0, 0.1, 0.5, 1.0]) for _ in range(500)], [rng.choice([0.0, 1.0]) for _ in range(300)]
+    # Constant baseline, current partly outside it.
+    yield [3.0] * 100, [3.0, 2.0, 4.0, 3.0]
+    # Values exactly on the outer edges (inclusive right edge).
+    yield [0.0, 0.25, 0.5, 0.75, 1.0], [0.0, 1.0, 1.0, 0.5]
+
+
+@pytest.mark.parametrize("num_bins,winsor_q", [(10, 0.01), (4, 0.0), (20, 0.1), (5, 0.6)])
+def test_numpy_engine_matches_python_engine_exactly(num_bins, winsor_q):
+    for baseline, current in _cases():
+        expected = drift._psi_quantile_py(baseline, current, num_bins, 1e-6, winsor_q)
+        assert drift._psi_quantile_np(baseline, current, num_bins, 1e-6, winsor_q) == expected
+
+
+def test_numpy_engine_drops_nan_like_python_engine():
+    baseline = [0.1 * i for i in range(50)]
+    current = [0.5, math.nan, 2.0, 4.9]
+    expected = drift._psi_quantile_py(baseline, current, 10, 1e-6, 0.01)
+    assert drift._psi_quantile_np(baseline, current, 10, 1e-6, 0.01) == expected
+
+
+def test_psi_quantile_falls_back_without_numpy(monkeypatch):
+    baseline, current = next(_cases())
+    expected = drift._psi_quantile_np(baseline, current, 10, 1e-6, 0.01)
+    monkeypatch.setattr(drift, "np", None)
+    assert drift.psi_quantile(baseline, current) == expected
@@ -0,0 +1,74 @@
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+
+from apps.sentryml_core.drift import psi_quantile, psi_sketch
+from apps.sentryml_core.model_keys import assign_model_keys
+from apps.sentryml_core.models import PredictionEvent
+from apps.sentryml_core.rollups import aggregate_ingested, window_sketch
+from apps.sentryml_core.sketch import ScoreSketch
+
+
+NOW = datetime(2026, 10, 16, 12, 30)
+
+
+def _sketch(values):
+    s = ScoreSketch()
+    s.add_many(values)
+    return s
+
+
+def test_sketch_merge_matches_single_sketch():
+    rng = random.Random(0)
+    values = [rng.betavariate(2, 5) for _ in range(2000)]
+    merged = _sketch(values[:700])
+    merged.merge(_sketch(values[700:]))
+    whole = _sketch(values)
+    for key in ("pos", "neg", "zero", "count", "min", "max"):
+        assert merged.to_dict()[key] == whole.to_dict()[key]
+    assert merged.sum == pytest.approx(whole.sum)
+
+    exact = sorted(values)
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        assert merged.quantile(q) == pytest.approx(exact[round(q * (len(exact) - 1))], rel=0.01)
+
+
+@pytest.mark.parametrize("shift", [0.0, 0.5, 1.5])
+def test_psi_sketch_close_to_exact(shift):
+    rng = random.Random(1)
+    baseline = [rng.betavariate(2, 5) for _ in range(20000)]
+    current = [rng.betavariate(2 + shift, 5) for _ in range(10000)]
+
+    exact = psi_quantile(baseline, current)
+    approx = psi_sketch(_sketch(baseline), _sketch(current))
+    assert abs(approx - exact) < 0.01
+    assert psi_quantile(_sketch(baseline), _sketch(current)) == approx
+
+
+def test_window_sketch_covers_aggregated_and_recent_events():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    org_id = uuid4()
+    with Session(engine) as session:
+        key = assign_model_keys(session, org_id, ["m"])["m"]
+        for i in range(10):
+            ts = NOW - timedelta(hours=3, minutes=i)
+            session.add(PredictionEvent(
+                model_key=key, entity_id=f"e{i}", score=0.1 * (i + 1), event_time=ts, ingested_at=ts,
+            ))
+        session.commit()
+        assert aggregate_ingested(session, NOW) == 10
+
+        # Ingested after the checkpoint: read from raw until the next aggregation.
+        session.add(PredictionEvent(
+            model_key=key, entity_id="late", score=0.5, event_time=NOW - timedelta(minutes=1), ingested_at=NOW,
+        ))
+        session.commit()
+
+        sketch = window_sketch(session, org_id, "m", NOW - timedelta(days=1), NOW)
+        assert sketch.count == 11
+        assert aggregate_ingested(session, NOW + timedelta(minutes=10)) == 1
+        assert window_sketch(session, org_id, "m", NOW - timedelta(days=1), NOW).count == 11
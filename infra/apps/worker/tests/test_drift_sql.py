@@ -0,0 +1,90 @@
+import os
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+
+from apps.sentryml_core.drift import baseline_bins, bin_counts, psi_from_counts, psi_quantile
+from apps.sentryml_core.drift_sql import sql_baseline_bins, sql_bin_counts
+from apps.sentryml_core.model_keys import assign_model_keys
+from apps.sentryml_core.models import PredictionEvent
+
+
+NOW = datetime(2026, 10, 16, 12, 30)
+BASELINE = (NOW - timedelta(days=8), NOW - timedelta(days=1))
+CURRENT = (NOW - timedelta(days=1), NOW)
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def session(request):
+    if request.param == "sqlite":
+        engine = create_engine("sqlite://")
+    else:
+        url = os.getenv("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL not set")
+        engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    SQLModel.metadata.drop_all(engine)
+
+
+def _load(session, baseline, current):
+    org_id = uuid4()
+    key = assign_model_keys(session, org_id, ["m"])["m"]
+    for window, scores in ((BASELINE, baseline), (CURRENT, current)):
+        step = (window[1] - window[0]) / (len(scores) + 1)
+        for i, score in enumerate(scores):
+            session.add(PredictionEvent(
+                model_key=key, entity_id=f"e{i}", score=score, event_time=window[0] + step * (i + 1),
+            ))
+    session.commit()
+    return org_id
+
+
+def _sql_psi(session, org_id, num_bins=10):
+    bins = sql_baseline_bins(session, org_id, "m", *BASELINE, num_bins=num_bins)
+    return bins, psi_from_counts(bins.counts, sql_bin_counts(session, org_id, "m", *CURRENT, bins))
+
+
+def _rel(session):
+    # Postgres' percentile_cont may differ from _quantile in the last bit.
+    return 0 if session.get_bind().dialect.name == "sqlite" else 1e-9
+
+
+@pytest.mark.parametrize("num_bins", [2, 10, 20])
+@pytest.mark.parametrize("shift", [0.0, 0.5, 3.0])
+def test_sql_psi_matches_psi_quantile(session, num_bins, shift):
+    rng = random.Random(num_bins)
+    baseline = [rng.betavariate(2, 5) for _ in range(3000)]
+    # Out-of-range values exercise the winsor bounds and end bins.
+    current = [rng.betavariate(2 + shift, 5) for _ in range(1000)] + [-1.0, 5.0, baseline[0]]
+    org_id = _load(session, baseline, current)
+
+    bins, psi = _sql_psi(session, org_id, num_bins)
+    expected = baseline_bins(baseline, num_bins=num_bins)
+    assert bins.counts == expected.counts
+    assert bins.edges == pytest.approx(expected.edges, rel=_rel(session))
+    assert sql_bin_counts(session, org_id, "m", *CURRENT, bins) == bin_counts(expected, current)
+    assert psi == pytest.approx(psi_quantile(baseline, current, num_bins=num_bins), rel=_rel(session))
+
+
+def test_sql_psi_with_ties_and_tiny_windows(session):
+    # Constant baseline: every edge is nudged apart.
+    org_id = _load(session, [0.5] * 50, [0.5, 0.7])
+    assert _sql_psi(session, org_id)[1] == pytest.approx(psi_quantile([0.5] * 50, [0.5, 0.7]), rel=_rel(session))
+
+    other = _load(session, [0.3], [0.1, 0.3, 0.9])
+    assert _sql_psi(session, other)[1] == pytest.approx(psi_quantile([0.3], [0.1, 0.3, 0.9]), rel=_rel(session))
+
+
+def test_sql_bins_for_empty_or_unknown_model(session):
+    org_id = _load(session, [], [0.1, 0.2])
+    assert sql_baseline_bins(session, org_id, "m", *BASELINE) is None
+    assert sql_baseline_bins(session, org_id, "missing", *BASELINE) is None
+
+    bins = baseline_bins([0.1, 0.2, 0.3])
+    assert sql_bin_counts(session, org_id, "missing", *CURRENT, bins) == [0] * 10
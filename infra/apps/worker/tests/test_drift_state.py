@@ -0,0 +1,151 @@
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+
+from apps.sentryml_core import drift_state
+from apps.sentryml_core.drift_state import ceil_hour, incremental_window_sketch
+from apps.sentryml_core.model_keys import assign_model_keys
+from apps.sentryml_core.models import DriftWindowState, PredictionEvent
+from apps.sentryml_core.rollups import aggregate_ingested, window_sketch
+from apps.sentryml_core.sketch import ScoreSketch
+
+
+NOW = datetime(2026, 10, 16, 12, 30)
+
+
+def _exact(sketch):
+    d = sketch.to_dict()
+    return {k: d[k] for k in ("pos", "neg", "zero", "count", "min", "max")}
+
+
+def test_subtract_undoes_merge():
+    rng = random.Random(0)
+    values = [rng.betavariate(2, 5) for _ in range(1000)]
+    whole, part = ScoreSketch(), ScoreSketch()
+    whole.add_many(values)
+    part.add_many(values[:400])
+    rest = ScoreSketch()
+    rest.add_many(values[400:])
+
+    whole.subtract(part)
+    rest.min, rest.max = whole.min, whole.max
+    assert _exact(whole) == _exact(rest)
+    assert whole.sum == pytest.approx(rest.sum)
+
+    whole.subtract(rest)
+    assert whole.count == 0 and whole.pos == {} and whole.min is None
+    with pytest.raises(ValueError):
+        whole.subtract(part)
+
+
+def test_incremental_state_matches_window_sketch():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    org_id = uuid4()
+    rng = random.Random(1)
+    with Session(engine) as session:
+        key = assign_model_keys(session, org_id, ["m"])["m"]
+
+        def ingest(now, n):
+            for i in range(n):
+                # Mostly fresh events, some arriving days late.
+                age = timedelta(minutes=rng.randrange(60)) if rng.random() < 0.8 else timedelta(hours=rng.randrange(72))
+                session.add(PredictionEvent(
+                    model_key=key,
+                    entity_id=f"e{now:%d%H%M}-{i}",
+                    score=rng.betavariate(2, 5),
+                    event_time=now - age,
+                    ingested_at=now,
+                ))
+            session.commit()
+
+        now = NOW - timedelta(days=3)
+        for _ in range(72 * 4):
+            ingest(now, 20)
+            now += timedelta(minutes=15)
+
+        # Runs every 20 minutes for a day; the window slides over hour edges.
+        for run in range(72):
+            ingest(now, 20)
+            aggregate_ingested(session, now)
+            start, end = now - timedelta(days=1), now
+            got = incremental_window_sketch(session, org_id, "m", "current", start, end, now)
+            session.commit()
+
+            expected = window_sketch(session, org_id, "m", ceil_hour(start), ceil_hour(end))
+            assert _exact(got) == _exact(expected)
+            assert got.sum == pytest.approx(expected.sum)
+            now += timedelta(minutes=20)
+
+        row = session.get(DriftWindowState, (org_id, "m", "current"))
+        assert row.window_end - row.window_start == timedelta(days=1)
+
+
+def test_state_is_rebuilt_when_the_window_grows_back():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    org_id = uuid4()
+    with Session(engine) as session:
+        key = assign_model_keys(session, org_id, ["m"])["m"]
+        for i in range(48):
+            ts = NOW - timedelta(hours=i)
+            session.add(PredictionEvent(model_key=key, entity_id=f"e{i}", score=0.01 * i, event_time=ts, ingested_at=ts))
+        session.commit()
+        aggregate_ingested(session, NOW)
+
+        short = incremental_window_sketch(session, org_id, "m", "current", NOW - timedelta(hours=6), NOW, NOW)
+        longer = incremental_window_sketch(session, org_id, "m", "current", NOW - timedelta(days=1), NOW, NOW)
+        assert (short.count, longer.count) == (6, 24)
+        assert longer.max == pytest.approx(0.23)
+
+
+def test_aggregation_between_checkpoint_and_rollup_reads(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'state.db'}")
+    SQLModel.metadata.create_all(engine)
+    org_id = uuid4()
+    with Session(engine) as session:
+        key = assign_model_keys(session, org_id, ["m"])["m"]
+        for i in range(48):
+            ts = NOW - timedelta(hours=i)
+            session.add(PredictionEvent(model_key=key, entity_id=f"e{i}", score=0.01 * i, event_time=ts, ingested_at=ts))
+        session.commit()
+        aggregate_ingested(session, NOW)
+        incremental_window_sketch(session, org_id, "m", "current", NOW - timedelta(hours=6), NOW, NOW)
+        session.commit()
+
+        # Late events for the hour about to slide out of the window.
+        late = NOW.replace(hour=7, minute=10)
+        for i in range(3):
+            session.add(PredictionEvent(
+                model_key=key, entity_id=f"late{i}", score=0.9, event_time=late, ingested_at=NOW + timedelta(minutes=10),
+            ))
+        session.commit()
+
+        later = NOW + timedelta(hours=1)
+        rollups = drift_state._rollups
+        ran = []
+
+        def rollups_after_aggregation(*args):
+            # Retention aggregates (and commits) after the state read the checkpoint.
+            if not ran:
+                ran.append(True)
+                with Session(engine) as other:
+                    aggregate_ingested(other, later)
+            return rollups(*args)
+
+        monkeypatch.setattr(drift_state, "_rollups", rollups_after_aggregation)
+        got = incremental_window_sketch(session, org_id, "m", "current", later - timedelta(hours=6), later, later)
+        session.commit()
+        monkeypatch.undo()
+
+        assert ran
+        expected = window_sketch(session, org_id, "m", ceil_hour(later - timedelta(hours=6)), ceil_hour(later))
+        assert _exact(got) == _exact(expected)
+        # The next run slides the rebuilt state without trouble.
+        again = incremental_window_sketch(session, org_id, "m", "current", later - timedelta(hours=5), later + timedelta(hours=1), later)
+        assert again.count == window_sketch(
+            session, org_id, "m", ceil_hour(later - timedelta(hours=5)), ceil_hour(later + timedelta(hours=1))
+        ).count
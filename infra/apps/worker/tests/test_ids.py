@@ -0,0 +1,15 @@
+import time
+
+from apps.sentryml_core.ids import uuid7
+
+
+def test_uuid7_layout_and_ordering():
+    before = time.time_ns() // 1_000_000
+    ids = [uuid7() for _ in range(10_000)]
+    after = time.time_ns() // 1_000_000
+
+    assert all(u.version == 7 for u in ids)
+    assert all(u.variant == "specified in RFC 4122" for u in ids)
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert before <= ids[0].int >> 80 <= ids[-1].int >> 80 <= after + 1
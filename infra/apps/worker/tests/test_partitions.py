@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlmodel import SQLModel, Session, create_engine
+
+from apps.sentryml_core.partitions import (
+    partition_start,
+    partition_name,
+    delete_default_before,
+    ensure_partitions,
+    drop_partitions_before,
+)
+
+
+def test_partition_start_is_monday():
+    assert partition_start(datetime(2026, 10, 16, 13, 45)) == datetime(2026, 10, 12)
+    assert partition_start(datetime(2026, 10, 12)) == datetime(2026, 10, 12)
+    assert partition_name(datetime(2026, 10, 12)) == "prediction_events_p20261012"
+
+
+def test_partition_maintenance_is_noop_without_partitioning():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert ensure_partitions(session, datetime(2026, 10, 16)) == []
+        assert drop_partitions_before(session, datetime(2026, 10, 16)) == []
+        assert delete_default_before(session, datetime(2026, 10, 16)) == 0
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from apps.sentryml_core import rollups
+from apps.sentryml_core.model_keys import assign_model_keys
+from apps.sentryml_core.models import PredictionEvent, PredictionRollup
+from apps.sentryml_core.rollups import INGEST_CHECKPOINT, aggregate_ingested, get_checkpoint
+
+
+NOW = datetime(2026, 10, 16, 12, 30)
+
+
+def test_overlapping_aggregators_fold_each_event_once(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    SQLModel.metadata.create_all(engine)
+    org_id = uuid4()
+    with Session(engine) as session:
+        key = assign_model_keys(session, org_id, ["m"])["m"]
+        for i in range(20):
+            ts = NOW - timedelta(hours=2, minutes=i)
+            session.add(PredictionEvent(model_key=key, entity_id=f"e{i}", score=0.05 * i, event_time=ts, ingested_at=ts))
+        session.commit()
+        # Checkpoint exists, so both runs start from the same place.
+        assert aggregate_ingested(session, NOW - timedelta(hours=3)) == 0
+
+    merge = rollups._merge_into_rollups
+    other_runs = []
+
+    def merge_after_other_run(session, sketches):
+        # The retention job runs to completion while run_once is mid-step.
+        if not other_runs:
+            other_runs.append(None)
+            with Session(engine) as other:
+                other_runs[0] = aggregate_ingested(other, NOW)
+        merge(session, sketches)
+
+    monkeypatch.setattr(rollups, "_merge_into_rollups", merge_after_other_run)
+    with Session(engine) as session:
+        assert aggregate_ingested(session, NOW) == 0
+        assert other_runs == [20]
+        assert sum(r.count for r in session.exec(select(PredictionRollup)).all()) == 20
+        assert get_checkpoint(session, INGEST_CHECKPOINT) == NOW - rollups.SKETCH_INGEST_LAG
+
+
+def test_non_finite_scores_do_not_stop_the_aggregator(tmp_path, caplog):
+    # Rows stored before ingest rejected them. (SQLite stores NaN as NULL;
+    # Postgres keeps it and the same isfinite check skips it.)
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    SQLModel.metadata.create_all(engine)
+    ts = NOW - timedelta(hours=2)
+    with Session(engine) as session:
+        key = assign_model_keys(session, uuid4(), ["m"])["m"]
+        for i, score in enumerate([0.5, float("inf"), float("-inf"), 0.25]):
+            session.add(PredictionEvent(model_key=key, entity_id=f"e{i}", score=score, event_time=ts, ingested_at=ts))
+        session.commit()
+
+        assert aggregate_ingested(session, NOW) == 2
+        assert get_checkpoint(session, INGEST_CHECKPOINT) == NOW - rollups.SKETCH_INGEST_LAG
+        rollup = session.exec(select(PredictionRollup)).one()
+        assert (rollup.count, rollup.score_min, rollup.score_max) == (2, 0.25, 0.5)
+        assert "skipped 2 non-finite scores" in caplog.text
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import inspect
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from apps.sentryml_core.models import PasswordResetToken, SessionToken
+from apps.worker.worker.sweep_tokens import sweep_tokens
+
+
+NOW = datetime(2026, 10, 16, 12, 30)
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_sweep_deletes_dead_tokens_in_chunks(session):
+    user_id = uuid4()
+    live = SessionToken(user_id=user_id, expires_at=NOW + timedelta(days=1))
+    session.add(live)
+    for i in range(5):
+        session.add(SessionToken(user_id=user_id, expires_at=NOW - timedelta(minutes=i)))
+        session.add(SessionToken(user_id=user_id, expires_at=NOW + timedelta(days=1), revoked_at=NOW))
+
+    live_reset = PasswordResetToken(user_id=user_id, token="live", expires_at=NOW + timedelta(hours=1))
+    session.add(live_reset)
+    session.add(PasswordResetToken(user_id=user_id, token="expired", expires_at=NOW - timedelta(hours=1)))
+    session.add(PasswordResetToken(user_id=user_id, token="used", expires_at=NOW + timedelta(hours=1), used_at=NOW))
+    session.commit()
+    live_id, live_reset_id = live.session_id, live_reset.reset_id
+
+    assert sweep_tokens(session, NOW, chunk_size=2) == {"sessions": 10, "reset_tokens": 2}
+    assert [s.session_id for s in session.exec(select(SessionToken)).all()] == [live_id]
+    assert [r.reset_id for r in session.exec(select(PasswordResetToken)).all()] == [live_reset_id]
+    assert sweep_tokens(session, NOW) == {"sessions": 0, "reset_tokens": 0}
+
+
+def test_live_token_indexes_are_partial(session):
+    indexes = {ix["name"]: ix for ix in inspect(session.get_bind()).get_indexes("sessions")}
+    assert "ix_sessions_user_id" not in indexes
+    assert indexes["ix_sessions_live_user_id"]["column_names"] == ["user_id"]
+    assert "WHERE revoked_at IS NULL" in session.connection().exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE name = 'ix_sessions_live_user_id'"
+    ).scalar()
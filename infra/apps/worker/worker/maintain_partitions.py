@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import os
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from apps.sentryml_core.db import engine
+from apps.sentryml_core.partitions import (
+    delete_default_before,
+    drop_partitions_before,
+    ensure_partitions,
+)
+from apps.worker.worker.run_once import utcnow
+
+
+def main() -> int:
+    """
+    Keep `prediction_events` partitions ahead of time and, when
+    PREDICTION_EVENTS_RETENTION_DAYS is set, drop whole weeks past it (and
+    delete the DEFAULT partition's rows past it).
+
+    Dropped weeks are not rolled up, so set it above every org's raw retention
+    (see retention.py) to keep history in prediction_rollups.
+    """
+    now = utcnow()
+    weeks_ahead = int(os.getenv("PARTITION_WEEKS_AHEAD", "4"))
+    retention_days = os.getenv("PREDICTION_EVENTS_RETENTION_DAYS")
+
+    with Session(engine) as session:
+        for name in ensure_partitions(session, now, weeks_ahead=weeks_ahead):
+            print(f"created partition {name}")
+        if retention_days:
+            cutoff = now - timedelta(days=int(retention_days))
+            for name in drop_partitions_before(session, cutoff):
+                print(f"dropped partition {name}")
+            deleted = delete_default_before(session, cutoff)
+            print(f"deleted {deleted} rows from the default partition")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import os
 from datetime import datetime, timedelta, timezone
-from typing import Tuple
+from itertools import islice
+from typing import Iterator, Tuple
 
 from sqlmodel import Session, select
 
@@ -18,11 +19,49 @@ from apps.sentryml_core.models import (
     IncidentEvent,
     IncidentEventActor,
 )
-from apps.sentryml_core.drift import psi_quantile
+from apps.sentryml_core.baseline_cache import baseline_window, cached_baseline_bins
+from apps.sentryml_core.drift import (
+    BaselineBins,
+    baseline_bins,
+    bin_counts,
+    psi_from_counts,
+    streaming_baseline_bins,
+    streaming_bin_counts,
+)
+from apps.sentryml_core.drift_sql import sql_baseline_bins, sql_bin_counts
+from apps.sentryml_core.drift_state import incremental_window_sketch
+from apps.sentryml_core.model_keys import lookup_model_key
+from apps.sentryml_core.rollups import (
+    aggregate_ingested,
+    load_rollups,
+    merged_sketch,
+    rolled_up_until,
+    rollup_scores,
+)
 from apps.worker.worker.slack import send_slack
 from apps.worker.worker.incident_fsm import incident_fsm
 
 
+# "raw": PSI over raw scores (exact). "sketch": PSI over merged hourly
+# ScoreSketches (see drift.psi_sketch for the error bound), kept up to date
+# incrementally per window (see sentryml_core.drift_state). "sql": the
+# database bins the raw scores and returns only the counts (exact, see
+# sentryml_core.drift_sql); windows past the raw retention horizon use "raw".
+# "stream": the scores of "raw", read in chunks of STREAM_CHUNK_SIZE from a
+# server-side cursor; baseline edges from a KLLSketch of STREAM_QUANTILE_K
+# (see drift.psi_streaming for the error bound), so worker memory no longer
+# grows with window size.
+DRIFT_SOURCE = os.getenv("DRIFT_SOURCE", "raw")
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "10000"))
+STREAM_QUANTILE_K = int(os.getenv("STREAM_QUANTILE_K", "200"))
+
+# Opt-in: align baseline windows to this grid and cache their bins until the
+# window rolls over (see sentryml_core.baseline_cache). The baseline then ends
+# up to this many hours before current_start, which shifts PSI compared with a
+# live window. 0 (default) = slide the baseline with every run and rebuild it.
+BASELINE_REFRESH_HOURS = float(os.getenv("BASELINE_REFRESH_HOURS", "0"))
+
+
 # -------------------------
 # Utilities
 # -------------------------
@@ -39,15 +78,63 @@ def fetch_scores(
     start: datetime,
     end: datetime,
 ) -> list[float]:
+    """
+    Scores in [start, end). The part of the window before the model's raw
+    retention horizon comes from hourly rollups (bucket-accurate values).
+    """
+    scores: list[float] = []
+    horizon = rolled_up_until(session, org_id, model_id)
+    if horizon is not None and start < horizon:
+        scores.extend(rollup_scores(session, org_id, model_id, start, min(end, horizon)))
+        start = horizon
+    key = lookup_model_key(session, org_id, model_id)
+    if start >= end or key is None:
+        return scores
+
     rows = session.exec(
         select(PredictionEvent.score).where(
-            (PredictionEvent.org_id == org_id)
-            & (PredictionEvent.model_id == model_id)
+            (PredictionEvent.model_key == key)
             & (PredictionEvent.event_time >= start)
             & (PredictionEvent.event_time < end)
         )
     ).all()
-    return list(rows)
+    scores.extend(rows)
+    return scores
+
+def score_chunks(
+    session: Session,
+    org_id,
+    model_id: str,
+    start: datetime,
+    end: datetime,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[list[float]]:
+    """fetch_scores, normalized, in chunks of at most `chunk_size` scores."""
+    horizon = rolled_up_until(session, org_id, model_id)
+    if horizon is not None and start < horizon:
+        values = merged_sketch(load_rollups(session, org_id, model_id, start, min(end, horizon))).values()
+        while True:
+            chunk = list(islice(values, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+        start = horizon
+    key = lookup_model_key(session, org_id, model_id)
+    if start >= end or key is None:
+        return
+
+    rows = session.exec(
+        select(PredictionEvent.score)
+        .where(
+            (PredictionEvent.model_key == key)
+            & (PredictionEvent.event_time >= start)
+            & (PredictionEvent.event_time < end)
+        )
+        .execution_options(yield_per=chunk_size)
+    )
+    for part in rows.partitions():
+        yield normalize_scores(part)
+
 
 def normalize_scores(scores: list[float | None]) -> list[float]:
     return [float(s) for s in scores if s is not None]
@@ -71,6 +158,41 @@ def eligible_for_monitoring(
     return baseline, current
 
 
+def sql_covers(session: Session, m: MonitorConfig, start: datetime) -> bool:
+    """DRIFT_SOURCE is "sql" and raw events still cover everything from `start` on."""
+    if DRIFT_SOURCE != "sql":
+        return False
+    horizon = rolled_up_until(session, m.org_id, m.model_id)
+    return horizon is None or start >= horizon
+
+
+def build_baseline_bins(
+    session: Session,
+    m: MonitorConfig,
+    start: datetime,
+    end: datetime,
+    now: datetime,
+) -> BaselineBins | None:
+    """Bin the baseline window's scores from DRIFT_SOURCE. None if it is empty."""
+    if DRIFT_SOURCE == "sketch":
+        scores = incremental_window_sketch(session, m.org_id, m.model_id, "baseline", start, end, now)
+        if scores.count == 0:
+            return None
+    elif sql_covers(session, m, start):
+        return sql_baseline_bins(session, m.org_id, m.model_id, start, end, num_bins=m.num_bins)
+    elif DRIFT_SOURCE == "stream":
+        return streaming_baseline_bins(
+            lambda: score_chunks(session, m.org_id, m.model_id, start, end),
+            num_bins=m.num_bins,
+            k=STREAM_QUANTILE_K,
+        )
+    else:
+        scores = normalize_scores(fetch_scores(session, m.org_id, m.model_id, start, end))
+        if not scores:
+            return None
+    return baseline_bins(scores, num_bins=m.num_bins)
+
+
 def severity_for_psi(
     psi_score: float,
     warn: float,
@@ -158,6 +280,9 @@ def main() -> int:
     now = utcnow()
 
     with Session(engine) as session:
+        # Keep the hourly sketches current; cheap when run every few minutes.
+        aggregate_ingested(session, now)
+
         # Load enabled alert routes (Slack, etc.)
         routes = session.exec(
             select(AlertRoute).where(AlertRoute.is_enabled == True)  # noqa: E712
@@ -176,43 +301,57 @@ def main() -> int:
             current_end = now
             current_start = now - timedelta(days=m.current_days)
 
-            baseline_end = current_start
-            baseline_start = baseline_end - timedelta(days=m.baseline_days)
+            if BASELINE_REFRESH_HOURS > 0:
+                baseline_start, baseline_end = baseline_window(
+                    current_start, m.baseline_days, BASELINE_REFRESH_HOURS
+                )
+            else:
+                baseline_end = current_start
+                baseline_start = baseline_end - timedelta(days=m.baseline_days)
 
             # -------------------------
-            # Fetch scores
+            # Baseline bins (cached) and current scores
             # -------------------------
-            baseline_scores = fetch_scores(
-                session,
-                m.org_id,
-                m.model_id,
-                baseline_start,
-                baseline_end,
-            )
-            current_scores = fetch_scores(
-                session,
-                m.org_id,
-                m.model_id,
-                current_start,
-                current_end,
-            )
-
-            baseline_scores, current_scores = eligible_for_monitoring(
-                baseline_scores,
-                current_scores,
-                m.min_samples,
-            )
-            if not baseline_scores or not current_scores:
+            if BASELINE_REFRESH_HOURS > 0:
+                bins = cached_baseline_bins(
+                    session,
+                    m,
+                    DRIFT_SOURCE,
+                    baseline_start,
+                    baseline_end,
+                    lambda: build_baseline_bins(session, m, baseline_start, baseline_end, now),
+                    now,
+                )
+            else:
+                bins = build_baseline_bins(session, m, baseline_start, baseline_end, now)
+            if bins is None or bins.count < m.min_samples:
+                continue
+            baseline_n = bins.count
+
+            if DRIFT_SOURCE == "sketch":
+                current_counts = bin_counts(bins, incremental_window_sketch(
+                    session, m.org_id, m.model_id, "current", current_start, current_end, now
+                ))
+            elif sql_covers(session, m, current_start):
+                current_counts = sql_bin_counts(
+                    session, m.org_id, m.model_id, current_start, current_end, bins
+                )
+            elif DRIFT_SOURCE == "stream":
+                current_counts = streaming_bin_counts(bins, score_chunks(
+                    session, m.org_id, m.model_id, current_start, current_end
+                ))
+            else:
+                current_counts = bin_counts(bins, normalize_scores(
+                    fetch_scores(session, m.org_id, m.model_id, current_start, current_end)
+                ))
+            current_n = sum(current_counts)
+            if current_n < m.min_samples:
                 continue
 
             # -------------------------
             # Compute PSI
             # -------------------------
-            psi_score = psi_quantile(
-                baseline_scores,
-                current_scores,
-                num_bins=m.num_bins,
-            )
+            psi_score = psi_from_counts(bins.counts, current_counts)
 
             drift = DriftResult(
                 org_id=m.org_id,
@@ -223,8 +362,8 @@ def main() -> int:
                 current_start=current_start,
                 current_end=current_end,
                 psi_score=psi_score,
-                baseline_n=len(baseline_scores),
-                current_n=len(current_scores),
+                baseline_n=baseline_n,
+                current_n=current_n,
             )
             session.add(drift)
 
@@ -362,8 +501,8 @@ def main() -> int:
                             model_id=m.model_id,
                             severity=next_severity.value,
                             psi_score=psi_score,
-                            baseline_n=len(baseline_scores),
-                            current_n=len(current_scores),
+                            baseline_n=baseline_n,
+                            current_n=current_n,
                             baseline_start=baseline_start,
                             baseline_end=baseline_end,
                             current_start=current_start,
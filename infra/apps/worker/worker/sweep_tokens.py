@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from apps.sentryml_core.db import engine
+from apps.sentryml_core.models import PasswordResetToken, SessionToken
+from apps.worker.worker.run_once import utcnow
+
+
+TOKEN_SWEEP_CHUNK = int(os.getenv("TOKEN_SWEEP_CHUNK", "5000"))
+
+
+def _delete_in_chunks(session: Session, pk, cond, chunk_size: int) -> int:
+    """Delete rows matching `cond` `chunk_size` at a time, committing each chunk."""
+    table = pk.class_
+    deleted = 0
+    while True:
+        ids = select(pk).where(cond).limit(chunk_size)
+        result = session.execute(delete(table).where(pk.in_(ids)))
+        session.commit()
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            return deleted
+
+
+def sweep_tokens(session: Session, now: datetime, chunk_size: int = TOKEN_SWEEP_CHUNK) -> dict:
+    """
+    Delete expired or revoked sessions and expired or used password reset
+    tokens. None of them can authenticate anything any more. Each condition is
+    swept separately so it can use its own index (live rows via the partial
+    *_live_expires_at indexes, dead ones via revoked_at / used_at).
+    """
+    return {
+        "sessions": (
+            _delete_in_chunks(
+                session, SessionToken.session_id, SessionToken.revoked_at != None, chunk_size  # noqa: E711
+            )
+            + _delete_in_chunks(
+                session,
+                SessionToken.session_id,
+                (SessionToken.revoked_at == None) & (SessionToken.expires_at <= now),  # noqa: E711
+                chunk_size,
+            )
+        ),
+        "reset_tokens": (
+            _delete_in_chunks(
+                session, PasswordResetToken.reset_id, PasswordResetToken.used_at != None, chunk_size  # noqa: E711
+            )
+            + _delete_in_chunks(
+                session,
+                PasswordResetToken.reset_id,
+                (PasswordResetToken.used_at == None) & (PasswordResetToken.expires_at < now),  # noqa: E711
+                chunk_size,
+            )
+        ),
+    }
+
+
+def main() -> int:
+    with Session(engine) as session:
+        stats = sweep_tokens(session, utcnow())
+    print(
+        f"sweep_tokens: {stats['sessions']} sessions, "
+        f"{stats['reset_tokens']} password reset tokens deleted"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
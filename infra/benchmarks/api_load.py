@@ -0,0 +1,155 @@
+"""
+Latency and throughput of single-event ingest under concurrent load: a sync
+`def` route on the sync engine vs an `async def` route on the async engine.
+
+    cd infra
+    python -m benchmarks.api_load                        # SQLite file in a temp dir
+    BENCH_DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.api_load
+    python -m benchmarks.api_load --concurrency 1 64 512 --db-latency-ms 2
+
+Both routes do what POST /v1/events/prediction does (event_row, write_rows,
+commit) behind a real uvicorn server; the sync one is the handler as it was
+before the async port. Sync routes run in Starlette's threadpool (40 threads),
+so past that many in-flight requests they queue for a thread; async routes
+wait on the database without holding one. --db-latency-ms adds a simulated
+round trip to each request (time.sleep vs asyncio.sleep), standing in for a
+database across the network, which is where the difference shows.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# The app modules build the default engine at import; the benchmark uses its own.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from apps.api.app.ingest import event_row, write_rows
+from apps.sentryml_core.db import async_database_url
+from apps.sentryml_core.schemas import PredictionEventIn, PredictionEventOut
+
+
+ORG_ID = uuid4()
+EVENT = {
+    "model_id": "fraud_v1",
+    "entity_id": "user_1",
+    "score": 0.5,
+    "event_time": "2026-01-16T12:00:00Z",
+}
+
+
+def make_app(url: str, db_latency: float) -> FastAPI:
+    engine = create_engine(url)
+    async_engine = create_async_engine(async_database_url(url))
+    SQLModel.metadata.create_all(engine)
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    async def get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app = FastAPI()
+
+    @app.post("/sync", response_model=PredictionEventOut)
+    def ingest_sync(payload: PredictionEventIn, session: Session = Depends(get_session)):
+        row = event_row(ORG_ID, payload, datetime.utcnow())
+        if db_latency:
+            time.sleep(db_latency)
+        write_rows(session, [row])
+        session.commit()
+        return PredictionEventOut(**row)
+
+    @app.post("/async", response_model=PredictionEventOut)
+    async def ingest_async(
+        payload: PredictionEventIn, session: AsyncSession = Depends(get_async_session)
+    ):
+        row = event_row(ORG_ID, payload, datetime.utcnow())
+        if db_latency:
+            await asyncio.sleep(db_latency)
+        await session.run_sync(write_rows, [row])
+        await session.commit()
+        return PredictionEventOut(**row)
+
+    return app
+
+
+def serve(app: FastAPI) -> tuple[uvicorn.Server, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def load(url: str, concurrency: int, requests: int) -> tuple[float, list[float]]:
+    """Send `requests` posts from `concurrency` clients. Returns (seconds, latencies)."""
+    latencies: list[float] = []
+    remaining = requests
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                resp = await client.post(url, json=EVENT)
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    server, base = serve(make_app(url, args.db_latency_ms / 1000))
+
+    print(f"{url.split(':')[0]}: {args.requests} requests per run, "
+          f"simulated db latency {args.db_latency_ms:g} ms")
+    print(f"{'route':<6} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for concurrency in args.concurrency:
+            for route in ("sync", "async"):
+                seconds, latencies = asyncio.run(
+                    load(f"{base}/{route}", concurrency, args.requests)
+                )
+                q = statistics.quantiles(latencies, n=100)
+                print(f"{route:<6} {concurrency:>7} {len(latencies) / seconds:>8.0f} "
+                      f"{q[49] * 1000:>8.1f} {q[98] * 1000:>8.1f}")
+    finally:
+        server.should_exit = True
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
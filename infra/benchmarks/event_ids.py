@@ -0,0 +1,68 @@
+"""
+Insert throughput and index size of `prediction_events` with random (uuid4)
+vs time-ordered (uuid7) event ids.
+
+    cd infra
+    python -m benchmarks.event_ids                       # SQLite file in a temp dir
+    BENCH_DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.event_ids
+
+Same table layout and rows for both schemes; only event_id differs. Random
+keys split primary key pages all over the index, leaving them partly empty,
+which shows up as a larger index for the same row count.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+from uuid import uuid4
+
+from sqlalchemy import Index, MetaData, PrimaryKeyConstraint, Table, create_engine
+
+from apps.sentryml_core.ids import uuid7
+from benchmarks.ingest_indexes import event_columns, make_rows, run
+
+
+def events_table(metadata: MetaData, name: str) -> Table:
+    """The current prediction_events layout."""
+    return Table(
+        name,
+        metadata,
+        *event_columns(model_key=True),
+        PrimaryKeyConstraint("event_id", "event_time"),
+        Index(
+            f"ix_{name}_model_time_score",
+            "model_key",
+            "event_time",
+            postgresql_include=["score"],
+        ),
+        Index(f"ix_{name}_ingested_at_brin", "ingested_at", postgresql_using="brin"),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+
+    rows = make_rows(args.rows, orgs=5, models=50)
+    metadata = MetaData()
+    print(f"{engine.dialect.name}: {args.rows} rows, batches of {args.batch_size}")
+    print(f"{'event_id':<8} {'rows/s':>10} {'index MiB':>10}")
+    for label, new_id in (("uuid4", uuid4), ("uuid7", uuid7)):
+        for r in rows:
+            r["event_id"] = new_id()
+        table = events_table(metadata, f"bench_events_{label}")
+        rate, size = run(engine, table, rows, args.batch_size)
+        print(f"{label:<8} {rate:>10.0f} {size / 2**20:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
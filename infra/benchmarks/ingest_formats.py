@@ -0,0 +1,94 @@
+"""
+Decode cost of a batch ingest request: JSON array vs binary frame.
+
+    cd infra
+    python -m benchmarks.ingest_formats [--events 10000] [--repeat 20]
+
+Measures single-core CPU time (time.process_time) from request body bytes to
+the bulk-insert rows handed to ingest.write_rows, i.e. everything the batch
+endpoint does before touching the database.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+# Nothing here touches the database, but importing the ingest module builds the engine.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from apps.api.app.frames import decode_frame, encode_frame
+from apps.api.app.ingest import event_row, validate_events
+
+
+def make_events(n: int, models: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "model_id": f"fraud-detection-model-{rng.randrange(models)}",
+            "entity_id": f"user_{rng.randrange(1_000_000)}",
+            "score": rng.random(),
+            "prediction": rng.choice([None, "fraud", "ok"]),
+            "event_time": start + timedelta(seconds=i),
+        }
+        for i in range(n)
+    ]
+
+
+def json_body(events: list[dict]) -> bytes:
+    return json.dumps(
+        [{**e, "event_time": e["event_time"].isoformat()} for e in events]
+    ).encode()
+
+
+def decode_json(body: bytes, org_id, now: datetime) -> list[dict]:
+    valid, errors = validate_events(json.loads(body))
+    assert not errors
+    return [event_row(org_id, p, now) for p in valid]
+
+
+def decode_binary(body: bytes, org_id, now: datetime) -> list[dict]:
+    rows, errors = decode_frame(body, org_id, now, max_events=1 << 32)
+    assert not errors
+    return rows
+
+
+def measure(fn, body: bytes, repeat: int) -> float:
+    """Best-of-`repeat` CPU seconds for one decode."""
+    org_id = uuid4()
+    best = float("inf")
+    for _ in range(repeat):
+        now = datetime.utcnow()
+        started = time.process_time()
+        fn(body, org_id, now)
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--models", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.models)
+    bodies = (
+        ("json", json_body(events), decode_json),
+        ("frame", encode_frame(events), decode_binary),
+    )
+    print(f"{args.events} events per request, best of {args.repeat}")
+    print(f"{'format':<6} {'body KiB':>9} {'events/s/core':>14}")
+    for label, body, fn in bodies:
+        seconds = measure(fn, body, args.repeat)
+        print(f"{label:<6} {len(body) / 1024:>9.0f} {args.events / seconds:>14.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
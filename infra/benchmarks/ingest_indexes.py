@@ -0,0 +1,201 @@
+"""
+Insert throughput and index size of `prediction_events` under its successive
+layouts: six B-trees ("before"), the lean covering + BRIN layout (migration
+c7a2e5d8f419, "lean") and the same keyed by the integer model_key instead of
+(org_id, model_id) (migration e1b6d3a9c570, "model_key").
+
+    cd infra
+    python -m benchmarks.ingest_indexes                       # SQLite file in a temp dir
+    BENCH_DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.ingest_indexes
+
+Each layout gets its own scratch table (dropped afterwards), filled with the
+same rows in batches the size of a batch ingest request. On SQLite there is
+no BRIN or INCLUDE, so the last two layouts use plain B-trees there; run it
+against Postgres for the production numbers.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+    Uuid,
+    create_engine,
+    text,
+)
+
+
+def event_columns(model_key: bool = False):
+    if model_key:
+        model_columns = [Column("model_key", Integer, nullable=False)]
+    else:
+        model_columns = [
+            Column("org_id", Uuid, nullable=False),
+            Column("model_id", String, nullable=False),
+        ]
+    return [
+        Column("event_id", Uuid, nullable=False),
+        *model_columns,
+        Column("entity_id", String, nullable=False),
+        Column("score", Float, nullable=False),
+        Column("prediction", String),
+        Column("event_time", DateTime, nullable=False),
+        Column("ingested_at", DateTime, nullable=False),
+    ]
+
+
+def before_table(metadata: MetaData) -> Table:
+    name = "bench_events_before"
+    return Table(
+        name,
+        metadata,
+        *event_columns(),
+        PrimaryKeyConstraint("event_id", "event_time"),
+        Index(f"ix_{name}_org_id", "org_id"),
+        Index(f"ix_{name}_model_id", "model_id"),
+        Index(f"ix_{name}_entity_id", "entity_id"),
+        Index(f"ix_{name}_event_time", "event_time"),
+        Index(f"ix_{name}_ingested_at", "ingested_at"),
+        Index(f"ix_{name}_org_model_time", "org_id", "model_id", "event_time"),
+    )
+
+
+def lean_table(metadata: MetaData) -> Table:
+    name = "bench_events_lean"
+    return Table(
+        name,
+        metadata,
+        *event_columns(),
+        PrimaryKeyConstraint("event_id", "event_time"),
+        Index(
+            f"ix_{name}_org_model_time_score",
+            "org_id",
+            "model_id",
+            "event_time",
+            postgresql_include=["score"],
+        ),
+        Index(f"ix_{name}_ingested_at_brin", "ingested_at", postgresql_using="brin"),
+    )
+
+
+def model_key_table(metadata: MetaData) -> Table:
+    name = "bench_events_model_key"
+    return Table(
+        name,
+        metadata,
+        *event_columns(model_key=True),
+        PrimaryKeyConstraint("event_id", "event_time"),
+        Index(
+            f"ix_{name}_model_time_score",
+            "model_key",
+            "event_time",
+            postgresql_include=["score"],
+        ),
+        Index(f"ix_{name}_ingested_at_brin", "ingested_at", postgresql_using="brin"),
+    )
+
+
+def make_rows(n: int, orgs: int, models: int, seed: int = 0) -> list[dict]:
+    """Ingest-shaped rows: ingested_at increasing, event_time a little behind it."""
+    rng = random.Random(seed)
+    org_ids = [uuid4() for _ in range(orgs)]
+    start = datetime(2026, 1, 1)
+    rows = []
+    for i in range(n):
+        ingested_at = start + timedelta(milliseconds=10 * i)
+        org = rng.randrange(orgs)
+        model = rng.randrange(models)
+        rows.append({
+            "event_id": uuid4(),
+            "org_id": org_ids[org],
+            "model_id": f"fraud-detection-model-{model}",
+            "model_key": org * models + model + 1,
+            "entity_id": f"entity-{rng.randrange(n)}",
+            "score": rng.random(),
+            "prediction": None,
+            "event_time": ingested_at - timedelta(seconds=rng.randrange(300)),
+            "ingested_at": ingested_at,
+        })
+    return rows
+
+
+def index_bytes(conn, table: Table) -> int:
+    if conn.dialect.name == "postgresql":
+        return int(conn.execute(
+            text("SELECT pg_indexes_size(CAST(:t AS regclass))"), {"t": table.name}
+        ).scalar())
+    if conn.dialect.name == "sqlite":
+        return int(conn.execute(
+            text(
+                "SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t)"
+            ),
+            {"t": table.name},
+        ).scalar())
+    raise NotImplementedError(conn.dialect.name)
+
+
+def run(engine, table: Table, rows: list[dict], batch_size: int) -> tuple[float, int]:
+    """Insert `rows` in committed batches. Returns (rows/s, index bytes)."""
+    rows = [{c: r[c] for c in table.columns.keys()} for r in rows]
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    try:
+        started = time.perf_counter()
+        for i in range(0, len(rows), batch_size):
+            with engine.begin() as conn:
+                conn.execute(table.insert(), rows[i:i + batch_size])
+        elapsed = time.perf_counter() - started
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text(f"ANALYZE {table.name}"))
+            size = index_bytes(conn, table)
+    finally:
+        table.drop(engine)
+    return len(rows) / elapsed, size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--orgs", type=int, default=5)
+    parser.add_argument("--models", type=int, default=50)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+
+    rows = make_rows(args.rows, args.orgs, args.models)
+    metadata = MetaData()
+    print(f"{engine.dialect.name}: {args.rows} rows, batches of {args.batch_size}")
+    print(f"{'layout':<10} {'rows/s':>10} {'index MiB':>10}")
+    layouts = (
+        ("before", before_table(metadata)),
+        ("lean", lean_table(metadata)),
+        ("model_key", model_key_table(metadata)),
+    )
+    for label, table in layouts:
+        rate, size = run(engine, table, rows, args.batch_size)
+        print(f"{label:<10} {rate:>10.0f} {size / 2**20:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
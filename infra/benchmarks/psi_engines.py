@@ -0,0 +1,42 @@
+"""
+psi_quantile over raw scores: pure-Python engine vs the NumPy engine.
+
+    cd infra
+    python -m benchmarks.psi_engines [--baseline 5000000] [--current 1000000]
+
+Both engines return identical values; this only compares wall time for one
+drift computation on lists of floats as fetch_scores returns them.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from apps.sentryml_core import drift
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--baseline", type=int, default=5_000_000)
+    parser.add_argument("--current", type=int, default=1_000_000)
+    parser.add_argument("--bins", type=int, default=10)
+    args = parser.parse_args()
+
+    if drift.np is None:
+        raise SystemExit("numpy is not installed")
+    rng = random.Random(0)
+    baseline = [rng.betavariate(2, 5) for _ in range(args.baseline)]
+    current = [rng.betavariate(2.5, 5) for _ in range(args.current)]
+
+    print(f"{args.baseline} baseline / {args.current} current scores, {args.bins} bins")
+    print(f"{'engine':<7} {'seconds':>8} {'psi':>10}")
+    for label, fn in (("python", drift._psi_quantile_py), ("numpy", drift._psi_quantile_np)):
+        started = time.perf_counter()
+        psi = fn(baseline, current, args.bins, 1e-6, 0.01)
+        print(f"{label:<7} {time.perf_counter() - started:>8.2f} {psi:>10.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())